@@ -278,6 +278,17 @@ CREATE TABLE `notificaciones_stock` (
 
 -- --------------------------------------------------------
 
+--
+-- Estructura de tabla para la tabla `notificaciones_stock_marca`
+--
+
+CREATE TABLE `notificaciones_stock_marca` (
+  `id_producto` int NOT NULL,
+  `stock` int NOT NULL DEFAULT '0'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
 --
 -- Estructura de tabla para la tabla `pagos`
 --
@@ -869,6 +880,68 @@ INSERT INTO `usuarios_eliminados` (`id_usuario`, `nombre`, `email`, `password`,
 (112, 'Prueba Register', 'zerpenter123lol@gmail.com', '$2y$10$VLhX44nmBBO2maToSVUQx.7r1DL7WkuoFqF8P4fQqWMYW0CygJh76', NULL, NULL, NULL, 'U', NULL, NULL, '2025-11-11 01:36:24', 'None', NULL),
 (113, 'alexd', 'dekame9264@etramay.com', '$2y$10$kll1pV2W6EzVZlKTqj405ea2fPRFJVyJqAhMpZ01huJMngXOjli5m', '345345345', '34534534', '34534534', 'U', NULL, NULL, '2025-11-11 20:04:46', 'None', NULL);
 
+-- --------------------------------------------------------
+
+--
+-- Estructura de tabla para la tabla `ventas_diarias`
+--
+
+CREATE TABLE `ventas_diarias` (
+  `dia` date NOT NULL,
+  `id_producto` int NOT NULL,
+  `region` varchar(50) COLLATE utf8mb4_general_ci NOT NULL DEFAULT '',
+  `id_vendedor` int DEFAULT NULL,
+  `categoria` varchar(50) COLLATE utf8mb4_general_ci DEFAULT NULL,
+  `unidades` int NOT NULL,
+  `ingresos` decimal(14,2) NOT NULL,
+  `lineas` int NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Estructura de tabla para la tabla `ventas_diarias_estado`
+--
+
+CREATE TABLE `ventas_diarias_estado` (
+  `id` tinyint NOT NULL,
+  `ultimo_id_pedido` int NOT NULL DEFAULT '0',
+  `actualizado_en` datetime DEFAULT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+--
+-- Volcado de datos para la tabla `ventas_diarias_estado`
+--
+
+INSERT INTO `ventas_diarias_estado` (`id`, `ultimo_id_pedido`) VALUES
+(1, 0);
+
+-- --------------------------------------------------------
+
+--
+-- Estructura de tabla para la tabla `ventas_diarias_tienda`
+--
+
+CREATE TABLE `ventas_diarias_tienda` (
+  `dia` date NOT NULL,
+  `pedidos` int NOT NULL,
+  `total` decimal(14,2) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Estructura de tabla para la tabla `ventas_diarias_vendedor`
+--
+
+CREATE TABLE `ventas_diarias_vendedor` (
+  `dia` date NOT NULL,
+  `id_vendedor` int NOT NULL,
+  `pedidos` int NOT NULL,
+  `unidades` int NOT NULL,
+  `ingresos` decimal(14,2) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
 --
 -- Índices para tablas volcadas
 --
@@ -897,7 +970,8 @@ ALTER TABLE `chatbot_respuestas`
 -- Indices de la tabla `contacto_mensajes`
 --
 ALTER TABLE `contacto_mensajes`
-  ADD PRIMARY KEY (`id`);
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `idx_contacto_leido` (`leido`);
 
 --
 -- Indices de la tabla `cupones`
@@ -960,8 +1034,14 @@ ALTER TABLE `moneda`
 --
 ALTER TABLE `notificaciones_stock`
   ADD PRIMARY KEY (`id_notificacion`),
-  ADD KEY `id_producto` (`id_producto`),
-  ADD KEY `id_usuario` (`id_usuario`);
+  ADD KEY `id_usuario` (`id_usuario`),
+  ADD KEY `idx_notificaciones_producto_pendiente` (`id_producto`,`notificado`);
+
+--
+-- Indices de la tabla `notificaciones_stock_marca`
+--
+ALTER TABLE `notificaciones_stock_marca`
+  ADD PRIMARY KEY (`id_producto`);
 
 --
 -- Indices de la tabla `pagos`
@@ -976,9 +1056,10 @@ ALTER TABLE `pagos`
 --
 ALTER TABLE `pedidos`
   ADD PRIMARY KEY (`id_pedido`),
-  ADD KEY `Pedidos_Usuario_FK` (`id_usuario`),
   ADD KEY `Pedidos_Pagos_FK` (`id_pago`),
-  ADD KEY `fk_pedido_cupon` (`id_cupon`);
+  ADD KEY `fk_pedido_cupon` (`id_cupon`),
+  ADD KEY `idx_pedidos_usuario_fecha` (`id_usuario`,`fecha_pedido`),
+  ADD KEY `idx_pedidos_fecha_estado` (`fecha_pedido`,`estado`);
 
 --
 -- Indices de la tabla `pedidos_productos`
@@ -994,7 +1075,9 @@ ALTER TABLE `pedidos_productos`
 ALTER TABLE `producto`
   ADD PRIMARY KEY (`id_producto`),
   ADD KEY `Producto_Marca_FK` (`id_marca`),
-  ADD KEY `idx_id_vendedor` (`id_vendedor`);
+  ADD KEY `idx_producto_activo_stock` (`activo`,`stock`),
+  ADD KEY `idx_producto_vendedor_activo` (`id_vendedor`,`activo`),
+  ADD FULLTEXT KEY `ft_producto_busqueda` (`nombre`,`categoria`,`descripcion`);
 
 --
 -- Indices de la tabla `productos_eliminados`
@@ -1031,7 +1114,8 @@ ALTER TABLE `respuestas_chat`
 --
 ALTER TABLE `solicitudes_servicio`
   ADD PRIMARY KEY (`id`),
-  ADD KEY `id_usuario` (`id_usuario`);
+  ADD KEY `id_usuario` (`id_usuario`),
+  ADD KEY `idx_solicitudes_estado` (`estado`);
 
 --
 -- Indices de la tabla `soporte_mensajes`
@@ -1068,6 +1152,33 @@ ALTER TABLE `usuarios_eliminados`
   ADD KEY `Usuario_Chatbot_FK` (`id_chat`),
   ADD KEY `id_usuario` (`id_usuario`);
 
+--
+-- Indices de la tabla `ventas_diarias`
+--
+ALTER TABLE `ventas_diarias`
+  ADD PRIMARY KEY (`dia`,`id_producto`,`region`),
+  ADD KEY `idx_vd_producto_dia` (`id_producto`,`dia`),
+  ADD KEY `idx_vd_categoria_dia` (`categoria`,`dia`);
+
+--
+-- Indices de la tabla `ventas_diarias_estado`
+--
+ALTER TABLE `ventas_diarias_estado`
+  ADD PRIMARY KEY (`id`);
+
+--
+-- Indices de la tabla `ventas_diarias_tienda`
+--
+ALTER TABLE `ventas_diarias_tienda`
+  ADD PRIMARY KEY (`dia`);
+
+--
+-- Indices de la tabla `ventas_diarias_vendedor`
+--
+ALTER TABLE `ventas_diarias_vendedor`
+  ADD PRIMARY KEY (`dia`,`id_vendedor`),
+  ADD KEY `idx_vdv_vendedor_dia` (`id_vendedor`,`dia`);
+
 --
 -- AUTO_INCREMENT de las tablas volcadas
 --
@@ -0,0 +1,19 @@
+-- --------------------------------------------------------
+-- Migración 001: índice FULLTEXT para las búsquedas del chatbot
+-- --------------------------------------------------------
+--
+-- Permite que las búsquedas de productos del chatbot usen
+-- MATCH ... AGAINST (BUSQUEDA_BACKEND=fulltext en Chatbot/.env) en lugar
+-- de LIKE '%término%', que recorre la tabla completa.
+--
+-- Notas:
+-- - InnoDB indexa palabras de 3 o más caracteres (innodb_ft_min_token_size);
+--   términos más cortos ("rx", "oc") no se encuentran por este índice.
+-- - Sin este índice el chatbot vuelve automáticamente a la búsqueda LIKE.
+--
+-- Aplicar:   mysql -u root -p bitware < BD/migraciones/001_producto_fulltext.sql
+-- Revertir:  ALTER TABLE `producto` DROP INDEX `ft_producto_busqueda`;
+--
+
+ALTER TABLE `producto`
+  ADD FULLTEXT KEY `ft_producto_busqueda` (`nombre`,`categoria`,`descripcion`);
@@ -0,0 +1,61 @@
+-- --------------------------------------------------------
+-- Migración 002: resumen diario de ventas
+-- --------------------------------------------------------
+--
+-- Tablas que mantiene Chatbot/ventas_diarias.py con las ventas pagadas,
+-- enviadas o entregadas agregadas por día. El pronóstico de demanda, las
+-- estadísticas del vendedor, las ventas de hoy y el análisis por categoría
+-- leen de aquí en vez de agrupar pedidos_productos línea por línea.
+--
+-- Son datos derivados: se pueden vaciar y reconstruir en cualquier momento.
+--
+-- Aplicar:
+--   mysql -u root -p bitware < BD/migraciones/002_ventas_diarias.sql
+--   cd Chatbot && python ventas_diarias.py --reconstruir
+-- Revertir:
+--   DROP TABLE `ventas_diarias`, `ventas_diarias_vendedor`, `ventas_diarias_tienda`, `ventas_diarias_estado`;
+--
+
+-- (día, producto, región del cliente): id_vendedor y categoria son los del producto al agregar
+CREATE TABLE `ventas_diarias` (
+  `dia` date NOT NULL,
+  `id_producto` int NOT NULL,
+  `region` varchar(50) COLLATE utf8mb4_general_ci NOT NULL DEFAULT '',
+  `id_vendedor` int DEFAULT NULL,
+  `categoria` varchar(50) COLLATE utf8mb4_general_ci DEFAULT NULL,
+  `unidades` int NOT NULL,
+  `ingresos` decimal(14,2) NOT NULL,
+  `lineas` int NOT NULL,
+  PRIMARY KEY (`dia`,`id_producto`,`region`),
+  KEY `idx_vd_producto_dia` (`id_producto`,`dia`),
+  KEY `idx_vd_categoria_dia` (`categoria`,`dia`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- (día, vendedor): pedidos distintos que incluyen productos del vendedor
+CREATE TABLE `ventas_diarias_vendedor` (
+  `dia` date NOT NULL,
+  `id_vendedor` int NOT NULL,
+  `pedidos` int NOT NULL,
+  `unidades` int NOT NULL,
+  `ingresos` decimal(14,2) NOT NULL,
+  PRIMARY KEY (`dia`,`id_vendedor`),
+  KEY `idx_vdv_vendedor_dia` (`id_vendedor`,`dia`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- (día): totales de pedidos.total (incluye descuentos de cupones)
+CREATE TABLE `ventas_diarias_tienda` (
+  `dia` date NOT NULL,
+  `pedidos` int NOT NULL,
+  `total` decimal(14,2) NOT NULL,
+  PRIMARY KEY (`dia`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- Marca de agua del refresco incremental (una sola fila)
+CREATE TABLE `ventas_diarias_estado` (
+  `id` tinyint NOT NULL,
+  `ultimo_id_pedido` int NOT NULL DEFAULT '0',
+  `actualizado_en` datetime DEFAULT NULL,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+INSERT INTO `ventas_diarias_estado` (`id`, `ultimo_id_pedido`) VALUES (1, 0);
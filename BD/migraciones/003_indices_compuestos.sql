@@ -0,0 +1,53 @@
+-- --------------------------------------------------------
+-- Migración 003: índices compuestos para las consultas del chatbot
+-- --------------------------------------------------------
+--
+-- Cada índice corresponde a consultas concretas de Chatbot/database.py
+-- (revisar con Chatbot/benchmarks/plan_consultas.py):
+--
+-- pedidos (id_usuario, fecha_pedido)
+--   Último pedido del cliente y elegibilidad de devolución:
+--   WHERE id_usuario = ? ORDER BY fecha_pedido DESC LIMIT 1 se resuelve
+--   recorriendo el índice hacia atrás, sin filesort. Reemplaza a
+--   Pedidos_Usuario_FK (id_usuario es su prefijo y sigue sirviendo a la FK).
+--
+-- pedidos (fecha_pedido, estado)
+--   Ventas de hoy, análisis del mes y refresco de ventas_diarias: siempre
+--   filtran por fecha (igualdad, rango o lista de días) y por los estados
+--   de venta. La fecha va primero porque es lo selectivo; el estado
+--   (3 de ~5 valores) se filtra dentro del mismo índice.
+--
+-- producto (activo, stock)
+--   Alerta de bajo stock: WHERE stock < 10 AND activo = 1.
+--
+-- producto (id_vendedor, activo)
+--   Productos activos de un vendedor. Reemplaza a idx_id_vendedor.
+--
+-- contacto_mensajes (leido), solicitudes_servicio (estado)
+--   Contadores del panel del admin (mensajes sin leer, servicios pendientes).
+--
+-- Aplicar:   mysql -u root -p bitware < BD/migraciones/003_indices_compuestos.sql
+-- Revertir:
+--   ALTER TABLE `pedidos` ADD KEY `Pedidos_Usuario_FK` (`id_usuario`),
+--     DROP KEY `idx_pedidos_usuario_fecha`, DROP KEY `idx_pedidos_fecha_estado`;
+--   ALTER TABLE `producto` ADD KEY `idx_id_vendedor` (`id_vendedor`),
+--     DROP KEY `idx_producto_activo_stock`, DROP KEY `idx_producto_vendedor_activo`;
+--   ALTER TABLE `contacto_mensajes` DROP KEY `idx_contacto_leido`;
+--   ALTER TABLE `solicitudes_servicio` DROP KEY `idx_solicitudes_estado`;
+--
+
+ALTER TABLE `pedidos`
+  ADD KEY `idx_pedidos_usuario_fecha` (`id_usuario`,`fecha_pedido`),
+  ADD KEY `idx_pedidos_fecha_estado` (`fecha_pedido`,`estado`),
+  DROP KEY `Pedidos_Usuario_FK`;
+
+ALTER TABLE `producto`
+  ADD KEY `idx_producto_activo_stock` (`activo`,`stock`),
+  ADD KEY `idx_producto_vendedor_activo` (`id_vendedor`,`activo`),
+  DROP KEY `idx_id_vendedor`;
+
+ALTER TABLE `contacto_mensajes`
+  ADD KEY `idx_contacto_leido` (`leido`);
+
+ALTER TABLE `solicitudes_servicio`
+  ADD KEY `idx_solicitudes_estado` (`estado`);
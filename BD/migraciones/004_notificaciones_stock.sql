@@ -0,0 +1,38 @@
+-- --------------------------------------------------------
+-- Migración 004: despacho de avisos de reposición de stock
+-- --------------------------------------------------------
+--
+-- Chatbot/notificaciones_stock.py envía los avisos pendientes de
+-- notificaciones_stock cuando un producto vuelve a tener stock.
+--
+-- notificaciones_stock_marca
+--   Último stock visto por producto. Una pasada solo mira los productos
+--   cuyo stock cambió desde entonces; una reposición es pasar de 0 (o sin
+--   marca) a stock > 0. La marca de un producto con envíos fallidos no se
+--   avanza, para reintentarlos en la pasada siguiente.
+--
+-- notificaciones_stock (id_producto, notificado)
+--   Carga de los avisos pendientes de los productos repuestos:
+--   WHERE notificado = 0 AND id_producto IN (...) AND id_notificacion > ?
+--   (la clave primaria va implícita al final del índice). Reemplaza a
+--   id_producto, que es su prefijo.
+--
+-- Valores de notificado: 0 pendiente, 1 enviado, 2 rechazado por el
+-- servidor de correo (dirección inválida; no se reintenta).
+--
+-- Aplicar:   mysql -u root -p bitware < BD/migraciones/004_notificaciones_stock.sql
+-- Revertir:
+--   DROP TABLE `notificaciones_stock_marca`;
+--   ALTER TABLE `notificaciones_stock` ADD KEY `id_producto` (`id_producto`),
+--     DROP KEY `idx_notificaciones_producto_pendiente`;
+--
+
+CREATE TABLE `notificaciones_stock_marca` (
+  `id_producto` int NOT NULL,
+  `stock` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`id_producto`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+ALTER TABLE `notificaciones_stock`
+  ADD KEY `idx_notificaciones_producto_pendiente` (`id_producto`,`notificado`),
+  DROP KEY `id_producto`;
@@ -1,366 +1,211 @@
 # -*- coding: utf-8 -*-
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
-import random
-import re
 import os
+import time
 
 # --- IMPORTACIONES DE MÓDULOS PROPIOS ---
-from config import FLASK_DEBUG, BASE_DIR
+from config import FLASK_DEBUG, BASE_DIR, PREDICCION_MAX_LOTE
 import database as db
+import manejadores
+import metricas as medicion
 import nlp_engine as nlp
+import pronostico
+import sesiones
+import trabajos_exportacion as exportaciones
 
 app = Flask(__name__, static_folder='static')
 CORS(app)
 app.json.ensure_ascii = False
 app.config['JSON_AS_ASCII'] = False
 
+# ======================================================================
+# MÉTRICAS
+# ======================================================================
+
+@app.before_request
+def iniciar_medicion():
+    g.inicio = time.perf_counter()
+    medicion.iniciar_traza()
+
+@app.after_request
+def registrar_medicion(response):
+    segundos = time.perf_counter() - g.inicio
+    # La plantilla de la ruta (no la URL) para no crear una serie por job_id
+    ruta = request.url_rule.rule if request.url_rule else "sin_ruta"
+    medicion.http_segundos.observar(segundos, ruta, request.method)
+    medicion.http_peticiones.incrementar(ruta, response.status_code)
+    medicion.terminar_traza(f"{request.method} {request.path} -> {response.status_code}", segundos)
+    return response
+
+CONTADORES_POOL = ("prestamos", "prestamos_pandas", "esperas", "agotados", "fallos_salud", "fugas_recuperadas")
+
+def _indicadores():
+    muestras = []
+    for clave, valor in db.estadisticas_pool().items():
+        if clave in CONTADORES_POOL:
+            muestras.append((f"bitware_pool_mysql_{clave}_total", f"Pool de MySQL: {clave}.", (), valor, "counter"))
+        elif isinstance(valor, (int, float)):
+            muestras.append((f"bitware_pool_mysql_{clave}", f"Pool de MySQL: {clave}.", (), valor))
+    for campo, datos in sesiones.estadisticas().items():
+        muestras.append(("bitware_cache_tasa_aciertos", "Tasa de aciertos de las cachés en memoria.",
+                         (("cache", f"sesiones_{campo}"),), datos["tasa_aciertos"]))
+    muestras.append(("bitware_cache_tasa_aciertos", "Tasa de aciertos de las cachés en memoria.",
+                     (("cache", "nlp"),), nlp.estadisticas_cache()["tasa_aciertos"]))
+    ahorro = nlp.estadisticas_enrutador()["ahorro_us_por_mensaje"]
+    if ahorro is not None:
+        muestras.append(("bitware_nlp_enrutador_ahorro_us",
+                         "Microsegundos ahorrados por mensaje con el enrutador de comandos.", (), ahorro))
+    return muestras
+
+medicion.registrar_indicadores(_indicadores)
+
 # ======================================================================
 # ENDPOINTS
 # ======================================================================
 
+# Las respuestas se arman en funciones que reciben el JSON del pedido y
+# devuelven (cuerpo, código HTTP): las usan tanto estas rutas Flask como
+# el modo ASGI (asgi.py), así el contrato es el mismo en ambos.
+
 @app.route("/predict_demand", methods=["POST"])
 def predict_demand():
-    data = request.json
+    cuerpo, codigo = responder_prediccion(request.json)
+    return jsonify(cuerpo), codigo
+
+def responder_prediccion(data, predecir=None):
+    # predecir: reemplazo de db.get_prediction_data (asgi.py ajusta en otro proceso)
     product_id = data.get("id_producto")
+    motor = data.get("motor")
     if not product_id:
-        return jsonify({"error": "Falta id_producto"}), 400
+        return {"error": "Falta id_producto"}, 400
+    if not pronostico.motor_valido(motor):
+        return {"error": f"Motor desconocido: {motor}"}, 400
 
-    result = db.get_prediction_data(product_id)
+    result = (predecir or db.get_prediction_data)(product_id, motor)
     
-    if result["success"]:
-        return jsonify(result)
+    if result["success"] or result.get("pendiente"):
+        # "pendiente": el pronóstico se calcula en segundo plano (stale-while-revalidate)
+        return result, 200
     else:
         status_code = 404 if "Datos insuficientes" in result["error"] else 500
-        return jsonify({"error": result["error"]}), status_code
+        return {"error": result["error"]}, status_code
 
 
-@app.route("/chat", methods=["POST"])
-def chat():
-    data = request.json
-    mensaje = data.get("message", "").lower()
-    permisos = data.get("permisos")
-    id_usuario = data.get("userId")
-    email_usuario = data.get("email_usuario", "") 
-    nombre_usuario = data.get("nombre_usuario", "Invitado")
-    
-    # URL base
-    base_url = "https://bitware.site:5000/"
-    
-    respuesta, productos_recomendados = "No te entendí.", []
-    intencion = nlp.clasificar_intencion(mensaje)
-
-    # =================================================================
-    # 1. LÓGICA PARA ADMINISTRADORES ('A')
-    # =================================================================
-    if permisos == 'A':
-        if intencion == "saludo":
-            alerts = db.get_proactive_alerts()
-            
-            if alerts:
-                frases_alerta = [
-                    f"Hola, Admin **{nombre_usuario}**. Atención: {alerts}",
-                    f"Bienvenido de nuevo. Tengo novedades importantes: {alerts}",
-                    f"¡Hola! Antes de empezar, revisa esto: {alerts}"
-                ]
-                respuesta = random.choice(frases_alerta)
-            else:
-                frases_ok = [
-                    f"Hola, Admin **{nombre_usuario}**. Todo el sistema opera al 100%.",
-                    f"¡Bienvenido, **{nombre_usuario}**! No hay alertas pendientes por ahora."
-                ]
-                respuesta = random.choice(frases_ok)
-
-        elif intencion == "prediccion_stock":
-            match = re.search(r'(?:de|del)\s(.+)', mensaje)
-            if not match: match = re.search(r'stock\s(.+)', mensaje)
-            termino_busqueda = match.group(1).strip() if match else ""
-            
-            if not termino_busqueda:
-                respuesta = "Claro, dime el nombre del producto que quieres predecir. Ej: 'Predice el stock de RTX 3060'"
-            else:
-                producto = db.find_product_id_by_name(termino_busqueda) 
-                if not producto:
-                    respuesta = f"No encontré el producto '{termino_busqueda}'."
-                else:
-                    respuesta = f"Analizando la demanda de '{producto['nombre']}', por favor espera..."
-                    prediccion_resultado = db.get_prediction_data(producto['id_producto'])
-                    
-                    if prediccion_resultado["success"]:
-                        total_unidades = prediccion_resultado['total_forecast']
-                        respuesta = f"La demanda pronosticada para '{producto['nombre']}' en los próximos 30 días es de **{total_unidades} unidades**."
-                    else:
-                        respuesta = f"No pude predecir '{producto['nombre']}': {prediccion_resultado['error']}"
-
-        elif intencion == "exportar_ventas":
-            respuesta = "Generando reporte GLOBAL de ventas..."
-            resultado_url = db.generar_excel_ventas(id_usuario, base_url, es_admin=True)
-            
-            if resultado_url == "empty":
-                respuesta = "No encontré ventas registradas en el sistema."
-            elif resultado_url:
-                respuesta = f"✅ Reporte Global Generado.<br><br>👉 <a href='{resultado_url}' target='_blank' style='color: #0d6efd; font-weight: bold;'>Descargar Excel Global</a>"
-            else:
-                respuesta = "Hubo un error al generar el reporte."
-        
-        elif intencion == "stats_admin":
-            if "total usuarios" in mensaje or "cuantos usuarios" in mensaje:
-                conn = db.conectar_db()
-                cursor = conn.cursor()
-                cursor.execute("SELECT COUNT(*) as total FROM usuario")
-                count = cursor.fetchone()[0]
-                conn.close()
-                respuesta = f"Actualmente hay <strong>{count}</strong> usuarios registrados en total."
-            elif "reporte de ventas hoy" in mensaje or "ventas hoy" in mensaje:
-                conn = db.conectar_db()
-                cursor = conn.cursor()
-                sql = "SELECT SUM(total) FROM pedidos WHERE estado IN ('Pagado', 'Enviado', 'Entregado') AND DATE(fecha_pedido) = CURDATE()"
-                cursor.execute(sql)
-                total_hoy = cursor.fetchone()[0] or 0
-                conn.close()
-                respuesta = f"Los ingresos totales de hoy (pedidos pagados) son: <strong>${total_hoy:,.0f}</strong>."
-            else:
-                stats = db.obtener_estadisticas_admin()
-                if stats:
-                    respuesta = (f"**Resumen Rápido del Sistema:**\n"
-                                 f"- **Mensajes Nuevos:** {stats['nuevos_mensajes']}\n"
-                                 f"- **Servicios Pendientes:** {stats['servicios_pendientes']}\n"
-                                 f"- **Productos con Bajo Stock:** {stats['bajo_stock']}")
-                else:
-                    respuesta = "No pude obtener las estadísticas en este momento."
-        
-        elif intencion == "cambiar_estado_pedido":
-            match = re.search(r'pedido\s#?(\d+)\s(?:a|como)\s(\w+)', mensaje)
-            if match:
-                id_pedido, nuevo_estado = match.groups()
-                respuesta = db.cambiar_estado_pedido_db(id_pedido, nuevo_estado.capitalize())
-            else:
-                respuesta = "Claro. Dime el número de pedido y el nuevo estado. Ej: 'Actualiza el pedido 123 a Enviado'."
-        
-        elif intencion == "analisis_admin":
-            respuesta = db.get_category_growth_analysis()
-
-        elif intencion == "buscar_cliente_admin":
-            match = re.search(r'(?:busca al cliente|datos de cliente|info de|encuentra a|cliente)\s(.+)', mensaje)
-            termino_cliente = match.group(1).strip() if match else mensaje
-            if termino_cliente:
-                cliente = db.buscar_cliente_por_email_o_nombre(termino_cliente)
-                if cliente:
-                    respuesta = f"**Cliente Encontrado:**\n- **Nombre:** {cliente['nombre']}\n- **Email:** {cliente['email']}\n- **Región:** {cliente['region'] or 'N/A'}\n- **Pedidos:** {cliente['total_pedidos']}"
-                else:
-                    respuesta = f"No encontré al cliente '{termino_cliente}'."
-            else:
-                respuesta = "Dime el nombre o email del cliente que buscas."
-
-        elif intencion == "funciones" or "ayuda" in mensaje:
-            respuesta = (
-                "**Comandos de Administrador:**\n"
-                "* **'Exportar ventas'**: Descarga un reporte global de todas las ventas.\n"
-                "* **'Estadísticas'**: Muestra el resumen rápido del sistema.\n"
-                "* **'Total usuarios'**: Muestra el conteo total de usuarios registrados.\n"
-                "* **'Reporte de ventas hoy'**: Calcula los ingresos del día.\n"
-                "* **'Busca al cliente [dato]'**: Encuentra información de un cliente.\n"
-                "* **'Actualiza pedido [ID] a [estado]'**: Cambia estado (Ej: 'pedido 105 a Enviado').\n"
-                "* **'Predice stock de [producto]'**: Pronóstico de demanda."
-            )
-        else:
-            respuesta = "No entendí ese comando de Admin. Escribe 'ayuda' para ver las opciones."
-
-    # =================================================================
-    # 2. LÓGICA PARA VENDEDORES ('V')
-    # =================================================================
-    elif permisos == 'V':
-        if intencion == "saludo":
-            frases_vendedor = [
-                f"¡Hola, Vendedor **{nombre_usuario}**. ¿Listo para vender más hoy?",
-                f"Bienvenido a tu panel, **{nombre_usuario}**."
-            ]
-            respuesta = random.choice(frases_vendedor)
-        
-        elif intencion == "prediccion_stock":
-            palabras_a_quitar = ["predice stock de", "predice el stock de", "predice stock", "predicción de", "demanda de", "pronostica"]
-            termino_busqueda = mensaje
-            for frase in palabras_a_quitar:
-                if termino_busqueda.startswith(frase):
-                    termino_busqueda = termino_busqueda[len(frase):].strip() 
-                    break
-            
-            if not termino_busqueda:
-                respuesta = "Claro, dime el nombre de tu producto que quieres predecir. Ej: 'Predice el stock de AdoLuche'"
-            else: 
-                producto = db.find_product_id_by_name(termino_busqueda, id_vendedor=id_usuario) 
-                if not producto:
-                    respuesta = f"No encontré el producto '{termino_busqueda}' en tu inventario."
-                else:
-                    respuesta = f"Analizando la demanda de '{producto['nombre']}', por favor espera..."
-                    prediccion_resultado = db.get_prediction_data(producto['id_producto'])
-                    
-                    if prediccion_resultado["success"]:
-                        total_unidades = prediccion_resultado['total_forecast']
-                        respuesta = f"La demanda pronosticada para tu producto '{producto['nombre']}' en los próximos 30 días es de **{total_unidades} unidades**."
-                    else:
-                        respuesta = f"No pude predecir '{producto['nombre']}': {prediccion_resultado['error']}"
-        
-        elif intencion == "exportar_ventas":
-            respuesta = "Generando tu reporte de ventas seguro, dame un momento..."
-            resultado_url = db.generar_excel_ventas(id_usuario, base_url)
-            
-            if resultado_url == "empty":
-                respuesta = "Revisé tus registros y no encontré ventas pagadas o finalizadas para exportar."
-            elif resultado_url:
-                respuesta = f"¡Listo! He generado tu archivo Excel.<br><br><a href='{resultado_url}' target='_blank' style='color: #0d6efd; font-weight: bold;'>Descargar Reporte</a>"
-            else:
-                respuesta = "Hubo un error interno al generar el archivo. Por favor intenta más tarde."
-
-        elif intencion == "stats_admin" or intencion == "stock_admin" or "productos" in mensaje or "ventas" in mensaje:
-             conn = db.conectar_db()
-             sql_prod = "SELECT COUNT(*) as num_productos, SUM(stock) as total_stock FROM producto WHERE id_vendedor = %s"
-             cursor = conn.cursor(dictionary=True)
-             cursor.execute(sql_prod, (id_usuario,))
-             result_prod = cursor.fetchone()
-             num_productos = result_prod.get('num_productos') or 0
-             total_stock = result_prod.get('total_stock') or 0
-             
-             sql_ventas = "SELECT COUNT(DISTINCT p.id_pedido) as num_ventas, SUM(pp.cantidad * pp.precio_unitario) as total_revenue FROM producto pr JOIN pedidos_productos pp ON pr.id_producto = pp.id_producto JOIN pedidos p ON pp.id_pedido = p.id_pedido WHERE pr.id_vendedor = %s AND p.estado IN ('Pagado', 'Enviado', 'Entregado')"
-             cursor.execute(sql_ventas, (id_usuario,))
-             result_ventas = cursor.fetchone()
-             num_ventas = result_ventas.get('num_ventas') or 0
-             total_revenue = result_ventas.get('total_revenue') or 0
-             conn.close()
-
-             if "ventas" in mensaje:
-                 respuesta = f"Hasta ahora, has realizado <strong>{num_ventas}</strong> ventas, generando un total de <strong>${total_revenue:,.0f}</strong>."
-             else:
-                 respuesta = f"Actualmente tienes <strong>{num_productos}</strong> productos listados, con un stock total de <strong>{total_stock}</strong> unidades."
-        
-        elif intencion == "funciones" or "ayuda" in mensaje:
-            respuesta = (
-                "**Comandos de Vendedor:**\n"
-                "* **'Exportar ventas'**: Descarga un Excel seguro con tus transacciones.\n"
-                "* **'Mis ventas'**: Muestra el total de ventas e ingresos.\n"
-            )
-        else:
-            respuesta = "No entendí ese comando. Escribe 'ayuda' para ver tus opciones."
+@app.route("/predict_demand/batch", methods=["POST"])
+def predict_demand_batch():
+    """
+    Pronósticos de varios productos en una sola llamada.
+    Body: {"ids_productos": [1, 2, ...]} o {"id_vendedor": 5}; "motor" opcional.
+    Respuesta: {"resultados": {"1": {...}, "2": {...}}}, cada resultado con el
+    mismo formato que /predict_demand.
+    """
+    cuerpo, codigo = responder_prediccion_lote(request.json or {})
+    return jsonify(cuerpo), codigo
 
-    # =================================================================
-    # 3. LÓGICA PARA CLIENTES / INVITADOS ('U' o None)
-    # =================================================================
-    else:
-        if intencion == "prediccion_stock" or intencion == "exportar_ventas":
-            respuesta = "Lo siento, esa función es exclusiva para Vendedores y Administradores."
-            
-        elif not id_usuario and intencion in ["pedido", "solicitar_devolucion", "solicitar_notificacion", "actualizar_direccion"]:
-            respuesta = "Para esa función, primero debes **iniciar sesión** en tu cuenta."
-        
-        elif intencion == "saludo":
-            if id_usuario:
-                frases_cliente = [
-                    f"¡Hola de nuevo, **{nombre_usuario}**. ¿Buscas algo especial hoy?",
-                    f"Bienvenido a Bitware, **{nombre_usuario}**. ¿En qué te ayudo?"
-                ]
-                respuesta = random.choice(frases_cliente)
-            else:
-                frases_invitado = [
-                    "¡Hola! Bienvenido a Bitware. Inicia sesión para sacar el máximo provecho.",
-                    "¡Bienvenido! Soy tu asistente virtual. Escribe 'ayuda' para ver qué puedo hacer."
-                ]
-                respuesta = random.choice(frases_invitado)
-            
-        elif intencion == "funciones" or "ayuda" in mensaje:
-            respuesta_basica = (
-                "* **'Busca [producto]'**: Para encontrar productos (Ej: 'Busca RTX 3060').\n"
-                "* **'Compara [A] con [B]'**: Muestra una comparativa de precios.\n"
-                "* **'Horarios de atención'**: Muestra los horarios de la tienda.\n"
-                "* **'Soporte'**: Te indica cómo contactar a soporte técnico."
-            )
-            
-            if not id_usuario:
-                respuesta = (
-                    "**Hola, Invitado. Esto es lo que puedes hacer:**\n"
-                    f"{respuesta_basica}\n"
-                    "\n¡**Inicia sesión** para ver tu pedido, actualizar tu dirección y más!"
-                )
-            else:
-                respuesta = (
-                    f"**Hola, {nombre_usuario}. ¡Puedes pedirme todo esto!:**\n\n"
-                    "**SOBRE TUS PEDIDOS:**\n"
-                    "* **'Estado de mi pedido'**: Revisa dónde está tu última compra.\n"
-                    "* **'Quiero devolver [motivo]'**: Inicia una solicitud de devolución para tu último pedido.\n\n"
-                    "**SOBRE PRODUCTOS:**\n"
-                    "* **'Avísame de [producto]'**: Te notificaré cuando un producto vuelva a estar disponible.\n"
-                    f"{respuesta_basica}"
-                )
-        
-        elif intencion == "producto":
-            productos_recomendados = db.recomendar_productos()
-            respuesta = "¡Claro! Aquí tienes algunas recomendaciones:"
-
-        elif intencion == "busqueda_producto":
-            frases_activadoras = ["buscar producto", "busca producto", "encontrar producto"]
-            if mensaje in frases_activadoras:
-                respuesta = "¿Qué producto te gustaría buscar?"
-            else:
-                termino_busqueda = mensaje
-                palabras_clave_iniciales = ["busca", "búscame", "encuentra", "tienes", "precio de", "cotiza", "buscar", "quiero buscar"]
-                for palabra in palabras_clave_iniciales:
-                    if termino_busqueda.startswith(palabra + " "):
-                        termino_busqueda = termino_busqueda[len(palabra)+1:].strip()
-                        break 
-                if not termino_busqueda:
-                    respuesta = "¿Qué producto te gustaría buscar?"
-                else:
-                    productos_encontrados = db.buscar_productos_por_nombre(termino_busqueda)
-                    if productos_encontrados:
-                        respuesta = f"Encontré esto relacionado con **'{termino_busqueda}'**:"
-                        productos_recomendados = productos_encontrados
-                    else:
-                        respuesta = f"Lo siento, no encontré nada relacionado con **'{termino_busqueda}'**."
-        
-        elif intencion == "pedido":
-            pedido = db.estado_ultimo_pedido(id_usuario)
-            respuesta = f"Tu último pedido es el #{pedido['id_pedido']} y su estado es: **{pedido['estado']}**." if pedido else "Aún no tienes pedidos."
-        
-        elif intencion == "solicitar_devolucion":
-            check = db.solicitar_devolucion_db(id_usuario)
-            respuesta = check["mensaje"]
-        
-        elif intencion == "solicitar_notificacion":
-            match = re.search(r'(?:avísame de|notifícame de|disponible)\s(?:el|la)\s(.+)', mensaje)
-            producto_nombre = match.group(1).strip() if match else ""
-            respuesta = db.solicitar_notificacion_db(id_usuario, email_usuario, producto_nombre)
-        
-        elif intencion == "comparar_productos":
-            match = re.search(r'compara\s(.+)\s(?:con|y)\s(.+)', mensaje)
-            if match:
-                p1, p2 = match.groups()
-                respuesta = db.comparar_productos_db(p1.strip(), p2.strip())
-            else:
-                respuesta = "Dime los dos productos que quieres comparar. Ej: 'Compara RTX 3060 con RX 6600'."
-        
-        elif intencion == "actualizar_direccion":
-            match = re.search(r'dirección\s(?:a|es)\s(.+)', mensaje)
-            nueva_dir = match.group(1).strip() if match else ""
-            respuesta = db.actualizar_direccion_db(id_usuario, nueva_dir) if nueva_dir else "Dime cuál es tu nueva dirección. Ej: 'Actualizar mi dirección a Calle Falsa 123'."
+def responder_prediccion_lote(data):
+    ids_productos = data.get("ids_productos")
+    id_vendedor = data.get("id_vendedor")
+    motor = data.get("motor")
+    if not pronostico.motor_valido(motor):
+        return {"error": f"Motor desconocido: {motor}"}, 400
+    if ids_productos is None and id_vendedor:
+        ids_productos = db.productos_de_vendedor(id_vendedor)
+        if ids_productos is None:
+            return {"error": "No pude obtener los productos del vendedor"}, 500
+    if not isinstance(ids_productos, list):
+        return {"error": "Falta ids_productos (lista) o id_vendedor"}, 400
+    if not ids_productos:
+        return {"resultados": {}}, 200  # p. ej. un vendedor sin productos activos
+    try:
+        ids_productos = [int(pid) for pid in ids_productos]
+    except (TypeError, ValueError):
+        return {"error": "ids_productos debe contener solo números"}, 400
+    if len(ids_productos) > PREDICCION_MAX_LOTE:
+        return {"error": f"Máximo {PREDICCION_MAX_LOTE} productos por lote"}, 400
 
-        elif intencion == "horarios":
-            respuesta = "Nuestros horarios de atención son de **Lunes a Viernes de 9:00 a 18:00 hrs**."
-        
-        elif intencion == "pagos":
-            respuesta = "Aceptamos pagos a través de **Webpay (Tarjetas de Crédito/Débito)**"
-        
-        elif intencion == "soporte":
-            respuesta = "Para soporte técnico, visita nuestra sección de **Ayuda** o envíanos un mensaje desde **Soporte** en el pie de página."
-        
-        else:
-            respuesta = "Lo siento, no entendí. Puedes pedirme que **busque un producto** o que revise el **estado de tu pedido**."
+    resultados = db.get_prediction_data_batch(ids_productos, motor)
+    return {"resultados": {str(pid): r for pid, r in resultados.items()}}, 200
 
-    # ESTE ES EL ÚNICO RETURN QUE DEBE HABER AL FINAL
-    return jsonify({"respuesta": respuesta, "productos": productos_recomendados})
 
-if __name__ == "__main__":
-    print("--- 🚀 VERSION 3.1: CORRECCION BASE_DIR 🚀 ---")
-    print("--- INICIANDO CHATBOT BITWARE ---")
-    
+@app.route("/export_status/<job_id>", methods=["GET"])
+def export_status(job_id):
+    """
+    Estado de un trabajo de exportación: en_cola, procesando, listo (con url),
+    vacio o error, más el % de progreso.
+    """
+    estado = exportaciones.estado_trabajo(job_id)
+    if not estado:
+        return jsonify({"error": "Trabajo de exportación no encontrado"}), 404
+    return jsonify(estado)
+
+
+@app.route("/export_jobs", methods=["POST"])
+def export_jobs():
+    """
+    Uso interno (gunicorn.conf.py): el pool de chat encola aquí las
+    exportaciones para que el Excel se genere en el pool de tareas largas.
+    Body: {"id_vendedor", "base_url", "es_admin"}.
+    """
+    if request.remote_addr not in ("127.0.0.1", "::1"):
+        return jsonify({"error": "Solo se admite desde el mismo servidor"}), 403
+    data = request.json or {}
+    job_id = exportaciones.encolar_en_este_proceso(data.get("id_vendedor"), data.get("base_url", ""),
+                                                   es_admin=bool(data.get("es_admin")))
+    return jsonify({"job_id": job_id})
+
+
+@app.route("/cache_stats", methods=["GET"])
+def cache_stats():
+    """
+    Aciertos y fallos de las cachés en memoria de este proceso: contexto de
+    sesión (por campo), clasificador de intenciones (y uso del enrutador de
+    comandos) y métricas del admin.
+    """
+    return jsonify({
+        "sesiones": sesiones.estadisticas(),
+        "nlp": nlp.estadisticas_cache(),
+        "enrutador": nlp.estadisticas_enrutador(),
+        "metricas_admin": db.estadisticas_cache_metricas(),
+    })
+
+
+@app.route("/pool_stats", methods=["GET"])
+def pool_stats():
+    """
+    Conexiones a MySQL de este proceso (un solo pool, también para pandas):
+    tamaño, en uso, esperas (cantidad, media y máxima), préstamos (y cuántos
+    pidió pandas), agotamientos y posibles fugas.
+    """
+    return jsonify(db.estadisticas_pool())
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Latencias y contadores de este proceso en formato Prometheus.
+    """
+    return medicion.exponer(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+
+@app.route("/chat", methods=["POST"])
+def chat():
+    cuerpo, codigo = responder_chat(request.json)
+    return jsonify(cuerpo), codigo
+
+def responder_chat(data):
+    inicio = time.perf_counter()
+    mensaje = data.get("message", "").lower()
+    intencion, datos = nlp.interpretar(mensaje)
+    # La respuesta según (rol, intención) está en las tablas de manejadores.py
+    rol, resultado = manejadores.responder(data, mensaje, intencion, datos)
+    medicion.chat_segundos.observar(time.perf_counter() - inicio, intencion, rol)
+    return resultado, 200
+
+def buscar_certificados():
+    """
+    Devuelve (cert, key) del primer par de certificados encontrado, o None.
+    """
     # 1. Definir posibles ubicaciones de certificados
     #    Prioridad 1: Carpeta local 'certs' (Solución para permisos de usuario)
     #    Prioridad 2: Ruta estándar de Let's Encrypt (Solo funciona si es root)
@@ -378,7 +223,6 @@ if __name__ == "__main__":
     ]
 
     context = None
-    ssl_encontrado = False
 
     for ruta in posibles_rutas:
         c_path = ruta['cert']
@@ -393,10 +237,17 @@ if __name__ == "__main__":
         if os.path.exists(c_path) and os.path.exists(k_path):
             print(f"✅ Certificados encontrados en: {ruta['desc']}")
             context = (c_path, k_path)
-            ssl_encontrado = True
             break
         else:
             print(f"❌ No encontrados en: {ruta['desc']}")
+    return context
+
+if __name__ == "__main__":
+    print("--- 🚀 VERSION 3.1: CORRECCION BASE_DIR 🚀 ---")
+    print("--- INICIANDO CHATBOT BITWARE ---")
+    
+    context = buscar_certificados()
+    ssl_encontrado = context is not None
 
     # 2. Iniciar Servidor
     if ssl_encontrado and context:
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Modo ASGI del chatbot (asyncio), alternativo al servidor Flask de app.py.
+
+Mismas rutas y mismo contrato JSON que app.py; cambia cómo se espera:
+- /chat: siempre se responde en un pool de hilos acotado (ASGI_HILOS_IO)
+  con las funciones síncronas de siempre (mysql.connector, bloqueante).
+  El driver asíncrono (db_async.py) es solo una precarga para dos
+  intenciones de clientes, el último pedido y la elegibilidad de
+  devolución: esa consulta se espera sin ocupar un hilo y el hilo solo arma
+  la respuesta. Todas las demás consultas del chat ocupan un hilo.
+- /predict_demand y /predict_demand/batch: el ajuste de modelos es CPU y
+  corre en el pool de procesos de worker_predicciones.py; el hilo solo
+  espera, sin retener el GIL. Los Excel se escriben en un proceso aparte
+  (EXPORT_EN_PROCESOS, que este módulo activa).
+- Cualquier otra ruta (/export_status, /cache_stats, archivos de static/,
+  preflight CORS) la atiende la aplicación Flask en un hilo.
+
+Uso (requiere uvicorn y aiomysql):
+    python asgi.py            # puerto 5000, busca los certificados como app.py
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 \\
+        --ssl-certfile certs/fullchain.pem --ssl-keyfile certs/privkey.pem
+"""
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# Antes de importar config: trabajos_exportacion.py lo lee al importarse
+os.environ.setdefault("EXPORT_EN_PROCESOS", "True")
+
+from config import ASGI_HILOS_IO
+import app as app_flask
+import db_async
+import metricas
+import nlp_engine as nlp
+import worker_predicciones
+
+_ejecutor_io = ThreadPoolExecutor(max_workers=ASGI_HILOS_IO, thread_name_prefix="asgi_io")
+
+# Intenciones de clientes con sesión que se responden con una precarga asíncrona
+PRECARGAS = {
+    "pedido": db_async.precargar_ultimo_pedido,
+    "solicitar_devolucion": db_async.precargar_devolucion,
+}
+
+# ======================================================================
+# RUTAS
+# ======================================================================
+
+async def _en_hilo(ejecutor, funcion, *args):
+    return await asyncio.get_running_loop().run_in_executor(ejecutor, funcion, *args)
+
+async def _chat(datos):
+    mensaje = datos.get("message", "").lower()
+    precarga = None
+    if datos.get("permisos") not in ("A", "V") and datos.get("userId"):
+        precarga = PRECARGAS.get(nlp.clasificar_intencion(mensaje))
+    if precarga:
+        # La espera a MySQL ocurre aquí, sin ocupar un hilo; responder_chat
+        # encuentra después el dato en sesión. Igual va al pool de hilos: la
+        # entrada puede expirar o ser desalojada antes y entonces consulta la BD
+        await precarga(datos.get("userId"))
+    return await _en_hilo(_ejecutor_io, app_flask.responder_chat, datos)
+
+async def _prediccion(datos):
+    return await _en_hilo(_ejecutor_io, app_flask.responder_prediccion, datos,
+                          worker_predicciones.predecir_en_proceso)
+
+async def _prediccion_lote(datos):
+    # get_prediction_data_batch ya ajusta en el pool de procesos (ajustar_en_paralelo)
+    return await _en_hilo(_ejecutor_io, app_flask.responder_prediccion_lote, datos)
+
+RUTAS = {
+    ("POST", "/chat"): _chat,
+    ("POST", "/predict_demand"): _prediccion,
+    ("POST", "/predict_demand/batch"): _prediccion_lote,
+}
+
+# ======================================================================
+# PROTOCOLO ASGI
+# ======================================================================
+
+async def _leer_cuerpo(receive):
+    partes = []
+    while True:
+        mensaje = await receive()
+        partes.append(mensaje.get("body", b""))
+        if not mensaje.get("more_body"):
+            return b"".join(partes)
+
+async def _enviar(send, codigo, cabeceras, contenido):
+    await send({"type": "http.response.start", "status": codigo, "headers": cabeceras})
+    await send({"type": "http.response.body", "body": contenido})
+
+async def _enviar_json(send, cuerpo, codigo):
+    # Misma serialización que jsonify (fechas, Decimal, claves ordenadas)
+    contenido = app_flask.app.json.dumps(cuerpo, separators=(",", ":")).encode("utf-8")
+    await _enviar(send, codigo, [(b"content-type", b"application/json"),
+                                 (b"access-control-allow-origin", b"*")], contenido)
+
+def _environ(scope, cuerpo):
+    servidor = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": servidor[0],
+        "SERVER_PORT": str(servidor[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(cuerpo),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for nombre, valor in scope.get("headers", []):
+        nombre, valor = nombre.decode("latin-1").upper().replace("-", "_"), valor.decode("latin-1")
+        if nombre in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            environ[nombre] = valor
+        else:
+            clave = f"HTTP_{nombre}"
+            environ[clave] = f"{environ[clave]},{valor}" if clave in environ else valor
+    return environ
+
+def _llamar_flask(environ):
+    respuesta = {}
+    def start_response(estado, cabeceras, exc_info=None):
+        respuesta["codigo"], respuesta["cabeceras"] = int(estado.split()[0]), cabeceras
+    iterable = app_flask.app(environ, start_response)
+    try:
+        contenido = b"".join(iterable)
+    finally:
+        if hasattr(iterable, "close"): iterable.close()
+    cabeceras = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in respuesta["cabeceras"]]
+    return respuesta["codigo"], cabeceras, contenido
+
+async def _ciclo_de_vida(receive, send):
+    while True:
+        mensaje = await receive()
+        if mensaje["type"] == "lifespan.startup":
+            await db_async.iniciar()
+            await send({"type": "lifespan.startup.complete"})
+        elif mensaje["type"] == "lifespan.shutdown":
+            await db_async.cerrar()
+            _ejecutor_io.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _ciclo_de_vida(receive, send)
+    if scope["type"] != "http":
+        return
+    cuerpo = await _leer_cuerpo(receive)
+    ruta = RUTAS.get((scope["method"], scope["path"]))
+    if ruta is None:
+        await _enviar(send, *await _en_hilo(_ejecutor_io, _llamar_flask, _environ(scope, cuerpo)))
+        return
+    inicio = time.perf_counter()
+    try:
+        datos = json.loads(cuerpo)
+    except ValueError:
+        return await _enviar_json(send, {"error": "El cuerpo debe ser JSON"}, 400)
+    try:
+        respuesta, codigo = await ruta(datos)
+    except Exception:
+        traceback.print_exc()
+        respuesta, codigo = {"error": "Error interno del servidor"}, 500
+    await _enviar_json(send, respuesta, codigo)
+    # Las rutas Flask se miden en app.py; aquí solo las nativas
+    metricas.http_segundos.observar(time.perf_counter() - inicio, scope["path"], "POST")
+    metricas.http_peticiones.incrementar(scope["path"], codigo)
+
+if __name__ == "__main__":
+    import uvicorn
+    print("--- INICIANDO CHATBOT BITWARE (ASGI) ---")
+    certificados = app_flask.buscar_certificados()
+    if certificados:
+        print("🔒 Iniciando servidor en MODO SEGURO (HTTPS)...")
+        uvicorn.run(app, host="0.0.0.0", port=5000, ssl_certfile=certificados[0], ssl_keyfile=certificados[1])
+    else:
+        print("🔓 Iniciando servidor en MODO INSEGURO (HTTP)...")
+        uvicorn.run(app, host="0.0.0.0", port=5000)
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la búsqueda de productos del chat sobre un catálogo sintético.
+
+Compara:
+- ranking: catalogo.buscar_ranking (BM25 + errores de tipeo, índice en memoria).
+- like_memoria: catalogo.buscar, la semántica LIKE sobre el mismo índice.
+- like_sql: la consulta LIKE '%término%' de siempre, ejecutada en SQLite en
+  memoria (escaneo completo como en MySQL, pero sin red; es una cota inferior
+  del costo real).
+
+Las consultas son las últimas palabras del nombre de productos al azar;
+la mitad lleva un error de tipeo. "acierto@3" indica si el producto buscado
+aparece entre los 3 primeros resultados.
+
+Uso:
+    python benchmarks/bench_busqueda.py
+    python benchmarks/bench_busqueda.py --productos 100000 --consultas 500 --json resultados.json
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import catalogo  # noqa: E402
+
+LINEAS = {
+    "Tarjetas Gráficas": [("NVIDIA", "GeForce RTX", ["3050", "3060", "4060", "4070", "4080", "4090"]),
+                          ("AMD", "Radeon RX", ["6600", "6700", "7600", "7800", "7900"])],
+    "Procesadores": [("AMD", "Ryzen", ["5 5600X", "7 5800X", "7 7700X", "9 7950X"]),
+                     ("Intel", "Core", ["i5 12400", "i7 13700K", "i9 14900K"])],
+    "Memorias RAM": [("Kingston", "Fury Beast", ["16GB DDR4", "32GB DDR5"]),
+                     ("Corsair", "Vengeance", ["16GB DDR4", "32GB DDR5", "64GB DDR5"])],
+    "Almacenamiento": [("Samsung", "SSD", ["970 EVO 1TB", "990 PRO 2TB"]),
+                       ("Western Digital", "Disco", ["Blue 2TB", "Black SN850X 1TB"])],
+    "Periféricos": [("Logitech", "Ratón", ["G203", "G502 Hero", "MX Master 3S"]),
+                    ("Redragon", "Teclado Mecánico", ["Kumara", "Fizz", "Draconic"])],
+}
+VARIANTES = ["OC", "Gaming", "Pro", "Edición Blanca", "V2", "Ultra", "Mini", "Plus", "Twin", "Elite"]
+DESCRIPCIONES = ["Ideal para juegos y creación de contenido.", "Excelente relación precio rendimiento.",
+                 "Garantía de 3 años.", "Diseño compacto con iluminación RGB.", "Alto rendimiento y bajo consumo."]
+
+def generar_catalogo(cantidad, semilla):
+    rng = random.Random(semilla)
+    filas = []
+    for pid in range(1, cantidad + 1):
+        categoria = rng.choice(list(LINEAS))
+        marca, linea, modelos = rng.choice(LINEAS[categoria])
+        modelo = rng.choice(modelos)
+        nombre = f"{marca} {linea} {modelo} {rng.choice(VARIANTES)} {pid}"
+        filas.append({"id_producto": pid, "nombre": nombre, "precio": float(rng.randint(10, 2000) * 1000),
+                      "imagen_principal": None, "stock": rng.randint(0, 50), "categoria": categoria,
+                      "descripcion": " ".join(rng.sample(DESCRIPCIONES, 2)),
+                      "id_vendedor": rng.randint(1, 50), "activo": 1 if rng.random() > 0.05 else 0})
+    return filas
+
+def con_error(palabra, rng):
+    if len(palabra) < 4:
+        return palabra
+    i = rng.randrange(1, len(palabra) - 1)
+    return palabra[:i] + palabra[i + 1] + palabra[i] + palabra[i + 2:]  # transposición
+
+def generar_consultas(filas, cantidad, semilla):
+    rng = random.Random(semilla)
+    consultas = []
+    for _ in range(cantidad):
+        fila = rng.choice([f for f in filas[:5000] if f["activo"]])
+        # Últimas 3 palabras del nombre, contiguas (las encuentra el LIKE); terminan
+        # en el id, que hace única la respuesta esperada
+        termino = " ".join(fila["nombre"].split()[-3:])
+        if rng.random() < 0.5:
+            termino = " ".join(con_error(p, rng) if p.isalpha() else p for p in termino.split())
+        consultas.append((termino, fila["id_producto"]))
+    return consultas
+
+def medir(buscar, consultas):
+    tiempos, aciertos = [], 0
+    for termino, esperado in consultas:
+        inicio = time.perf_counter()
+        ids = buscar(termino)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        aciertos += esperado in ids
+    tiempos.sort()
+    return {"p50_ms": round(statistics.median(tiempos), 3), "p95_ms": round(tiempos[int(len(tiempos) * 0.95)], 3),
+            "acierto_at3": round(aciertos / len(consultas), 3)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--productos", type=int, default=100000)
+    parser.add_argument("--consultas", type=int, default=300)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--json", help="Guarda los resultados en este archivo")
+    args = parser.parse_args()
+
+    filas = generar_catalogo(args.productos, args.semilla)
+    consultas = generar_consultas(filas, args.consultas, args.semilla)
+
+    inicio = time.perf_counter()
+    with catalogo._lock:
+        for fila in filas:
+            catalogo._indexar(dict(fila))
+        catalogo._reconstruir_derivados()
+    segundos_indice = time.perf_counter() - inicio
+
+    sql = sqlite3.connect(":memory:")
+    sql.execute("CREATE TABLE producto (id_producto INTEGER PRIMARY KEY, nombre TEXT, precio REAL, "
+                "imagen_principal TEXT, categoria TEXT, activo INTEGER)")
+    sql.executemany("INSERT INTO producto VALUES (?, ?, ?, ?, ?, ?)",
+                    [(f["id_producto"], f["nombre"], f["precio"], f["imagen_principal"], f["categoria"], f["activo"])
+                     for f in filas])
+
+    def like_sql(termino):
+        patron = f"%{termino}%"
+        return [r[0] for r in sql.execute("SELECT id_producto, nombre, precio, imagen_principal FROM producto "
+                                          "WHERE (nombre LIKE ? OR categoria LIKE ?) AND activo = 1 LIMIT 3",
+                                          (patron, patron))]
+
+    def ranking(termino):
+        return [p["id_producto"] for p in catalogo.buscar_ranking(termino, limite=3, solo_activos=True)]
+
+    resultados = {
+        "productos": args.productos,
+        "consultas": len(consultas),
+        "segundos_indice": round(segundos_indice, 2),
+        # Primera pasada: incluye compilar las puntuaciones de cada token; segunda: ya compiladas
+        "ranking_frio": medir(ranking, consultas),
+        "ranking": medir(ranking, consultas),
+        "like_memoria": medir(lambda t: [p["id_producto"] for p in catalogo.buscar(t, campos=("nombre", "categoria"),
+                                                                                  limite=3, solo_activos=True)],
+                              consultas),
+        "like_sql": medir(like_sql, consultas),
+    }
+
+    print(f"Catálogo: {args.productos} productos, índice construido en {resultados['segundos_indice']} s")
+    for variante in ("ranking_frio", "ranking", "like_memoria", "like_sql"):
+        r = resultados[variante]
+        print(f"{variante:>13}: p50 {r['p50_ms']} ms, p95 {r['p95_ms']} ms, acierto@3 {r['acierto_at3']:.0%}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
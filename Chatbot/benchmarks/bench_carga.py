@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Prueba de carga de /chat: servidor Flask (app.py) frente al modo ASGI (asgi.py).
+
+Cada nivel de concurrencia lanza N clientes simultáneos que envían mensajes
+de chat (mezcla de invitados y clientes con sesión: saludo, último pedido,
+devolución, búsqueda) hasta completar --peticiones. Cada petición abre su
+propia conexión (Connection: close), igual para ambos servidores. Reporta
+peticiones/s, latencia p50/p99 y errores.
+
+Con --iniciar levanta los servidores en puertos locales (Flask con
+threaded=True, como app.py; ASGI con uvicorn). Si no, mide las URLs dadas.
+Para 1000 clientes puede hacer falta subir el límite de archivos abiertos
+(ulimit -n 4096).
+
+Uso:
+    python benchmarks/bench_carga.py --iniciar
+    python benchmarks/bench_carga.py --url flask=http://127.0.0.1:5001 --url asgi=http://127.0.0.1:5002 \\
+        --concurrencia 100 1000 --peticiones 5000 --json carga.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import ssl
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+DIR_CHATBOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MENSAJES = [
+    ("hola", False),
+    ("busca rtx 4060", False),
+    ("horarios de atención", False),
+    ("dónde está mi pedido", True),
+    ("estado de mi pedido", True),
+    ("quiero devolver un producto", True),
+]
+
+def _carga(rng, usuarios):
+    mensaje, con_sesion = rng.choice(MENSAJES)
+    datos = {"message": mensaje, "permisos": "U" if con_sesion else None,
+             "userId": rng.randint(1, usuarios) if con_sesion else None,
+             "email_usuario": "", "nombre_usuario": "Carga"}
+    return json.dumps(datos).encode("utf-8")
+
+async def post(url, ruta, cuerpo, contexto_ssl):
+    lector, escritor = await asyncio.open_connection(url.hostname, url.port, ssl=contexto_ssl)
+    try:
+        escritor.write(f"POST {ruta} HTTP/1.1\r\nHost: {url.hostname}\r\nContent-Type: application/json\r\n"
+                       f"Content-Length: {len(cuerpo)}\r\nConnection: close\r\n\r\n".encode("latin-1") + cuerpo)
+        await escritor.drain()
+        respuesta = await lector.read()
+        return int(respuesta.split(b" ", 2)[1])
+    finally:
+        escritor.close()
+
+async def _nivel(url, concurrencia, peticiones, usuarios, semilla, timeout):
+    contexto_ssl = None
+    if url.scheme == "https":
+        contexto_ssl = ssl.create_default_context()
+        contexto_ssl.check_hostname, contexto_ssl.verify_mode = False, ssl.CERT_NONE
+    latencias, errores = [], 0
+    restantes = peticiones
+
+    async def cliente(i):
+        nonlocal restantes, errores
+        rng = random.Random(semilla + i)
+        while restantes > 0:
+            restantes -= 1
+            inicio = time.perf_counter()
+            try:
+                codigo = await asyncio.wait_for(post(url, "/chat", _carga(rng, usuarios), contexto_ssl), timeout)
+                if codigo != 200:
+                    errores += 1
+                    continue
+            except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+                errores += 1
+                continue
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(i) for i in range(concurrencia)))
+    segundos = time.perf_counter() - inicio
+    latencias.sort()
+    return {
+        "concurrencia": concurrencia,
+        "peticiones": peticiones,
+        "errores": errores,
+        "peticiones_por_seg": round(len(latencias) / segundos, 1),
+        "p50_ms": round(statistics.median(latencias), 1) if latencias else None,
+        "p99_ms": round(latencias[int(len(latencias) * 0.99)], 1) if latencias else None,
+    }
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def esperar_puerto(puerto, proceso, segundos=60):
+    limite = time.time() + segundos
+    while time.time() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f"El servidor terminó al iniciar (código {proceso.returncode})")
+        try:
+            socket.create_connection(("127.0.0.1", puerto), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"El servidor no abrió el puerto {puerto}")
+
+def iniciar_servidores():
+    """
+    Levanta Flask y ASGI en puertos libres. Devuelve ({nombre: url}, procesos).
+    """
+    comandos = {
+        "flask": lambda p: [sys.executable, "-c",
+                            f"import app; app.app.run(host='127.0.0.1', port={p}, threaded=True)"],
+        "asgi": lambda p: [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1",
+                           "--port", str(p), "--log-level", "warning"],
+    }
+    urls, procesos = {}, []
+    for nombre, comando in comandos.items():
+        puerto = puerto_libre()
+        proceso = subprocess.Popen(comando(puerto), cwd=DIR_CHATBOT, stdout=subprocess.DEVNULL)
+        procesos.append(proceso)
+        esperar_puerto(puerto, proceso)
+        urls[nombre] = f"http://127.0.0.1:{puerto}"
+    return urls, procesos
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", action="append", default=[], help="nombre=url del servidor a medir (repetible)")
+    parser.add_argument("--iniciar", action="store_true", help="Levanta Flask y ASGI en puertos locales")
+    parser.add_argument("--concurrencia", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--peticiones", type=int, default=5000, help="Peticiones por nivel de concurrencia")
+    parser.add_argument("--usuarios", type=int, default=1000, help="userId distintos de los clientes con sesión")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Segundos máximos por petición")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--json", help="Guarda los resultados en este archivo")
+    args = parser.parse_args()
+
+    urls, procesos = dict(u.split("=", 1) for u in args.url), []
+    if args.iniciar:
+        iniciados, procesos = iniciar_servidores()
+        urls.update(iniciados)
+    if not urls:
+        parser.error("Indica al menos un --url nombre=url o usa --iniciar")
+
+    resultados = {}
+    try:
+        for nombre, url in urls.items():
+            resultados[nombre] = []
+            for concurrencia in args.concurrencia:
+                r = asyncio.run(_nivel(urlsplit(url), concurrencia, args.peticiones, args.usuarios,
+                                       args.semilla, args.timeout))
+                resultados[nombre].append(r)
+                print(f"{nombre:>6} c={concurrencia:<5} {r['peticiones_por_seg']:>8} pet/s  "
+                      f"p50 {r['p50_ms']} ms  p99 {r['p99_ms']} ms  errores {r['errores']}")
+    finally:
+        for proceso in procesos:
+            proceso.terminate()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
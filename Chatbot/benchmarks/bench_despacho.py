@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Microbenchmark del despacho de mensajes del chat: tablas (rol, intención) ->
+manejador de manejadores.py frente a la cadena if/elif de responder_chat
+en una versión anterior de app.py (leída de git).
+
+Las funciones de database.py y la cola de exportaciones se reemplazan por
+respuestas fijas, la clasificación por un diccionario precalculado con la
+salida de nlp_engine.interpretar y la métrica del chat por una función
+vacía, así que se mide el costo de elegir y armar la respuesta (la caché
+LRU y el histograma, con sus locks, meten más ruido que el despacho mismo).
+A cada tiempo se le resta la base común a ambas versiones (esas dos
+llamadas) para reportar el despacho por sí solo.
+Se prueban mensajes de las 19 intenciones con los 4 roles y se comprueba
+que ambas versiones respondan lo mismo.
+
+Uso:
+    python benchmarks/bench_despacho.py
+    python benchmarks/bench_despacho.py --revision 0ff9adb --rondas 15 --json resultados.json
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import types
+
+DIR_CHATBOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DIR_CHATBOT)
+import app  # noqa: E402
+import database as db  # noqa: E402
+import metricas as medicion  # noqa: E402
+import nlp_engine as nlp  # noqa: E402
+import trabajos_exportacion as exportaciones  # noqa: E402
+
+# Al menos un mensaje por intención, con y sin datos que extraer
+MENSAJES = [
+    "hola", "recomiéndame algo", "mi pedido", "soporte", "necesito ayuda con mis ventas", "funciones",
+    "busca rtx 3060", "buscar producto", "quiero devolver mi pedido",
+    "cuando vuelve a estar disponible la rtx 4090", "compara rtx 3060 con rx 6600", "actualizar mi dirección a calle falsa 123", "estadísticas",
+    "total usuarios", "reporte de ventas hoy", "stock de ram ddr5", "busca al cliente juan",
+    "actualiza el pedido 105 a enviado", "análisis de crecimiento", "predice el stock de rtx 3060",
+    "horarios de atención", "métodos de pago", "exportar ventas",
+]
+USUARIOS = {
+    "admin": {"permisos": "A", "userId": 1, "nombre_usuario": "Ana", "email_usuario": "ana@bitware.site"},
+    "vendedor": {"permisos": "V", "userId": 2, "nombre_usuario": "Vico", "email_usuario": "vico@bitware.site"},
+    "cliente": {"permisos": "U", "userId": 3, "nombre_usuario": "Cata", "email_usuario": "cata@bitware.site"},
+    "invitado": {},
+}
+
+def _fijo(nombre, valor=None):
+    # Devuelve 'valor' o, si es None, un texto con los argumentos (para comparar versiones)
+    return lambda *args, **kwargs: valor if valor is not None else f"{nombre}{args}{kwargs}"
+
+FALSOS = {
+    "get_proactive_alerts": _fijo("alertas", ""),
+    "find_product_id_by_name": lambda termino, **kw: {"id_producto": 7, "nombre": termino},
+    "get_prediction_data": _fijo("prediccion", {"success": True, "total_forecast": 42}),
+    "obtener_metricas_admin": _fijo("metricas", {"total_usuarios": 120, "ventas_hoy": 990000}),
+    "obtener_estadisticas_admin": _fijo("stats", {"nuevos_mensajes": 3, "servicios_pendientes": 1,
+                                                  "bajo_stock": 4}),
+    "cambiar_estado_pedido_db": _fijo("cambiar_estado_pedido_db"),
+    "get_category_growth_analysis": _fijo("get_category_growth_analysis"),
+    "buscar_cliente_por_email_o_nombre": lambda termino: {"nombre": termino, "email": "x@y.cl", "region": None,
+                                                          "total_pedidos": 2},
+    "estadisticas_vendedor": _fijo("vendedor", {"num_productos": 5, "total_stock": 80, "num_ventas": 9,
+                                                "total_revenue": 123456}),
+    "recomendar_productos": lambda id_usuario=None, limite=3: [{"id": 1, "usuario": id_usuario}],
+    "buscar_productos_por_nombre": lambda termino: [{"id": 2, "nombre": termino}],
+    "estado_ultimo_pedido": _fijo("pedido", {"id_pedido": 33, "estado": "Enviado"}),
+    "solicitar_devolucion_db": _fijo("devolucion", {"mensaje": "Devolución registrada."}),
+    "solicitar_notificacion_db": _fijo("solicitar_notificacion_db"),
+    "comparar_productos_db": _fijo("comparar_productos_db"),
+    "actualizar_direccion_db": _fijo("actualizar_direccion_db"),
+}
+
+def reemplazar_dependencias():
+    for nombre, falso in FALSOS.items():
+        setattr(db, nombre, falso)
+    exportaciones.encolar_exportacion = lambda id_usuario, base_url, es_admin=False: f"trabajo{id_usuario}{es_admin}"
+    clasificados = {m: nlp.interpretar(m) for m in MENSAJES}
+
+    def interpretar(mensaje):
+        intencion, datos = clasificados[mensaje]
+        return intencion, dict(datos)
+    nlp.interpretar = interpretar
+    medicion.chat_segundos.observar = lambda segundos, *etiquetas: None
+
+def revision_anterior():
+    """
+    Padre del commit que agregó manejadores.py, o HEAD si aún no está en git.
+    """
+    agregado = subprocess.run(["git", "log", "--diff-filter=A", "--format=%H", "--", "manejadores.py"],
+                              cwd=DIR_CHATBOT, capture_output=True, text=True).stdout.split()
+    return f"{agregado[-1]}^" if agregado else "HEAD"
+
+def cargar_app(revision):
+    """
+    app.py de esa revisión como módulo aparte (comparte database, nlp_engine, etc.).
+    """
+    fuente = subprocess.run(["git", "show", f"{revision}:Chatbot/app.py"], cwd=DIR_CHATBOT,
+                            capture_output=True, text=True, check=True).stdout
+    modulo = types.ModuleType("app_anterior")
+    modulo.__file__ = os.path.join(DIR_CHATBOT, "app.py")
+    exec(compile(fuente, f"{revision}:app.py", "exec"), modulo.__dict__)
+    return modulo
+
+def casos():
+    return [(rol, dict(usuario, message=mensaje)) for rol, usuario in USUARIOS.items() for mensaje in MENSAJES]
+
+def comparar(anterior, actual):
+    diferencias = []
+    for rol, data in casos():
+        random.seed(0)
+        antes = anterior(data)[0]
+        random.seed(0)
+        despues = actual(data)[0]
+        if antes != despues:
+            diferencias.append({"rol": rol, "mensaje": data["message"], "antes": antes, "despues": despues})
+    return diferencias
+
+def base(data):
+    # Lo que ambas versiones hacen igual antes y después de despachar
+    inicio = time.perf_counter()
+    intencion, _ = nlp.interpretar(data.get("message", "").lower())
+    medicion.chat_segundos.observar(time.perf_counter() - inicio, intencion, "base")
+
+def medir(variantes, repeticiones, rondas):
+    """
+    µs por mensaje de cada variante, por intención y en total (media sobre
+    todos los casos). Cada caso se mide 'rondas' veces alternando las
+    variantes y se toma el mínimo, para que el ruido de la máquina no
+    favorezca a ninguna.
+    """
+    por_intencion = {nombre: {} for nombre in variantes}
+    for _, data in casos():
+        intencion = nlp.interpretar(data["message"])[0]
+        minimos = dict.fromkeys(variantes, float("inf"))
+        for _ in range(rondas):
+            for nombre, responder in variantes.items():
+                inicio = time.perf_counter()
+                for _ in range(repeticiones):
+                    responder(data)
+                minimos[nombre] = min(minimos[nombre], (time.perf_counter() - inicio) / repeticiones * 1e6)
+        for nombre, us in minimos.items():
+            por_intencion[nombre].setdefault(intencion, []).append(us)
+    resultados = {}
+    for nombre, tiempos in por_intencion.items():
+        total = [t for lista in tiempos.values() for t in lista]
+        resultados[nombre] = {
+            "us_por_mensaje": round(sum(total) / len(total), 2),
+            "por_intencion": {i: round(sum(t) / len(t), 2) for i, t in sorted(tiempos.items())},
+        }
+    return resultados
+
+def despacho(medido, comun):
+    return {
+        "us_por_mensaje": round(medido["us_por_mensaje"] - comun["us_por_mensaje"], 2),
+        "por_intencion": {i: round(us - comun["por_intencion"][i], 2) for i, us in medido["por_intencion"].items()},
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--revision", help="Revisión de git con la cadena if/elif (por defecto, la anterior "
+                                           "a manejadores.py)")
+    parser.add_argument("--repeticiones", type=int, default=500, help="Veces que se responde cada caso por ronda")
+    parser.add_argument("--rondas", type=int, default=7, help="Rondas por caso (se toma la más rápida)")
+    parser.add_argument("--json", help="Guarda los resultados en este archivo")
+    args = parser.parse_args()
+
+    revision = args.revision or revision_anterior()
+    anterior = cargar_app(revision)
+    intenciones = {nlp.clasificar_intencion(m) for m in MENSAJES}
+    reemplazar_dependencias()
+
+    diferencias = comparar(anterior.responder_chat, app.responder_chat)
+    medido = medir({"base": base, "if_elif": anterior.responder_chat, "tablas": app.responder_chat},
+                   args.repeticiones, args.rondas)
+    resultados = {
+        "revision_anterior": revision,
+        "casos": len(casos()),
+        "intenciones": len(intenciones),
+        "diferencias": diferencias,
+        "medido": medido,
+        "if_elif": despacho(medido["if_elif"], medido["base"]),
+        "tablas": despacho(medido["tablas"], medido["base"]),
+    }
+
+    print(f"{resultados['casos']} casos ({resultados['intenciones']} intenciones x {len(USUARIOS)} roles), "
+          f"{len(diferencias)} respuestas distintas")
+    for diferencia in diferencias:
+        print(f"  ≠ [{diferencia['rol']}] {diferencia['mensaje']!r}: {diferencia['antes']} | {diferencia['despues']}")
+    antes, despues = resultados["if_elif"], resultados["tablas"]
+    print(f"Despacho (sin la base común de {medido['base']['us_por_mensaje']} µs/mensaje):")
+    print(f"{'intención':>24} {'if/elif µs':>11} {'tablas µs':>10}")
+    for intencion, us in antes["por_intencion"].items():
+        print(f"{intencion:>24} {us:>11} {despues['por_intencion'][intencion]:>10}")
+    print(f"{'total':>24} {antes['us_por_mensaje']:>11} {despues['us_por_mensaje']:>10}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la exportación de ventas a Excel: modo en memoria (DataFrame +
+ExcelWriter + reapertura con openpyxl) contra modo streaming (write-only,
+una sola pasada).
+
+Cada medición corre en un proceso aparte para que el pico de memoria (RSS)
+de una no contamine a la siguiente. Las filas son sintéticas y llegan por
+lotes, igual que desde el cursor del lado del servidor.
+
+Uso:
+    python benchmarks/bench_exportacion.py
+    python benchmarks/bench_exportacion.py --tamanos 10000 100000 --json resultados.json
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COLUMNAS = ['Fecha', 'ID Pedido', 'Producto', 'Categoria', 'Cantidad', 'Precio Unitario', 'Total Venta',
+            'Estado Pedido', 'Cliente', 'Email Cliente', 'Region', 'ID Vendedor']
+CATEGORIAS = ['procesadores', 'tarjetas de video', 'memorias', 'almacenamiento', 'perifericos']
+REGIONES = ['Metropolitana', 'Valparaíso', 'Biobío', 'Maule', 'Araucanía', 'Los Lagos', 'Ñuble', 'Coquimbo']
+ESTADOS = ['Pagado', 'Enviado', 'Entregado']
+
+def generar_lotes(total, tamano_lote=5000):
+    inicio = date(2022, 1, 1)
+    for base in range(0, total, tamano_lote):
+        lote = []
+        for i in range(base, min(base + tamano_lote, total)):
+            cantidad = 1 + i % 3
+            precio = Decimal(10000 + (i * 7919) % 500000)
+            lote.append((inicio + timedelta(days=(i // 40) % 1400), 1 + i // 2, f"Producto {i % 2000}",
+                         CATEGORIAS[i % 5], cantidad, precio, cantidad * precio, ESTADOS[i % 3],
+                         f"Cliente {i % 50000}", f"cliente{i % 50000}@correo.cl", REGIONES[i % 8], 1 + i % 40))
+        yield lote
+
+def medir(modo, filas):
+    import pandas as pd
+    import database as db
+
+    ruta = os.path.join(tempfile.mkdtemp(), f"bench_{modo}_{filas}.xlsx")
+    inicio = time.perf_counter()
+    if modo == "streaming":
+        db._escribir_excel_streaming(ruta, COLUMNAS, generar_lotes(filas))
+    else:
+        df = pd.DataFrame([fila for lote in generar_lotes(filas) for fila in lote], columns=COLUMNAS)
+        db._escribir_excel(ruta, df, db._resumenes_excel(df))
+    segundos = time.perf_counter() - inicio
+    return {"modo": modo, "filas": filas, "segundos": round(segundos, 2),
+            "pico_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "tamano_mb": round(os.path.getsize(ruta) / 1024 / 1024, 1)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara tiempo y memoria de la exportación a Excel.")
+    parser.add_argument("--tamanos", type=int, nargs="*", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--modos", nargs="*", default=["memoria", "streaming"])
+    parser.add_argument("--json", help="Ruta donde guardar los resultados")
+    parser.add_argument("--interno", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        # Proceso hijo: una sola medición, resultado por stdout
+        print(json.dumps(medir(args.interno[0], int(args.interno[1]))))
+        sys.exit(0)
+
+    resultados = []
+    for filas in args.tamanos:
+        for modo in args.modos:
+            salida = subprocess.run([sys.executable, __file__, "--interno", modo, str(filas)],
+                                    capture_output=True, text=True, check=True).stdout
+            r = json.loads(salida.strip().splitlines()[-1])
+            resultados.append(r)
+            print(f"{r['filas']:>9} filas  {r['modo']:9}  {r['segundos']:>8} s  pico RSS {r['pico_rss_mb']:>8} MB  "
+                  f"archivo {r['tamano_mb']} MB")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
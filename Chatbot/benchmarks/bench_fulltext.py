@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de búsqueda en MySQL: LIKE '%término%' frente a MATCH ... AGAINST.
+
+Crea una tabla temporal de trabajo (producto_bench, misma estructura que
+producto) en la BD configurada en .env, la llena con un catálogo sintético
+(el mismo generador de bench_busqueda.py) y para cada consulta:
+- muestra el EXPLAIN de la consulta LIKE y de la FULLTEXT;
+- mide la latencia de ambas (p50/p95).
+Al terminar borra la tabla (salvo --conservar).
+
+Uso:
+    python benchmarks/bench_fulltext.py
+    python benchmarks/bench_fulltext.py --productos 100000 --consultas 200 --modo booleano --json resultados.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import conexiones  # noqa: E402
+from bench_busqueda import generar_catalogo, generar_consultas  # noqa: E402
+
+TABLA = "producto_bench"
+CONSULTA_LIKE = (f"SELECT id_producto, nombre, precio, imagen_principal FROM {TABLA} "
+                 "WHERE (nombre LIKE %s OR categoria LIKE %s) AND activo = 1 LIMIT 3")
+
+def consulta_fulltext(modo):
+    match = f"MATCH(nombre, categoria, descripcion) AGAINST (%s {modo})"
+    return (f"SELECT id_producto, nombre, precio, imagen_principal, {match} AS puntaje FROM {TABLA} "
+            f"WHERE {match} AND activo = 1 ORDER BY puntaje DESC LIMIT 3")
+
+def sembrar(cursor, filas):
+    cursor.execute(f"DROP TABLE IF EXISTS {TABLA}")
+    cursor.execute(f"CREATE TABLE {TABLA} LIKE producto")
+    datos = [(f["id_producto"], f["nombre"][:50], f["descripcion"], f["precio"], f["stock"], f["id_vendedor"],
+              f["categoria"], f["imagen_principal"], f["activo"]) for f in filas]
+    for i in range(0, len(datos), 5000):
+        cursor.executemany(f"INSERT INTO {TABLA} (id_producto, nombre, descripcion, precio, stock, id_vendedor, "
+                           "categoria, imagen_principal, activo) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                           datos[i:i + 5000])
+    # El índice se crea después de cargar los datos (más rápido); CREATE TABLE ... LIKE
+    # ya lo copia si la migración está aplicada en producto
+    if not _tiene_fulltext(cursor):
+        cursor.execute(f"ALTER TABLE {TABLA} ADD FULLTEXT KEY ft_producto_busqueda (nombre, categoria, descripcion)")
+
+def _tiene_fulltext(cursor):
+    cursor.execute(f"SHOW INDEX FROM {TABLA} WHERE Index_type = 'FULLTEXT'")
+    return bool(cursor.fetchall())
+
+def explicar(cursor, consulta, params):
+    cursor.execute("EXPLAIN " + consulta, params)
+    columnas = [c[0] for c in cursor.description]
+    return [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+
+def medir(cursor, consulta, parametros):
+    tiempos = []
+    for params in parametros:
+        inicio = time.perf_counter()
+        cursor.execute(consulta, params)
+        cursor.fetchall()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {"p50_ms": round(statistics.median(tiempos), 3), "p95_ms": round(tiempos[int(len(tiempos) * 0.95)], 3)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--productos", type=int, default=100000)
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--modo", choices=("natural", "booleano"), default="natural")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--conservar", action="store_true", help="No borra la tabla de trabajo al terminar")
+    parser.add_argument("--json", help="Guarda los resultados en este archivo")
+    args = parser.parse_args()
+
+    filas = generar_catalogo(args.productos, args.semilla)
+    terminos = [t for t, _ in generar_consultas(filas, args.consultas, args.semilla)]
+
+    try:
+        conn = conexiones.prestar()
+    except conexiones.ConexionNoDisponible as e:
+        sys.exit(f"No se pudo conectar a la base de datos (revisa .env): {e}")
+    try:
+        cursor = conn.cursor()
+        inicio = time.perf_counter()
+        sembrar(cursor, filas)
+        conn.commit()
+        print(f"Tabla {TABLA}: {args.productos} productos sembrados en {time.perf_counter() - inicio:.1f} s")
+
+        modo = "IN BOOLEAN MODE" if args.modo == "booleano" else "IN NATURAL LANGUAGE MODE"
+        fulltext = consulta_fulltext(modo)
+        def expresion(termino):
+            palabras = [p for p in termino.split() if len(p) >= 3]
+            return " ".join(f"+{p}*" for p in palabras) if args.modo == "booleano" else " ".join(palabras)
+
+        params_like = [(f"%{t}%", f"%{t}%") for t in terminos]
+        params_fulltext = [(expresion(t), expresion(t)) for t in terminos]
+        resultados = {
+            "productos": args.productos,
+            "consultas": len(terminos),
+            "modo": args.modo,
+            "explain_like": explicar(cursor, CONSULTA_LIKE, params_like[0]),
+            "explain_fulltext": explicar(cursor, fulltext, params_fulltext[0]),
+            "like": medir(cursor, CONSULTA_LIKE, params_like),
+            "fulltext": medir(cursor, fulltext, params_fulltext),
+        }
+
+        for variante in ("like", "fulltext"):
+            print(f"\n--- {variante.upper()} ---")
+            for fila in resultados[f"explain_{variante}"]:
+                print(f"  type={fila.get('type')} key={fila.get('key')} rows={fila.get('rows')} extra={fila.get('Extra')}")
+            r = resultados[variante]
+            print(f"  p50 {r['p50_ms']} ms, p95 {r['p95_ms']} ms")
+
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(resultados, f, ensure_ascii=False, indent=2, default=str)
+    finally:
+        if not args.conservar:
+            conn.cursor().execute(f"DROP TABLE IF EXISTS {TABLA}")
+        conn.close()
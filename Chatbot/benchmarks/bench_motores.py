@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de los motores de pronóstico sobre series sintéticas de ventas diarias.
+
+Para cada motor mide la latencia de ajuste + pronóstico y el error de
+backtest (se reservan los últimos 30 días y se comparan con el pronóstico).
+Las series imitan la tienda: estacionalidad semanal, tendencia suave y
+ruido Poisson; las "dispersas" tienen la mayoría de los días en 0.
+
+Uso:
+    python benchmarks/bench_motores.py
+    python benchmarks/bench_motores.py --series 50 --dias 180 --json resultados.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pronostico  # noqa: E402
+
+def generar_series(cantidad, dias, dispersa, semilla):
+    rng = np.random.default_rng(semilla)
+    t = np.arange(dias)
+    series = []
+    for _ in range(cantidad):
+        base = rng.uniform(0.3, 2.0) if dispersa else rng.uniform(3, 20)
+        perfil_semanal = 1 + rng.uniform(0.1, 0.6) * np.sin(2 * np.pi * t / 7 + rng.uniform(0, 2 * np.pi))
+        tendencia = 1 + rng.uniform(-0.002, 0.004) * t
+        lam = np.clip(base * perfil_semanal * tendencia, 0, None)
+        series.append(rng.poisson(lam).astype(float))
+    return series
+
+def evaluar(motor, series, horizonte):
+    latencias, mae, rmse = [], [], []
+    for serie in series:
+        entrenamiento, real = serie[:-horizonte], serie[-horizonte:]
+        inicio = time.perf_counter()
+        pred, _ = motor.ajustar_y_pronosticar(entrenamiento, horizonte)
+        latencias.append(time.perf_counter() - inicio)
+        pred = np.clip(np.round(pred), 0, None)
+        mae.append(np.mean(np.abs(pred - real)))
+        rmse.append(np.sqrt(np.mean((pred - real) ** 2)))
+    return {
+        "latencia_p50_ms": round(float(np.median(latencias)) * 1000, 2),
+        "latencia_p95_ms": round(float(np.percentile(latencias, 95)) * 1000, 2),
+        "mae": round(float(np.mean(mae)), 3),
+        "rmse": round(float(np.mean(rmse)), 3)
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara latencia y error de los motores de pronóstico.")
+    parser.add_argument("--series", type=int, default=20)
+    parser.add_argument("--dias", type=int, default=180)
+    parser.add_argument("--motores", nargs="*", default=list(pronostico.MOTORES))
+    parser.add_argument("--json", help="Ruta donde guardar los resultados")
+    args = parser.parse_args()
+
+    resultados = {}
+    for tipo, dispersa in (("densa", False), ("dispersa", True)):
+        series = generar_series(args.series, args.dias, dispersa, semilla=42)
+        for nombre in args.motores:
+            r = evaluar(pronostico.MOTORES[nombre], series, pronostico.DIAS_PRONOSTICO)
+            resultados[f"{tipo}/{nombre}"] = r
+            print(f"{tipo:9} {nombre:17} p50={r['latencia_p50_ms']:>9} ms  p95={r['latencia_p95_ms']:>9} ms  "
+                  f"MAE={r['mae']:<7} RMSE={r['rmse']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del clasificador de intenciones: modelo precompilado (.npz + NumPy)
+frente al entrenamiento con sklearn al importar (comportamiento anterior).
+
+Mide el arranque en frío de un proceso nuevo (lo que paga cada worker al
+iniciar), la latencia por mensaje (con la caché LRU) y por lote
+(clasificar_intenciones), y comprueba que ambos clasifiquen igual. También
+reporta qué parte de los mensajes resuelve el enrutador de comandos sin el
+modelo, el tiempo ahorrado y en qué mensajes su respuesta difiere del modelo
+(frases de entrenamiento y MENSAJES_REALES), y que el lote clasifique igual
+que los mensajes de a uno.
+
+Uso:
+    python benchmarks/bench_nlp.py
+    python benchmarks/bench_nlp.py --arranques 10 --repeticiones 2000 --json resultados.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+DIR_CHATBOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DIR_CHATBOT)
+import nlp_engine  # noqa: E402
+
+MENSAJES = nlp_engine.frases + [
+    "hola, busca una rtx 4070 por favor", "quiero devolver mi pedido 15", "cuándo vuelve el ryzen 7",
+    "compara rtx 3060 con rx 6600", "estadísticas de hoy", "predice el stock de la rtx 4060",
+    "dame un excel con mis ventas del mes", "a qué hora abren el sábado", "xyz", ""
+]
+
+# Mensajes como los que llegan al chat (no son frases de entrenamiento): la
+# discrepancia entre enrutador y modelo se reporta aparte sobre ellos
+MENSAJES_REALES = [
+    "hola", "buenas tardes", "estadísticas", "stats de hoy", "resumen del mes", "total usuarios",
+    "búscame un ryzen 5", "busca rtx 3060", "tienes memoria ram ddr5", "precio de la rtx 4070",
+    "cotiza un monitor de 27 pulgadas", "encuentra a juan", "encuentra una fuente de 750w",
+    "busca al cliente maria@correo.cl", "info de pedro soto", "cliente juan pérez",
+    "stock de ram ddr5", "inventario de teclados", "predice el stock de rtx 3060", "demanda de ssd nvme",
+    "actualiza el pedido 105 a enviado", "cambia el estado del pedido 12 a entregado", "análisis de crecimiento",
+    "qué categoría vende más", "mi pedido", "dónde está mi pedido 33", "quiero devolver mi pedido",
+    "mi producto llegó dañado", "cuando vuelve a estar disponible la rtx 4090", "avísame cuando llegue el ryzen 7",
+    "compara rtx 3060 con rx 6600", "cuál es mejor ryzen 5 o i5", "actualizar mi dirección a calle falsa 123",
+    "recomiéndame algo", "qué me recomiendas para gaming", "ayuda", "mi pc no prende", "funciones",
+    "qué puedes hacer", "a qué hora abren", "atienden los sábados", "métodos de pago", "aceptan tarjeta de crédito",
+    "exportar ventas", "dame un excel con mis ventas del mes", "gracias", "ok",
+]
+
+# Cada script se ejecuta en un proceso nuevo: incluye el arranque del intérprete
+SCRIPT_PRECOMPILADO = "import nlp_engine; nlp_engine.clasificar_intencion('hola')"
+SCRIPT_SKLEARN = ("import nlp_engine; v, m = nlp_engine._entrenar(); "
+                  "m.predict(v.transform(['hola']))")
+
+def medir_arranque(script, veces):
+    tiempos = []
+    for _ in range(veces):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, "-c", script], cwd=DIR_CHATBOT, check=True, stdout=subprocess.DEVNULL)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {"p50_ms": round(statistics.median(tiempos), 1), "max_ms": round(max(tiempos), 1)}
+
+def medir_lote(repeticiones):
+    # Mensajes distintos (sufijo numérico) para no medir solo la deduplicación
+    lote = [f"{MENSAJES[i % len(MENSAJES)]} {i}" for i in range(repeticiones)]
+    inicio = time.perf_counter()
+    nlp_engine.clasificar_intenciones(lote)
+    return round((time.perf_counter() - inicio) / repeticiones * 1e6, 1)
+
+def medir_latencia(clasificar, repeticiones):
+    inicio = time.perf_counter()
+    for i in range(repeticiones):
+        clasificar(MENSAJES[i % len(MENSAJES)])
+    return round((time.perf_counter() - inicio) / repeticiones * 1e6, 1)
+
+def clasificar_modelo(mensaje):
+    # Solo Naive Bayes, sin enrutador ni caché
+    return nlp_engine._clasificar(nlp_engine._normalizar(mensaje))
+
+def difieren_del_modelo(mensajes):
+    """
+    Mensajes que el enrutador resuelve con otra intención que el modelo.
+    """
+    enrutados = {m: r[0] for m in mensajes if (r := nlp_engine.enrutar(nlp_engine._normalizar(m)))}
+    return {m: {"reglas": intencion, "modelo": clasificar_modelo(m)}
+            for m, intencion in enrutados.items() if intencion != clasificar_modelo(m)}
+
+def medir_enrutador(repeticiones):
+    """
+    Tasa de mensajes resueltos por reglas, costo de probarlas y del modelo
+    (sin caché) y ahorro neto por mensaje. MENSAJES incluye todas las frases
+    de entrenamiento: la tasa real depende del tráfico (/cache_stats). Las
+    discrepancias con el modelo se reportan para las frases de entrenamiento
+    y para MENSAJES_REALES.
+    """
+    tasa = sum(1 for m in MENSAJES if nlp_engine.enrutar(nlp_engine._normalizar(m))) / len(MENSAJES)
+    enrutador_us = medir_latencia(nlp_engine.enrutar, repeticiones)
+    modelo_us = medir_latencia(clasificar_modelo, repeticiones)
+    return {
+        "tasa_aciertos": round(tasa, 3),
+        "enrutador_us": enrutador_us,
+        "modelo_us": modelo_us,
+        "ahorro_us_por_mensaje": round(tasa * modelo_us - enrutador_us, 1),
+        "difieren_del_modelo": difieren_del_modelo(nlp_engine.frases),
+        "difieren_del_modelo_reales": difieren_del_modelo(MENSAJES_REALES),
+    }
+
+def lote_distinto(mensajes):
+    """
+    Mensajes en que clasificar_intenciones() no coincide con clasificar_intencion().
+    """
+    lote = nlp_engine.clasificar_intenciones(mensajes)
+    return {m: {"uno": nlp_engine.clasificar_intencion(m), "lote": i}
+            for m, i in zip(mensajes, lote) if i != nlp_engine.clasificar_intencion(m)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--arranques", type=int, default=5, help="Procesos nuevos a lanzar por variante")
+    parser.add_argument("--repeticiones", type=int, default=5000, help="Mensajes a clasificar para la latencia")
+    parser.add_argument("--json", help="Guarda los resultados en este archivo")
+    args = parser.parse_args()
+
+    vectorizer, modelo = nlp_engine._entrenar()
+    def clasificar_sklearn(mensaje):
+        return modelo.predict(vectorizer.transform([mensaje]))[0]
+
+    distintos = [m for m in MENSAJES if clasificar_modelo(m) != clasificar_sklearn(m)]
+    resultados = {
+        "mensajes_comparados": len(MENSAJES),
+        "discrepancias": distintos,
+        "precompilado": {"arranque": medir_arranque(SCRIPT_PRECOMPILADO, args.arranques),
+                         "us_por_mensaje": medir_latencia(nlp_engine.clasificar_intencion, args.repeticiones)},
+        "lote": {"us_por_mensaje": medir_lote(args.repeticiones),
+                 "distinto_de_uno_a_uno": lote_distinto(MENSAJES + MENSAJES_REALES)},
+        "cache": nlp_engine.estadisticas_cache(),
+        "enrutador": medir_enrutador(args.repeticiones),
+        "sklearn": {"arranque": medir_arranque(SCRIPT_SKLEARN, args.arranques),
+                    "us_por_mensaje": medir_latencia(clasificar_sklearn, args.repeticiones)},
+    }
+
+    print(f"Coinciden {len(MENSAJES) - len(distintos)}/{len(MENSAJES)} mensajes")
+    for variante in ("precompilado", "sklearn"):
+        r = resultados[variante]
+        print(f"{variante:>13}: arranque p50 {r['arranque']['p50_ms']} ms (máx {r['arranque']['max_ms']} ms), "
+              f"{r['us_por_mensaje']} µs/mensaje")
+
+    r = resultados["lote"]
+    print(f"{'lote':>13}: {r['us_por_mensaje']} µs/mensaje (clasificar_intenciones), distinto de "
+          f"clasificar_intencion en {len(r['distinto_de_uno_a_uno'])}: {r['distinto_de_uno_a_uno']}")
+    print(f"{'caché LRU':>13}: {resultados['cache']}")
+    r = resultados["enrutador"]
+    print(f"{'enrutador':>13}: {r['tasa_aciertos']:.0%} sin modelo, {r['enrutador_us']} µs reglas vs "
+          f"{r['modelo_us']} µs modelo, ahorro {r['ahorro_us_por_mensaje']} µs/mensaje; "
+          f"difiere del modelo en {len(r['difieren_del_modelo'])}/{len(nlp_engine.frases)} frases de "
+          f"entrenamiento: {list(r['difieren_del_modelo'])}")
+    reales = r["difieren_del_modelo_reales"]
+    print(f"{'':>13}  y en {len(reales)}/{len(MENSAJES_REALES)} mensajes reales:")
+    for mensaje, d in reales.items():
+        print(f"{'':>15}{mensaje!r}: reglas {d['reglas']}, modelo {d['modelo']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del despacho de avisos de reposición (notificaciones_stock.py).
+
+Sobre una base de prueba (plan_consultas.crear_base) se suscriben
+--suscriptores clientes a un producto sin stock, se repone y se ejecuta una
+pasada del despachador (python notificaciones_stock.py --una-vez, con
+DB_NAME=--bd) contra el servidor SMTP local (smtp_local.py), que tarda
+--latencia ms por correo. Se repite para cada valor de --conexiones-smtp.
+
+Reporta la duración de la pasada, correos recibidos, avisos marcados y
+consultas a MySQL (Questions de todo el servidor, menos las de una pasada
+sin reposiciones): deben crecer con suscriptores / NOTIFICACIONES_LOTE, no
+con los suscriptores.
+
+Uso:
+    python benchmarks/bench_notificaciones.py
+    python benchmarks/bench_notificaciones.py --reutilizar --suscriptores 20000 --conexiones-smtp 1 4 16
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+DIR_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+DIR_CHATBOT = os.path.dirname(DIR_BENCHMARKS)
+sys.path.insert(0, DIR_CHATBOT)
+import mysql.connector  # noqa: E402
+from config import DB_HOST, DB_USER, DB_PASS, DB_NAME  # noqa: E402
+from bench_servicio import consultas_totales  # noqa: E402
+from plan_consultas import crear_base  # noqa: E402
+import smtp_local  # noqa: E402
+
+ID_PRODUCTO = 1
+
+def pasada(bd, puerto, conexiones_smtp):
+    """
+    Ejecuta el despachador en un proceso aparte y devuelve su resumen.
+    """
+    with tempfile.TemporaryDirectory() as directorio:
+        archivo = os.path.join(directorio, "resumen.json")
+        entorno = dict(os.environ, DB_NAME=bd, NOTIFICACIONES_SMTP_HOST="127.0.0.1",
+                       NOTIFICACIONES_SMTP_PUERTO=str(puerto), NOTIFICACIONES_SMTP_CONEXIONES=str(conexiones_smtp))
+        subprocess.run([sys.executable, "notificaciones_stock.py", "--una-vez", "--json", archivo],
+                       cwd=DIR_CHATBOT, env=entorno, check=True, stdout=subprocess.DEVNULL)
+        with open(archivo, encoding="utf-8") as f:
+            return json.load(f)
+
+def suscribir(conn, suscriptores):
+    """
+    Deja el producto sin stock (y al día en el despachador) con 'suscriptores'
+    avisos pendientes, uno de cada 50 con el correo repetido.
+    """
+    cursor = conn.cursor()
+    cursor.execute("UPDATE producto SET stock = 0, activo = 1 WHERE id_producto = %s", (ID_PRODUCTO,))
+    cursor.execute("DELETE FROM notificaciones_stock WHERE id_producto = %s", (ID_PRODUCTO,))
+    cursor.execute("SET SESSION cte_max_recursion_depth = %s", (suscriptores + 1,))
+    cursor.execute("""
+        INSERT INTO notificaciones_stock (id_usuario, id_producto, email_usuario, notificado)
+        WITH RECURSIVE seq (n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < %s)
+        SELECT n, %s, CONCAT('suscriptor', IF(MOD(n, 50) = 0, n - 1, n), '@bitware.test'), 0 FROM seq
+    """, (suscriptores, ID_PRODUCTO))
+    conn.commit()
+
+def medir(conn, bd, puerto, suscriptores, conexiones_smtp, servidor):
+    cursor = conn.cursor()
+    suscribir(conn, suscriptores)
+    pasada(bd, puerto, conexiones_smtp)  # marca el stock 0 (y despacha los avisos de la semilla)
+
+    antes = consultas_totales(cursor)
+    vacia = pasada(bd, puerto, conexiones_smtp)
+    consultas_vacia = consultas_totales(cursor) - antes - 1
+
+    cursor.execute("UPDATE producto SET stock = 50 WHERE id_producto = %s", (ID_PRODUCTO,))
+    conn.commit()
+    correos_antes = servidor.estadisticas()["correos"]
+    antes = consultas_totales(cursor)
+    resumen = pasada(bd, puerto, conexiones_smtp)
+    consultas = consultas_totales(cursor) - antes - 1 - consultas_vacia
+
+    cursor.execute("SELECT notificado, COUNT(*) FROM notificaciones_stock WHERE id_producto = %s GROUP BY notificado",
+                   (ID_PRODUCTO,))
+    marcados = {str(estado): total for estado, total in cursor.fetchall()}
+    return {
+        "conexiones_smtp": conexiones_smtp,
+        "segundos": resumen["segundos"],
+        "segundos_pasada_vacia": vacia["segundos"],
+        "correos_recibidos": servidor.estadisticas()["correos"] - correos_antes,
+        "avisos_por_estado": marcados,
+        "consultas": consultas,
+        "consultas_por_1000_avisos": round(consultas / max(resumen["avisos"], 1) * 1000, 2),
+        "resumen": resumen,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bd", default="bitware_avisos", help="Base de prueba (se borra y se crea de nuevo)")
+    parser.add_argument("--pedidos", type=int, default=20000, help="Pedidos sintéticos de la base de prueba")
+    parser.add_argument("--reutilizar", action="store_true", help="Usa la base de prueba ya sembrada")
+    parser.add_argument("--suscriptores", type=int, default=5000, help="Avisos pendientes del producto repuesto")
+    parser.add_argument("--conexiones-smtp", type=int, nargs="+", default=[1, 4, 16],
+                        help="Conexiones SMTP simultáneas a probar")
+    parser.add_argument("--latencia", type=float, default=5.0, help="Milisegundos por correo en el SMTP local")
+    parser.add_argument("--json", help="Guarda los resultados en este archivo")
+    args = parser.parse_args()
+
+    if args.bd == DB_NAME:
+        sys.exit(f"--bd no puede ser la base de la aplicación ({DB_NAME}): se borra y se vuelve a crear.")
+    conn = mysql.connector.connect(host=DB_HOST, user=DB_USER, password=DB_PASS)
+    servidor, puerto = smtp_local.iniciar(latencia_ms=args.latencia)
+    try:
+        if args.reutilizar:
+            conn.cursor().execute(f"USE `{args.bd}`")
+        else:
+            print(f"Creando {args.bd} con {args.pedidos} pedidos sintéticos...")
+            crear_base(conn, args.bd, args.pedidos)
+        corridas = []
+        for conexiones_smtp in args.conexiones_smtp:
+            print(f"{args.suscriptores} suscriptores, {conexiones_smtp} conexiones SMTP, {args.latencia} ms/correo...")
+            corridas.append(medir(conn, args.bd, puerto, args.suscriptores, conexiones_smtp, servidor))
+    finally:
+        servidor.shutdown()
+        conn.close()
+
+    print(f"{'conexiones':>10} {'segundos':>9} {'correos':>8} {'consultas':>10} {'por 1000 avisos':>16}  avisos")
+    for r in corridas:
+        print(f"{r['conexiones_smtp']:>10} {r['segundos']:>9} {r['correos_recibidos']:>8} {r['consultas']:>10} "
+              f"{r['consultas_por_1000_avisos']:>16}  {r['avisos_por_estado']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"bd": args.bd, "suscriptores": args.suscriptores, "latencia_ms": args.latencia,
+                       "corridas": corridas}, f, ensure_ascii=False, indent=2)
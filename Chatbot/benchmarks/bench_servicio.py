@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+Prueba de capacidad del servicio del chatbot con datos y tráfico realistas.
+
+1. Siembra una base de prueba (--bd, por defecto bitware_carga) con el
+   esquema de BD/bitware.sql, las migraciones y un volumen sintético de
+   catálogo, usuarios, favoritos y --anos años de pedidos
+   (plan_consultas.crear_base). Con --reutilizar se usa la ya sembrada.
+2. Levanta app.py (o asgi.py con --servidor asgi) apuntando a esa base, o
+   mide un servidor ya iniciado con --url.
+3. Cuenta las consultas SQL de cada escenario: lo envía --muestras veces de
+   a uno y mide el aumento de Questions en SHOW GLOBAL STATUS. Incluye lo
+   que el servidor haga en segundo plano (catálogo, resúmenes): usar una
+   base sin otros clientes.
+4. Reproduce la mezcla de ESCENARIOS con --concurrencia clientes hasta
+   completar --peticiones: /chat de invitados, clientes (U), vendedores (V)
+   y administradores (A), más /predict_demand.
+
+Reporta por escenario (rol:intención) latencias p50/p90/p99 y consultas por
+petición, y en total peticiones/s y consultas/s. --json guarda los
+resultados con el commit y los parámetros; --comparar muestra la diferencia
+con un JSON anterior.
+
+Uso:
+    python benchmarks/bench_servicio.py --pedidos 200000 --anos 3 --json base.json
+    python benchmarks/bench_servicio.py --reutilizar --json nuevo.json --comparar base.json
+    DB_NAME=bitware_carga python app.py &
+    python benchmarks/bench_servicio.py --reutilizar --url https://127.0.0.1:5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import ssl
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from urllib.parse import urlsplit
+
+DIR_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+DIR_CHATBOT = os.path.dirname(DIR_BENCHMARKS)
+sys.path.insert(0, DIR_CHATBOT)
+import mysql.connector  # noqa: E402
+import nlp_engine  # noqa: E402
+from config import DB_HOST, DB_USER, DB_PASS, DB_NAME  # noqa: E402
+from bench_carga import post, puerto_libre, esperar_puerto  # noqa: E402
+from plan_consultas import crear_base  # noqa: E402
+
+# (rol, peso, mensaje) — None: POST /predict_demand de un producto al azar.
+# Sin exportaciones ni cambios de estado: no deben alterar la base entre corridas.
+ESCENARIOS = [
+    ("invitado", 8, "hola"),
+    ("invitado", 10, "busca producto {producto}"),
+    ("invitado", 5, "recomiéndame algo"),
+    ("invitado", 3, "horarios de atención"),
+    ("invitado", 2, "métodos de pago"),
+    ("invitado", 3, "compara producto {producto} con producto {otro}"),
+    ("cliente", 10, "dónde está mi pedido"),
+    ("cliente", 6, "recomiéndame un producto"),
+    ("cliente", 6, "busca producto {producto}"),
+    ("cliente", 2, "quiero devolver un producto"),
+    ("cliente", 3, "hola"),
+    ("vendedor", 3, "cómo van las ventas"),
+    ("vendedor", 2, "inventario de producto {producto}"),
+    ("vendedor", 1, "predice el stock de producto {producto}"),
+    ("admin", 1, "hola"),
+    ("admin", 1, "resumen"),
+    ("admin", 1, "total usuarios"),
+    ("admin", 1, "análisis de crecimiento"),
+    ("admin", 1, "busca al cliente usuario{usuario}@bitware.test"),
+    ("admin", 1, "predice el stock de producto {producto}"),
+    ("prediccion", 4, None),
+]
+PERMISOS = {"invitado": None, "cliente": "U", "vendedor": "V", "admin": "A"}
+
+def etiqueta(escenario):
+    rol, _, mensaje = escenario
+    if mensaje is None:
+        return f"{rol}:/predict_demand"
+    return f"{rol}:{nlp_engine.clasificar_intencion(mensaje.format(producto=1, otro=2, usuario=1))}"
+
+def peticion(escenario, rng, tamanos):
+    """
+    (ruta, cuerpo JSON) de una petición del escenario con valores al azar.
+    """
+    rol, _, mensaje = escenario
+    producto = rng.randint(1, tamanos["productos"])
+    if mensaje is None:
+        return "/predict_demand", {"id_producto": producto}
+    # Los vendedores sembrados son los usuarios múltiplos de 50 (dueños de los productos)
+    id_usuario = {"cliente": rng.randint(1, tamanos["usuarios"]),
+                  "vendedor": 50 * rng.randint(1, tamanos["vendedores"]), "admin": 1}.get(rol)
+    texto = mensaje.format(producto=producto, otro=rng.randint(1, tamanos["productos"]),
+                           usuario=rng.randint(1, tamanos["usuarios"]))
+    return "/chat", {"message": texto, "permisos": PERMISOS[rol], "userId": id_usuario,
+                     "email_usuario": f"usuario{id_usuario}@bitware.test" if id_usuario else "",
+                     "nombre_usuario": "Carga"}
+
+# ======================================================================
+# BASE DE PRUEBA Y SERVIDOR
+# ======================================================================
+
+def tamanos_de_la_base(cursor):
+    cursor.execute("SELECT (SELECT MAX(id_producto) FROM producto), (SELECT MAX(id_usuario) FROM usuario), "
+                   "(SELECT COUNT(*) FROM pedidos), (SELECT DATEDIFF(MAX(fecha_pedido), MIN(fecha_pedido)) FROM pedidos)")
+    productos, usuarios, pedidos, dias = cursor.fetchone()
+    if not productos or not usuarios:
+        sys.exit("La base de prueba está vacía: siémbrala sin --reutilizar.")
+    return {"productos": productos, "usuarios": usuarios, "vendedores": max(usuarios // 50, 1),
+            "pedidos": pedidos, "dias": (dias or 0) + 1}
+
+def consultas_totales(cursor):
+    # Cada SHOW cuenta como una consulta más: quien resta dos lecturas descuenta 1
+    cursor.execute("SHOW GLOBAL STATUS LIKE 'Questions'")
+    return int(cursor.fetchone()[1])
+
+def iniciar_servidor(tipo, bd):
+    """
+    Levanta el servidor en un puerto libre con DB_NAME=bd. Devuelve (url, proceso).
+    """
+    puerto = puerto_libre()
+    comando = {
+        "flask": [sys.executable, "-c", f"import app; app.app.run(host='127.0.0.1', port={puerto}, threaded=True)"],
+        "asgi": [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(puerto),
+                 "--log-level", "warning"],
+    }[tipo]
+    proceso = subprocess.Popen(comando, cwd=DIR_CHATBOT, env=dict(os.environ, DB_NAME=bd),
+                               stdout=subprocess.DEVNULL)
+    esperar_puerto(puerto, proceso)
+    return f"http://127.0.0.1:{puerto}", proceso
+
+def commit_actual():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=DIR_CHATBOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        cambios = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=DIR_CHATBOT,
+                                 capture_output=True, text=True).stdout.strip()
+        return commit + ("+cambios" if cambios else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# ======================================================================
+# MEDICIÓN
+# ======================================================================
+
+def _contexto_ssl(url):
+    if url.scheme != "https":
+        return None
+    contexto = ssl.create_default_context()
+    contexto.check_hostname, contexto.verify_mode = False, ssl.CERT_NONE
+    return contexto
+
+def percentiles(latencias):
+    if not latencias:
+        return {"p50_ms": None, "p90_ms": None, "p99_ms": None, "max_ms": None}
+    latencias = sorted(latencias)
+    en = lambda q: round(latencias[min(len(latencias) - 1, int(len(latencias) * q))], 1)
+    return {"p50_ms": en(0.5), "p90_ms": en(0.9), "p99_ms": en(0.99), "max_ms": round(latencias[-1], 1)}
+
+async def _enviar(url, contexto, ruta, datos, timeout):
+    codigo = await asyncio.wait_for(post(url, ruta, json.dumps(datos).encode("utf-8"), contexto), timeout)
+    if codigo != 200:
+        raise ValueError(f"HTTP {codigo}")
+
+async def contar_consultas(url, cursor, tamanos, muestras, semilla, timeout):
+    """
+    Consultas SQL por petición de cada escenario, enviándolas de a una.
+    Antes se envía una ronda completa para cargar catálogo, modelos y cachés.
+    """
+    contexto, rng = _contexto_ssl(url), random.Random(semilla)
+    for escenario in ESCENARIOS:
+        try:
+            await _enviar(url, contexto, *peticion(escenario, rng, tamanos), timeout)
+        except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+            pass
+    por_escenario = defaultdict(list)
+    for escenario in ESCENARIOS:
+        for _ in range(muestras):
+            antes = consultas_totales(cursor)
+            try:
+                await _enviar(url, contexto, *peticion(escenario, rng, tamanos), timeout)
+            except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+                continue
+            por_escenario[etiqueta(escenario)].append(consultas_totales(cursor) - antes - 1)
+    return {nombre: round(sum(v) / len(v), 2) for nombre, v in por_escenario.items()}
+
+async def reproducir(url, tamanos, concurrencia, peticiones, semilla, timeout):
+    """
+    --concurrencia clientes envían la mezcla de ESCENARIOS (según su peso)
+    hasta completar 'peticiones'. Devuelve (latencias, errores) por escenario y segundos.
+    """
+    contexto = _contexto_ssl(url)
+    pesos = [peso for _, peso, _ in ESCENARIOS]
+    etiquetas = [etiqueta(e) for e in ESCENARIOS]
+    latencias, errores = defaultdict(list), defaultdict(int)
+    restantes = peticiones
+
+    async def cliente(i):
+        nonlocal restantes
+        rng = random.Random(semilla + i)
+        while restantes > 0:
+            restantes -= 1
+            indice = rng.choices(range(len(ESCENARIOS)), weights=pesos)[0]
+            inicio = time.perf_counter()
+            try:
+                await _enviar(url, contexto, *peticion(ESCENARIOS[indice], rng, tamanos), timeout)
+            except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+                errores[etiquetas[indice]] += 1
+                continue
+            latencias[etiquetas[indice]].append((time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(i) for i in range(concurrencia)))
+    return latencias, errores, time.perf_counter() - inicio
+
+def resumir(latencias, errores, segundos, consultas_carga, consultas_por_escenario):
+    todas = [ms for valores in latencias.values() for ms in valores]
+    completadas, fallidas = len(todas), sum(errores.values())
+    escenarios = {}
+    for nombre in sorted(set(latencias) | set(errores) | set(consultas_por_escenario)):
+        escenarios[nombre] = {"peticiones": len(latencias.get(nombre, ())), "errores": errores.get(nombre, 0),
+                              **percentiles(latencias.get(nombre, ())),
+                              "consultas_por_peticion": consultas_por_escenario.get(nombre)}
+    total = {"peticiones": completadas, "errores": fallidas, "segundos": round(segundos, 2),
+             "peticiones_por_seg": round(completadas / segundos, 1) if segundos else None,
+             "consultas_por_seg": round(consultas_carga / segundos, 1) if segundos else None,
+             "consultas_por_peticion": round(consultas_carga / (completadas + fallidas), 2)
+                                       if completadas + fallidas else None,
+             **percentiles(todas)}
+    return total, escenarios
+
+def comparar(anterior, actual):
+    """
+    Diferencia con una corrida anterior (mismo formato JSON).
+    """
+    def cambio(antes, despues):
+        if antes in (None, 0) or despues is None:
+            return f"{despues}"
+        return f"{antes} -> {despues} ({(despues - antes) / antes * 100:+.0f}%)"
+
+    print(f"\nComparación con {anterior['meta'].get('commit')} ({anterior['meta'].get('fecha')}):")
+    filas = [("TOTAL", anterior["total"], actual["total"])]
+    filas += [(nombre, anterior["escenarios"].get(nombre, {}), datos)
+              for nombre, datos in actual["escenarios"].items()]
+    for nombre, antes, despues in filas:
+        claves = ["p50_ms", "p99_ms", "consultas_por_peticion"]
+        if nombre == "TOTAL":
+            claves.insert(0, "peticiones_por_seg")
+        detalle = "  ".join(f"{clave} {cambio(antes.get(clave), despues.get(clave))}" for clave in claves)
+        print(f"  {nombre:<36} {detalle}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bd", default="bitware_carga", help="Base de prueba (se borra y se crea de nuevo)")
+    parser.add_argument("--pedidos", type=int, default=200000, help="Pedidos sintéticos (el resto escala con este)")
+    parser.add_argument("--anos", type=float, default=3, help="Años de historia de los pedidos")
+    parser.add_argument("--reutilizar", action="store_true", help="Usa la base de prueba ya sembrada")
+    parser.add_argument("--servidor", choices=["flask", "asgi"], default="flask", help="Servidor que se levanta")
+    parser.add_argument("--url", help="Mide este servidor (ya iniciado sobre --bd) en lugar de levantar uno")
+    parser.add_argument("--concurrencia", type=int, default=50, help="Clientes simultáneos")
+    parser.add_argument("--peticiones", type=int, default=3000, help="Peticiones de la mezcla")
+    parser.add_argument("--muestras", type=int, default=20, help="Peticiones por escenario al contar consultas")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Segundos máximos por petición")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--json", help="Guarda los resultados en este archivo")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para mostrar la diferencia")
+    args = parser.parse_args()
+
+    if args.bd == DB_NAME:
+        sys.exit(f"--bd no puede ser la base de la aplicación ({DB_NAME}): se borra y se vuelve a crear.")
+    conn = mysql.connector.connect(host=DB_HOST, user=DB_USER, password=DB_PASS)
+    proceso = None
+    try:
+        if args.reutilizar:
+            conn.cursor().execute(f"USE `{args.bd}`")
+        else:
+            print(f"Creando {args.bd} con {args.pedidos} pedidos sintéticos en {args.anos} años...")
+            crear_base(conn, args.bd, args.pedidos, dias=int(args.anos * 365))
+        cursor = conn.cursor()
+        tamanos = tamanos_de_la_base(cursor)
+
+        url = args.url
+        if not url:
+            url, proceso = iniciar_servidor(args.servidor, args.bd)
+        url = urlsplit(url)
+
+        print(f"Contando consultas por escenario ({args.muestras} peticiones cada uno)...")
+        consultas_por_escenario = asyncio.run(contar_consultas(url, cursor, tamanos, args.muestras,
+                                                               args.semilla, args.timeout))
+        print(f"Mezcla: {args.peticiones} peticiones con {args.concurrencia} clientes...")
+        antes = consultas_totales(cursor)
+        latencias, errores, segundos = asyncio.run(reproducir(url, tamanos, args.concurrencia, args.peticiones,
+                                                              args.semilla, args.timeout))
+        consultas_carga = consultas_totales(cursor) - antes - 1
+    finally:
+        if proceso:
+            proceso.terminate()
+        conn.close()
+
+    total, escenarios = resumir(latencias, errores, segundos, consultas_carga, consultas_por_escenario)
+    for nombre, r in escenarios.items():
+        print(f"  {nombre:<36} n={r['peticiones']:<6} p50 {r['p50_ms']} ms  p90 {r['p90_ms']} ms  "
+              f"p99 {r['p99_ms']} ms  consultas/pet {r['consultas_por_peticion']}  errores {r['errores']}")
+    print(f"\nTotal: {total['peticiones_por_seg']} pet/s, {total['consultas_por_seg']} consultas/s, "
+          f"p50 {total['p50_ms']} ms, p99 {total['p99_ms']} ms, errores {total['errores']}")
+
+    resultados = {
+        "meta": {"commit": commit_actual(), "fecha": datetime.now().isoformat(timespec="seconds"),
+                 "servidor": args.url or args.servidor, "concurrencia": args.concurrencia,
+                 "peticiones": args.peticiones, "semilla": args.semilla, "tamanos": tamanos},
+        "total": total,
+        "escenarios": escenarios,
+    }
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(json.load(f), resultados)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
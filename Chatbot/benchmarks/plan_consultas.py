@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+"""
+Revisión de planes de ejecución de las consultas del chatbot.
+
+Extrae las sentencias SQL (SELECT, UPDATE, DELETE) de Chatbot/database.py,
+Chatbot/app.py y Chatbot/recomendaciones.py leyendo el código (ast), y
+ejecuta EXPLAIN FORMAT=JSON de cada una sobre una base de datos de prueba
+con volumen sintético. Falla (código
+de salida 1) si alguna recorre una tabla completa (access_type ALL) o
+necesita filesort, salvo las de PERMITIDOS, que lo hacen por diseño.
+
+La base de prueba (--bd, por defecto bitware_planes) se crea desde cero con
+el esquema de BD/bitware.sql, las migraciones de BD/migraciones y datos
+sintéticos; nunca se toca la base de la aplicación. El usuario de .env
+necesita permiso para crear bases de datos.
+
+Valores de los parámetros: %s se reemplaza por '1' (MySQL lo convierte al
+tipo de la columna sin perder el índice), LIKE %s por LIKE '%1%' y
+LIMIT %s por LIMIT 3.
+
+Con MySQL disponible, tests/test_plan_consultas.py hace la misma revisión
+(con menos volumen) dentro de pytest; sin servidor, esa prueba se omite.
+
+Uso:
+    python benchmarks/plan_consultas.py --listar
+    python benchmarks/plan_consultas.py
+    python benchmarks/plan_consultas.py --pedidos 500000 --json planes.json
+    python benchmarks/plan_consultas.py --reutilizar   # no vuelve a sembrar
+"""
+import argparse
+import ast
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+DIR_CHATBOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIR_BD = os.path.join(os.path.dirname(DIR_CHATBOT), "BD")
+sys.path.insert(0, DIR_CHATBOT)
+import mysql.connector  # noqa: E402
+from config import DB_HOST, DB_USER, DB_PASS, DB_NAME  # noqa: E402
+
+ARCHIVOS = ["database.py", "app.py", "recomendaciones.py"]
+
+# (archivo:función, fragmento del SQL o None para todas) -> motivo
+PERMITIDOS = {
+    ("recomendaciones.py:_cargar", None):
+        "carga completa del modelo de recomendaciones (en segundo plano, cada RECOMENDACIONES_REFRESCO_SEG)",
+    ("database.py:_buscar_fulltext", None):
+        "ordena por relevancia solo las coincidencias del índice FULLTEXT",
+    ("database.py:buscar_productos_por_nombre", None):
+        "LIKE '%término%' (respaldo sin índice en memoria ni FULLTEXT)",
+    ("database.py:solicitar_notificacion_db", "LIKE"):
+        "LIKE '%término%' (respaldo sin índice en memoria)",
+    ("database.py:_productos_a_comparar", "LIKE"):
+        "LIKE '%término%' (respaldo sin índice en memoria)",
+    ("database.py:find_product_id_by_name", None):
+        "LIKE '%término%' (respaldo sin índice en memoria)",
+    ("database.py:buscar_cliente_por_email_o_nombre", "nombre LIKE"):
+        "búsqueda de clientes por parte del nombre",
+    ("database.py:_consulta_ventas_excel", None):
+        "el reporte exporta todas las ventas (en segundo plano, trabajos_exportacion.py)",
+    ("database.py:_marca_agua_exportacion", None):
+        "cuenta todas las ventas del reporte (en segundo plano)",
+    ("database.py:get_category_growth_analysis", None):
+        "ordena las categorías ya agregadas (unas decenas de filas)",
+    ("database.py:_consultar_ventas_producto", "FROM pedidos p"):
+        "respaldo sin ventas_diarias: ordena los días ya agregados",
+    ("database.py:_consultar_ventas_productos", "FROM pedidos p"):
+        "respaldo sin ventas_diarias: ordena los días ya agregados",
+}
+
+_ES_SQL = re.compile(r"\s*(SELECT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+# Valores de ejemplo para variables de f-strings que no son texto SQL
+EJEMPLOS_FSTRING = {"marcadores": "%s, %s", "modo": "IN NATURAL LANGUAGE MODE"}
+
+# ======================================================================
+# EXTRACCIÓN DE CONSULTAS
+# ======================================================================
+
+def _es_texto(nodo):
+    return (isinstance(nodo, ast.Constant) and isinstance(nodo.value, str)) or isinstance(nodo, ast.JoinedStr)
+
+def _renderizar(nodo, variables):
+    """
+    Texto de un literal o f-string. Las variables se reemplazan por su
+    primer valor conocido en la función; el resto de expresiones (listas de
+    marcadores armadas con join) por %s. None si no se puede resolver.
+    """
+    if isinstance(nodo, ast.Constant):
+        return nodo.value
+    partes = []
+    for parte in nodo.values:
+        if isinstance(parte, ast.Constant):
+            partes.append(parte.value)
+        elif isinstance(parte.value, ast.Name):
+            nombre = parte.value.id
+            if variables.get(nombre):
+                partes.append(variables[nombre][0][0])
+            elif nombre in EJEMPLOS_FSTRING:
+                partes.append(EJEMPLOS_FSTRING[nombre])
+            else:
+                return None
+        else:
+            partes.append("%s")
+    return "".join(partes)
+
+def extraer_consultas(ruta):
+    """
+    Devuelve [{archivo, funcion, linea, sql}] con las sentencias SQL de un
+    archivo. Una variable asignada en varias ramas (if/else) da una
+    sentencia por rama; los 'query +=' se agregan a la consulta más larga
+    posible (todos los filtros opcionales activos).
+    """
+    with open(ruta, encoding="utf-8") as f:
+        arbol = ast.parse(f.read())
+    archivo = os.path.basename(ruta)
+    # Cada función, y al final las constantes del módulo (SQL_... compartidas)
+    ambitos = [(f.name, list(ast.walk(f))) for f in ast.walk(arbol)
+               if isinstance(f, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    ambitos.append(("<módulo>", [n for sentencia in arbol.body if isinstance(sentencia, ast.Assign)
+                                 for n in (sentencia, sentencia.value)]))
+    consultas = []
+    for nombre_ambito, nodos in ambitos:
+        nodos = sorted((n for n in nodos if hasattr(n, "lineno")), key=lambda n: (n.lineno, n.col_offset))
+        dentro_de_fstring = {id(p) for n in nodos if isinstance(n, ast.JoinedStr) for p in n.values}
+        variables, asignados, sueltos = {}, set(), []
+        for nodo in nodos:
+            if (isinstance(nodo, ast.Assign) and len(nodo.targets) == 1
+                    and isinstance(nodo.targets[0], ast.Name) and _es_texto(nodo.value)):
+                texto = _renderizar(nodo.value, variables)
+                asignados.add(id(nodo.value))
+                if texto is not None:
+                    variables.setdefault(nodo.targets[0].id, []).append([texto, nodo.lineno])
+            elif (isinstance(nodo, ast.AugAssign) and isinstance(nodo.op, ast.Add)
+                  and isinstance(nodo.target, ast.Name) and _es_texto(nodo.value)):
+                texto = _renderizar(nodo.value, variables)
+                asignados.add(id(nodo.value))
+                for variante in variables.get(nodo.target.id, []):
+                    variante[0] += texto or ""
+            elif _es_texto(nodo) and id(nodo) not in dentro_de_fstring:
+                sueltos.append(nodo)
+
+        candidatos = [(texto, linea) for variantes in variables.values() for texto, linea in variantes]
+        candidatos += [(_renderizar(n, variables), n.lineno) for n in sueltos if id(n) not in asignados]
+        for texto, linea in candidatos:
+            if texto and _ES_SQL.match(texto):
+                consultas.append({"archivo": archivo, "funcion": nombre_ambito, "linea": linea,
+                                  "sql": " ".join(texto.split())})
+
+    # Las funciones anidadas se recorren dos veces (dentro de su padre y solas)
+    unicas = {}
+    for c in consultas:
+        unicas.setdefault((c["archivo"], c["sql"]), c)
+    return sorted(unicas.values(), key=lambda c: (c["archivo"], c["linea"]))
+
+def preparar(sql):
+    """
+    SQL ejecutable para EXPLAIN: parámetros reemplazados por valores de ejemplo.
+    """
+    sql = sql.strip().rstrip(";")
+    sql = re.sub(r"LIMIT\s+%s", "LIMIT 3", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"(LIKE\s+(?:LOWER\()?)%s", r"\1'%%1%%'", sql, flags=re.IGNORECASE)
+    return sql.replace("%s", "'1'").replace("%%", "%")
+
+def permitido(consulta):
+    clave = f"{consulta['archivo']}:{consulta['funcion']}"
+    for (funcion, fragmento), motivo in PERMITIDOS.items():
+        if funcion == clave and (fragmento is None or fragmento in consulta["sql"]):
+            return motivo
+    return None
+
+# ======================================================================
+# BASE DE PRUEBA
+# ======================================================================
+
+def _sentencias(texto):
+    """
+    Divide un archivo .sql en sentencias (respeta ';' dentro de comillas).
+    """
+    sentencias, actual, comilla, i = [], [], None, 0
+    while i < len(texto):
+        c = texto[i]
+        if comilla:
+            actual.append(c)
+            if c == "\\":
+                actual.append(texto[i + 1])
+                i += 1
+            elif c == comilla:
+                comilla = None
+        elif c in ("'", '"', "`"):
+            comilla = c
+            actual.append(c)
+        elif texto.startswith("-- ", i) or texto.startswith("--\n", i):
+            i = texto.find("\n", i)
+            if i < 0: break
+        elif c == ";":
+            sentencias.append("".join(actual).strip())
+            actual = []
+        else:
+            actual.append(c)
+        i += 1
+    sentencias.append("".join(actual).strip())
+    return [s for s in sentencias if s]
+
+def _ejecutar_archivo(cursor, ruta, omitir_insert=False, tolerar=()):
+    with open(ruta, encoding="utf-8") as f:
+        for sentencia in _sentencias(f.read()):
+            if omitir_insert and sentencia.upper().startswith("INSERT"):
+                continue
+            try:
+                cursor.execute(sentencia)
+            except mysql.connector.Error as e:
+                if e.errno not in tolerar:
+                    raise
+
+# Ya aplicadas en el volcado: índice/tabla duplicados o índice ya eliminado
+_ERRORES_MIGRACION_APLICADA = (1050, 1061, 1091)
+
+SEMILLAS = [
+    ("usuario", """
+        INSERT INTO usuario (id_usuario, nombre, email, region, permisos, verificado)
+        WITH RECURSIVE seq (n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < {usuarios})
+        SELECT n, CONCAT('Usuario ', n), CONCAT('usuario', n, '@bitware.test'),
+               ELT(1 + MOD(n, 5), 'Metropolitana', 'Valparaíso', 'Biobío', 'Maule', 'Araucanía'),
+               IF(MOD(n, 50) = 0, 'V', 'U'), 1
+        FROM seq"""),
+    ("producto", """
+        INSERT INTO producto (id_producto, nombre, descripcion, precio, stock, id_vendedor, categoria,
+                              imagen_principal, activo)
+        WITH RECURSIVE seq (n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < {productos})
+        SELECT n, CONCAT('Producto ', n), 'Producto sintético para revisar planes', 1000 + MOD(n * 37, 500000),
+               MOD(n * 7, 60), 50 * (1 + MOD(n, {vendedores})),
+               ELT(1 + MOD(n, 5), 'Tarjetas Gráficas', 'Procesadores', 'Memorias RAM', 'Almacenamiento', 'Periféricos'),
+               IF(MOD(n, 10) = 0, NULL, CONCAT('img/', n, '.jpg')), IF(MOD(n, 20) = 0, 0, 1)
+        FROM seq"""),
+    ("pedidos", """
+        INSERT INTO pedidos (id_pedido, fecha_pedido, total, estado, id_usuario)
+        WITH RECURSIVE seq (n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < {pedidos})
+        SELECT n, DATE_SUB(CURDATE(), INTERVAL MOD(n * 7919, {dias}) DAY), 1000 + MOD(n * 131, 900000),
+               ELT(1 + MOD(n * 31, 10), 'Pagado', 'Pagado', 'Enviado', 'Entregado', 'Entregado', 'Entregado',
+                   'Pendiente', 'Cancelado', 'Completado', 'Pagado'),
+               1 + MOD(n * 104729, {usuarios})
+        FROM seq"""),
+    ("pedidos_productos", """
+        INSERT INTO pedidos_productos (id_detalle, id_pedido, id_producto, cantidad, precio_unitario)
+        WITH RECURSIVE seq (n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < {lineas})
+        SELECT n, 1 + (n - 1) DIV 2, 1 + MOD(n * 7331, {productos}), 1 + MOD(n, 3), 1000 + MOD(n * 37, 500000)
+        FROM seq"""),
+    ("favoritos", """
+        INSERT IGNORE INTO favoritos (id_favorito, id_usuario, id_producto)
+        WITH RECURSIVE seq (n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < {otros})
+        SELECT n, 1 + MOD(n * 17, {usuarios}), 1 + MOD(n * n, {productos})
+        FROM seq"""),
+    ("contacto_mensajes", """
+        INSERT INTO contacto_mensajes (id, nombre, email, asunto, mensaje, leido)
+        WITH RECURSIVE seq (n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < {otros})
+        SELECT n, CONCAT('Cliente ', n), CONCAT('cliente', n, '@bitware.test'), 'Consulta', 'Mensaje de prueba',
+               IF(MOD(n, 20) = 0, 0, 2)
+        FROM seq"""),
+    ("solicitudes_servicio", """
+        INSERT INTO solicitudes_servicio (id, id_usuario, nombre_cliente, email_cliente, tipo_servicio,
+                                          descripcion_solicitud, estado)
+        WITH RECURSIVE seq (n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < {otros})
+        SELECT n, 1 + MOD(n, {usuarios}), CONCAT('Cliente ', n), CONCAT('cliente', n, '@bitware.test'),
+               'Armado de PC', 'Solicitud de prueba', IF(MOD(n, 20) = 0, 'Pendiente', 'Completado')
+        FROM seq"""),
+    ("notificaciones_stock", """
+        INSERT INTO notificaciones_stock (id_notificacion, id_usuario, id_producto, email_usuario, notificado)
+        WITH RECURSIVE seq (n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < {otros})
+        SELECT n, 1 + MOD(n, {usuarios}), 1 + MOD(n * 13, {productos}), CONCAT('usuario', n, '@bitware.test'),
+               IF(MOD(n, 10) = 0, 0, 1)
+        FROM seq"""),
+]
+
+def crear_base(conn, bd, pedidos, dias=730):
+    """
+    Crea la base de prueba: esquema del volcado (sin sus datos), migraciones,
+    volumen sintético (pedidos repartidos en los últimos 'dias'), resumen
+    ventas_diarias y estadísticas del optimizador. Devuelve los tamaños usados.
+    """
+    import ventas_diarias
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{bd}`")
+    cursor.execute(f"CREATE DATABASE `{bd}` CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci")
+    cursor.execute(f"USE `{bd}`")
+    _ejecutar_archivo(cursor, os.path.join(DIR_BD, "bitware.sql"), omitir_insert=True)
+    for migracion in sorted(glob.glob(os.path.join(DIR_BD, "migraciones", "*.sql"))):
+        _ejecutar_archivo(cursor, migracion, tolerar=_ERRORES_MIGRACION_APLICADA)
+    conn.commit()
+
+    usuarios = max(pedidos // 10, 100)
+    tamanos = {"pedidos": pedidos, "lineas": pedidos * 2, "usuarios": usuarios,
+               "productos": max(pedidos // 10, 100), "vendedores": max(usuarios // 50, 1),
+               "otros": max(pedidos // 10, 100), "dias": dias}
+    cursor.execute("SET SESSION cte_max_recursion_depth = %s", (tamanos["lineas"] + 1,))
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    for tabla, sql in SEMILLAS:
+        inicio = time.perf_counter()
+        cursor.execute(sql.format(**tamanos))
+        conn.commit()
+        print(f"  {tabla}: {cursor.rowcount} filas en {time.perf_counter() - inicio:.1f} s")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+
+    inicio = time.perf_counter()
+    ventas_diarias._actualizar(conn, todos=True)
+    print(f"  ventas_diarias: {time.perf_counter() - inicio:.1f} s")
+
+    cursor.execute("SHOW TABLES")
+    for (tabla,) in cursor.fetchall():
+        cursor.execute(f"ANALYZE TABLE `{tabla}`")
+        cursor.fetchall()
+    return tamanos
+
+# ======================================================================
+# REVISIÓN DE PLANES
+# ======================================================================
+
+def problemas_del_plan(plan):
+    """
+    Escaneos completos y filesorts de un EXPLAIN FORMAT=JSON.
+    """
+    encontrados = []
+    def recorrer(nodo):
+        if isinstance(nodo, dict):
+            tabla = nodo.get("table")
+            if (isinstance(tabla, dict) and tabla.get("access_type") == "ALL"
+                    and not tabla.get("table_name", "").startswith("<")):
+                encontrados.append(f"escaneo completo de {tabla.get('table_name')} "
+                                   f"({tabla.get('rows_examined_per_scan')} filas)")
+            if nodo.get("using_filesort"):
+                encontrados.append("filesort")
+            for valor in nodo.values():
+                recorrer(valor)
+        elif isinstance(nodo, list):
+            for valor in nodo:
+                recorrer(valor)
+    recorrer(plan)
+    return encontrados
+
+def revisar(cursor, consultas):
+    resultados = []
+    for consulta in consultas:
+        resultado = dict(consulta)
+        try:
+            cursor.execute("EXPLAIN FORMAT=JSON " + preparar(consulta["sql"]))
+            plan = json.loads(cursor.fetchone()[0])
+            resultado["problemas"] = problemas_del_plan(plan)
+            resultado["plan"] = plan
+        except mysql.connector.Error as e:
+            resultado["problemas"] = [f"error: {e.msg}"]
+        motivo = permitido(consulta)
+        if not resultado["problemas"]:
+            resultado["estado"] = "OK"
+        elif motivo and not resultado["problemas"][0].startswith("error"):
+            resultado["estado"], resultado["motivo"] = "PERMITIDO", motivo
+        else:
+            resultado["estado"] = "FALLA"
+        resultados.append(resultado)
+    return resultados
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bd", default="bitware_planes", help="Base de prueba (se borra y se crea de nuevo)")
+    parser.add_argument("--pedidos", type=int, default=200000, help="Pedidos sintéticos (el resto escala con este)")
+    parser.add_argument("--reutilizar", action="store_true", help="Usa la base de prueba ya sembrada")
+    parser.add_argument("--listar", action="store_true", help="Solo muestra las consultas extraídas (sin BD)")
+    parser.add_argument("--json", help="Guarda los resultados (con los planes) en este archivo")
+    args = parser.parse_args()
+
+    consultas = [c for archivo in ARCHIVOS for c in extraer_consultas(os.path.join(DIR_CHATBOT, archivo))]
+    if args.listar:
+        for c in consultas:
+            print(f"{c['archivo']}:{c['funcion']}:{c['linea']}\n    {preparar(c['sql'])}")
+        sys.exit(0)
+
+    if args.bd == DB_NAME:
+        sys.exit(f"--bd no puede ser la base de la aplicación ({DB_NAME}): se borra y se vuelve a crear.")
+    conn = mysql.connector.connect(host=DB_HOST, user=DB_USER, password=DB_PASS)
+    try:
+        if args.reutilizar:
+            conn.cursor().execute(f"USE `{args.bd}`")
+        else:
+            print(f"Creando {args.bd} con {args.pedidos} pedidos sintéticos...")
+            crear_base(conn, args.bd, args.pedidos)
+        resultados = revisar(conn.cursor(), consultas)
+    finally:
+        conn.close()
+
+    for r in resultados:
+        detalle = "; ".join(r["problemas"])
+        if r["estado"] == "PERMITIDO":
+            detalle += f" — {r['motivo']}"
+        print(f"{r['estado']:>9}  {r['archivo']}:{r['funcion']}:{r['linea']}  {detalle}")
+    fallas = [r for r in resultados if r["estado"] == "FALLA"]
+    print(f"\n{len(resultados)} consultas: {len(resultados) - len(fallas)} correctas, {len(fallas)} con problemas")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2, default=str)
+    sys.exit(1 if fallas else 0)
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor SMTP local de pruebas: acepta todos los correos, los cuenta y los
+descarta (o los imprime con --mostrar). Es el destino por defecto de los
+avisos de stock (NOTIFICACIONES_SMTP_HOST/PUERTO = localhost:1025).
+
+Con --latencia cada correo tarda esos milisegundos en aceptarse, como un
+servidor remoto; con --rechazar esas direcciones responden 550.
+
+Uso:
+    python benchmarks/smtp_local.py
+    python benchmarks/smtp_local.py --puerto 1025 --latencia 20 --mostrar
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+class ServidorSMTP(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, direccion, latencia=0.0, mostrar=False, rechazar=()):
+        super().__init__(direccion, _Sesion)
+        self.latencia, self.mostrar = latencia, mostrar
+        self.rechazar = {d.lower() for d in rechazar}
+        self.correos = 0
+        self.conexiones = 0
+        self.destinatarios = set()
+        self.lock = threading.Lock()
+
+    def estadisticas(self):
+        with self.lock:
+            return {"correos": self.correos, "destinatarios": len(self.destinatarios),
+                    "conexiones": self.conexiones}
+
+class _Sesion(socketserver.StreamRequestHandler):
+    def _responder(self, linea):
+        self.wfile.write(linea.encode("ascii") + b"\r\n")
+
+    def _leer_datos(self):
+        lineas = []
+        while True:
+            linea = self.rfile.readline()
+            if not linea or linea == b".\r\n":
+                return b"".join(lineas)
+            lineas.append(linea)
+
+    def handle(self):
+        servidor = self.server
+        with servidor.lock:
+            servidor.conexiones += 1
+        self._responder("220 smtp_local listo")
+        destinatarios = []
+        while True:
+            linea = self.rfile.readline()
+            if not linea:
+                return
+            comando = linea.decode("utf-8", "replace").strip()
+            verbo = comando[:4].upper()
+            if verbo in ("EHLO", "HELO"):
+                self._responder("250 smtp_local")
+            elif verbo == "MAIL":
+                destinatarios = []
+                self._responder("250 OK")
+            elif verbo == "RCPT":
+                direccion = comando.partition(":")[2].strip().strip("<>").lower()
+                if direccion in servidor.rechazar:
+                    self._responder("550 Buzon inexistente")
+                else:
+                    destinatarios.append(direccion)
+                    self._responder("250 OK")
+            elif verbo == "DATA":
+                self._responder("354 Terminar con <CRLF>.<CRLF>")
+                datos = self._leer_datos()
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+                with servidor.lock:
+                    servidor.correos += 1
+                    servidor.destinatarios.update(destinatarios)
+                if servidor.mostrar:
+                    print(f"--- Para {', '.join(destinatarios)} ---\n{datos.decode('utf-8', 'replace')}")
+                self._responder("250 OK")
+            elif verbo == "QUIT":
+                self._responder("221 Adios")
+                return
+            else:  # RSET, NOOP, ...
+                self._responder("250 OK")
+
+def iniciar(puerto=0, latencia_ms=0.0, mostrar=False, rechazar=()):
+    """
+    Levanta el servidor en un hilo. Devuelve (servidor, puerto); detener con
+    servidor.shutdown().
+    """
+    servidor = ServidorSMTP(("127.0.0.1", puerto), latencia_ms / 1000, mostrar, rechazar)
+    threading.Thread(target=servidor.serve_forever, name="smtp_local", daemon=True).start()
+    return servidor, servidor.server_address[1]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--puerto", type=int, default=1025)
+    parser.add_argument("--latencia", type=float, default=0.0, help="Milisegundos por correo")
+    parser.add_argument("--mostrar", action="store_true", help="Imprime cada correo recibido")
+    parser.add_argument("--rechazar", nargs="*", default=(), help="Direcciones que se rechazan con 550")
+    args = parser.parse_args()
+
+    servidor, puerto = iniciar(args.puerto, args.latencia, args.mostrar, args.rechazar)
+    print(f"📭 SMTP local en 127.0.0.1:{puerto} (Ctrl+C para salir)")
+    try:
+        anterior = None
+        while True:
+            time.sleep(10)
+            actual = servidor.estadisticas()
+            if actual != anterior:
+                print(f"   {actual}")
+                anterior = actual
+    except KeyboardInterrupt:
+        servidor.shutdown()
@@ -0,0 +1,46 @@
+import os
+import tempfile
+
+import pandas as pd
+
+from config import EXPORTES_CACHE_DIR
+
+# ======================================================================
+# ALMACÉN DE RESÚMENES DE EXPORTACIÓN
+# ======================================================================
+# Un archivo por alcance ('global' o 'vendedor_<id>') con el detalle ya
+# consultado (None en modo streaming), las tablas resumen acumuladas y la
+# marca de agua (máximo id_pedido, nº de líneas y firma) del último Excel generado.
+# Vive fuera de static/ porque contiene datos de clientes.
+
+def _ruta(alcance):
+    return os.path.join(EXPORTES_CACHE_DIR, f"{alcance}.pkl")
+
+def obtener(alcance):
+    """
+    Devuelve el estado guardado para el alcance, o None.
+    """
+    try:
+        return pd.read_pickle(_ruta(alcance))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"!!! ERROR leyendo resumen de exportación '{alcance}': {e}")
+        return None
+
+def guardar(alcance, estado):
+    # Escritura atómica, igual que en cache_predicciones
+    fd, tmp = tempfile.mkstemp(dir=EXPORTES_CACHE_DIR, suffix='.tmp')
+    os.close(fd)
+    try:
+        pd.to_pickle(estado, tmp)
+        os.replace(tmp, _ruta(alcance))
+    except Exception:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+
+def invalidar(alcance):
+    try:
+        os.remove(_ruta(alcance))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+
+# ======================================================================
+# CACHÉ LRU EN MEMORIA
+# ======================================================================
+# Diccionario acotado y seguro entre hilos: al llenarse descarta la entrada
+# usada hace más tiempo. Con ttl (segundos), además, las entradas caducan.
+# Lleva la cuenta de aciertos y fallos para poder medir su efectividad.
+
+_AUSENTE = object()
+
+class CacheLRU:
+    def __init__(self, max_entradas, ttl=None):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos = OrderedDict()  # clave -> (valor, instante de expiración)
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave, defecto=None):
+        with self._lock:
+            valor, expira = self._datos.get(clave, (_AUSENTE, None))
+            if valor is not _AUSENTE and expira is not None and expira < time.monotonic():
+                del self._datos[clave]
+                valor = _AUSENTE
+            if valor is _AUSENTE:
+                self.fallos += 1
+                return defecto
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def contiene(self, clave):
+        """
+        True si la clave está vigente; no cuenta como acierto ni fallo.
+        """
+        with self._lock:
+            valor, expira = self._datos.get(clave, (_AUSENTE, None))
+            return valor is not _AUSENTE and (expira is None or expira >= time.monotonic())
+
+    def guardar(self, clave, valor):
+        expira = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._datos[clave] = (valor, expira)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def invalidar(self, clave=_AUSENTE):
+        """
+        Elimina una clave, o todo el contenido si no se indica ninguna.
+        """
+        with self._lock:
+            if clave is _AUSENTE:
+                self._datos.clear()
+            else:
+                self._datos.pop(clave, None)
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._datos),
+                "max_entradas": self.max_entradas,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 3) if consultas else 0.0
+            }
@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+
+from config import PREDICCIONES_DIR
+
+# ======================================================================
+# ALMACÉN DE PRONÓSTICOS POR PRODUCTO
+# ======================================================================
+# Cada entrada guarda el último pronóstico calculado para un producto junto
+# con la "marca de agua" de sus ventas (última fecha pagada + nº de líneas).
+# Si la marca no cambió, el pronóstico se devuelve sin volver a ajustar
+# el modelo. Los parámetros ajustados se guardan para usarlos como
+# valores iniciales (warm start) cuando llegan pocos días nuevos.
+#
+# Las entradas se persisten como un JSON por producto en PREDICCIONES_DIR,
+# así el worker nocturno (worker_predicciones.py), los procesos de
+# revalidación y el servidor Flask comparten los mismos resultados.
+
+def _ruta(id_producto):
+    return os.path.join(PREDICCIONES_DIR, f"producto_{int(id_producto)}.json")
+
+def obtener(id_producto):
+    """
+    Devuelve la entrada guardada para el producto, o None.
+    """
+    try:
+        with open(_ruta(id_producto), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (ValueError, OSError) as e:
+        print(f"!!! ERROR leyendo pronóstico guardado del producto {id_producto}: {e}")
+        return None
+
+def guardar(id_producto, marca_agua, resultado, params, ultimo_dia, segundos_ajuste=None, motor=None):
+    """
+    Guarda el pronóstico de un producto.
+    - marca_agua: tupla serializable que identifica el estado de las ventas.
+    - params: lista de parámetros ajustados del modelo (para warm start).
+    - ultimo_dia: último día (YYYY-MM-DD) de la serie usada en el ajuste.
+    - motor: motor pedido ('auto' o uno concreto); el usado va en resultado["motor"].
+    """
+    entrada = {
+        "marca_agua": list(marca_agua),
+        "resultado": resultado,
+        "params": list(params) if params is not None else None,
+        "ultimo_dia": ultimo_dia,
+        "segundos_ajuste": segundos_ajuste,
+        "motor": motor
+    }
+    # Escritura atómica: otro proceso nunca lee un JSON a medio escribir
+    fd, tmp = tempfile.mkstemp(dir=PREDICCIONES_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entrada, f, ensure_ascii=False)
+        os.replace(tmp, _ruta(id_producto))
+    except Exception:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+
+def invalidar(id_producto=None):
+    """
+    Elimina la entrada de un producto, o todas si no se indica ninguno.
+    """
+    if id_producto is not None:
+        try:
+            os.remove(_ruta(id_producto))
+        except FileNotFoundError:
+            pass
+        return
+    for nombre in os.listdir(PREDICCIONES_DIR):
+        if nombre.startswith('producto_') and nombre.endswith('.json'):
+            os.remove(os.path.join(PREDICCIONES_DIR, nombre))
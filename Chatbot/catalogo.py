@@ -0,0 +1,434 @@
+import bisect
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from cache_lru import CacheLRU
+from config import CATALOGO_INDICE, CATALOGO_REFRESCO_SEG
+
+# ======================================================================
+# ÍNDICE EN MEMORIA DEL CATÁLOGO
+# ======================================================================
+# Las búsquedas del chat (buscar, comparar, avisos de stock, predicción por
+# nombre) usaban LIKE '%término%' sobre producto, que no puede usar índices.
+# Aquí se mantiene una copia de la tabla con un índice invertido de tokens
+# normalizados (sin mayúsculas ni tildes) y se responde sin ir a la BD.
+#
+# Dos tipos de consulta:
+# - buscar(): semántica del LIKE (el término es subcadena del campo). El
+#   índice invertido solo acota los candidatos.
+# - buscar_ranking(): BM25 sobre nombre, categoría y descripción, con
+#   tolerancia a errores de tipeo ("rizen" -> "ryzen") y selección top-k.
+#
+# Refresco: cada CATALOGO_REFRESCO_SEG se consulta una firma barata de la
+# tabla (nº de filas, id máximo y XOR de los CRC32 de cada fila). Si cambió,
+# se comparan los CRC por fila y solo se recargan las filas nuevas o
+# modificadas. El refresco corre en un hilo aparte y consulta la BD sin
+# bloquear las búsquedas. Si la BD no responde al cargar, disponible()
+# devuelve False y database.py usa las consultas LIKE de siempre.
+
+_COLUMNAS = "id_producto, nombre, precio, imagen_principal, stock, categoria, descripcion, id_vendedor, activo"
+_CRC_FILA = "CRC32(CONCAT_WS('|', nombre, precio, imagen_principal, stock, categoria, descripcion, id_vendedor, activo))"
+_TOKEN_RE = re.compile(r"\w+")
+_LOTE_RECARGA = 1000
+
+# BM25F: peso de cada campo en la puntuación
+PESOS_CAMPOS = {"nombre": 3.0, "categoria": 1.5, "descripcion": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Multiplicador de los términos expandidos (prefijo o error de tipeo a distancia 1/2)
+PESO_PREFIJO = 0.8
+PESO_TIPEO = {1: 0.7, 2: 0.4}
+_MAX_EXPANSIONES = 30
+
+_lock = threading.Lock()           # índice: búsquedas y aplicación de cambios
+_lock_refresco = threading.Lock()  # un solo refresco a la vez (consulta la BD sin _lock)
+_productos = {}                 # id_producto -> fila (dict)
+_normalizados = {}              # id_producto -> {campo: texto normalizado}
+_crc = {}                       # id_producto -> CRC32 de la fila
+_indice = {campo: defaultdict(dict) for campo in PESOS_CAMPOS}  # token -> {id_producto: frecuencia}
+_longitudes = {campo: {} for campo in PESOS_CAMPOS}             # id_producto -> nº de tokens
+_suma_longitudes = dict.fromkeys(PESOS_CAMPOS, 0)
+_firma = None
+_ultimo_refresco = 0.0
+
+# Estructuras derivadas del texto; se reconstruyen cuando cambia algún texto
+_compilados = {}                # token -> (ids, puntuación BM25F por producto) en arrays
+_vocabulario = []               # tokens ordenados (búsqueda por prefijo)
+_trigramas = defaultdict(set)   # trigrama -> tokens del vocabulario
+_expansiones = CacheLRU(10000)  # token de consulta -> [(token, peso)]
+_max_id = 0
+_texto_sucio = True
+
+def normalizar(texto):
+    """
+    Minúsculas y sin tildes ni diacríticos ('Ratón Óptico' -> 'raton optico').
+    """
+    if texto is None:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", str(texto).lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+def _tokens(texto_normalizado):
+    return set(_TOKEN_RE.findall(texto_normalizado))
+
+# ======================================================================
+# CARGA Y REFRESCO (_indexar y _quitar se llaman con _lock tomado)
+# ======================================================================
+
+def _indexar(fila):
+    global _texto_sucio
+    pid = fila["id_producto"]
+    textos = {campo: normalizar(fila.get(campo)) for campo in PESOS_CAMPOS}
+    if _normalizados.get(pid) == textos:
+        # Solo cambiaron precio, stock, etc.: el índice de texto no se toca
+        _productos[pid] = fila
+        return
+    _quitar(pid)
+    _productos[pid] = fila
+    _normalizados[pid] = textos
+    for campo in PESOS_CAMPOS:
+        frecuencias = Counter(_TOKEN_RE.findall(textos[campo]))
+        for token, tf in frecuencias.items():
+            _indice[campo][token][pid] = tf
+        _longitudes[campo][pid] = sum(frecuencias.values())
+        _suma_longitudes[campo] += _longitudes[campo][pid]
+    _texto_sucio = True
+
+def _quitar(pid):
+    global _texto_sucio
+    anteriores = _normalizados.pop(pid, None)
+    _productos.pop(pid, None)
+    if not anteriores:
+        return
+    for campo in PESOS_CAMPOS:
+        for token in _tokens(anteriores[campo]):
+            ids = _indice[campo].get(token)
+            if ids is not None:
+                ids.pop(pid, None)
+                if not ids:
+                    del _indice[campo][token]
+        _suma_longitudes[campo] -= _longitudes[campo].pop(pid, 0)
+    _texto_sucio = True
+
+def _leer_filas(cursor, ids):
+    filas = []
+    for i in range(0, len(ids), _LOTE_RECARGA):
+        lote = ids[i:i + _LOTE_RECARGA]
+        marcadores = ", ".join(["%s"] * len(lote))
+        cursor.execute(f"SELECT {_COLUMNAS}, {_CRC_FILA} AS crc FROM producto WHERE id_producto IN ({marcadores})",
+                       tuple(lote))
+        filas.extend(cursor.fetchall())
+    for fila in filas:
+        if fila.get("precio") is not None:
+            fila["precio"] = float(fila["precio"])
+    return filas
+
+def _refrescar():
+    """
+    Se llama con _lock_refresco tomado. Las consultas a la BD van sin _lock
+    (las búsquedas siguen con el índice actual); solo la aplicación de los
+    cambios, en memoria, lo toma.
+    """
+    global _firma, _ultimo_refresco
+    import database as db
+    try:
+        with db.conexion() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f"SELECT COUNT(*) AS n, MAX(id_producto) AS m, BIT_XOR({_CRC_FILA}) AS x FROM producto")
+            fila = cursor.fetchone()
+            firma = (fila["n"], fila["m"], fila["x"])
+            if firma == _firma:
+                return True
+            # _crc solo lo modifica este hilo: se puede leer sin _lock
+            cursor.execute(f"SELECT id_producto, {_CRC_FILA} AS crc FROM producto")
+            actuales = {f["id_producto"]: f["crc"] for f in cursor.fetchall()}
+            quitados = set(_crc) - set(actuales)
+            cambiados = [pid for pid, crc in actuales.items() if _crc.get(pid) != crc]
+            filas = _leer_filas(cursor, cambiados)
+    except Exception as e:
+        # Incluye ConexionNoDisponible: se reintenta en el próximo refresco
+        print(f"!!! ERROR refrescando el catálogo en memoria: {e}")
+        return False
+    finally:
+        _ultimo_refresco = time.monotonic()
+
+    with _lock:
+        for pid in quitados:
+            _quitar(pid)
+            del _crc[pid]
+        for fila in filas:
+            _crc[fila["id_producto"]] = fila.pop("crc")
+            _indexar(fila)
+        recarga = _firma is not None
+        _firma = firma
+    if recarga and cambiados:
+        print(f"🔄 Catálogo en memoria: {len(cambiados)} productos recargados")
+    return True
+
+def _refrescar_en_fondo():
+    try:
+        _refrescar()
+    finally:
+        _lock_refresco.release()
+
+def disponible():
+    """
+    True si el índice está cargado; False si está desactivado o aún no se
+    pudo cargar (usar la BD). La primera carga la hace el hilo que la
+    dispara (los demás van a la BD mientras tanto); los refrescos, un hilo
+    aparte mientras se sigue buscando en el índice actual.
+    """
+    if not CATALOGO_INDICE:
+        return False
+    transcurrido = time.monotonic() - _ultimo_refresco
+    if _firma is None:
+        # Primera carga o reintento tras un fallo
+        if transcurrido > CATALOGO_REFRESCO_SEG / 10 and _lock_refresco.acquire(blocking=False):
+            try:
+                _refrescar()
+            finally:
+                _lock_refresco.release()
+        return _firma is not None
+    if transcurrido > CATALOGO_REFRESCO_SEG and _lock_refresco.acquire(blocking=False):
+        threading.Thread(target=_refrescar_en_fondo, name="catalogo", daemon=True).start()
+    return True
+
+def invalidar():
+    """
+    Fuerza un refresco en la próxima consulta (tras escribir en producto).
+    """
+    global _ultimo_refresco
+    _ultimo_refresco = 0.0
+
+# ======================================================================
+# BÚSQUEDA TIPO LIKE
+# ======================================================================
+
+def _tokens_que_contienen(token):
+    """
+    Tokens del vocabulario que contienen al token (vía índice de trigramas).
+    None si el token es demasiado corto para acotar (menos de 3 letras).
+    """
+    if len(token) < 3:
+        return None
+    conjuntos = sorted((_trigramas.get(token[i:i + 3], set()) for i in range(len(token) - 2)), key=len)
+    return [v for v in set.intersection(*conjuntos) if token in v]
+
+def _candidatos(termino, campo):
+    """
+    IDs cuyo campo puede contener el término: cada token del término debe
+    ser subcadena de algún token del campo.
+    """
+    indice = _indice[campo]
+    resultado = None
+    for token in sorted(_tokens(termino), key=len, reverse=True):
+        contenedores = _tokens_que_contienen(token)
+        if contenedores is None:
+            continue
+        ids = set()
+        for contenedor in contenedores:
+            ids.update(indice.get(contenedor, ()))
+        resultado = ids if resultado is None else resultado & ids
+        if not resultado:
+            return set()
+    # Sin tokens que acoten (solo símbolos o palabras muy cortas): se revisan todos
+    return resultado if resultado is not None else set(_productos)
+
+def _filtrar(pid, solo_activos, id_vendedor):
+    fila = _productos[pid]
+    if solo_activos and not fila["activo"]:
+        return False
+    if id_vendedor and str(fila["id_vendedor"]) != str(id_vendedor):
+        return False
+    return True
+
+def buscar(terminos, campos=("nombre",), limite=None, solo_activos=False, id_vendedor=None):
+    """
+    Equivalente en memoria de WHERE (campo LIKE '%t%' OR ...) para uno o
+    varios términos, sin distinguir mayúsculas ni tildes. Devuelve copias
+    de las filas ordenadas por id_producto.
+    """
+    if isinstance(terminos, str):
+        terminos = [terminos]
+    normalizados = [normalizar(t) for t in terminos]
+    with _lock:
+        if _texto_sucio:
+            _reconstruir_derivados()
+        ids = set()
+        for termino in normalizados:
+            for campo in campos:
+                ids |= {pid for pid in _candidatos(termino, campo) if termino in _normalizados[pid][campo]}
+        filas = []
+        for pid in sorted(ids):
+            if not _filtrar(pid, solo_activos, id_vendedor):
+                continue
+            filas.append(dict(_productos[pid]))
+            if limite and len(filas) >= limite:
+                break
+        return filas
+
+def obtener(id_producto):
+    with _lock:
+        fila = _productos.get(id_producto)
+        return dict(fila) if fila else None
+
+# ======================================================================
+# BÚSQUEDA CON RANKING (BM25 + TOLERANCIA A ERRORES DE TIPEO)
+# ======================================================================
+
+def _trigramas_de(token):
+    relleno = f"${token}$"
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+def _distancia_edicion(a, b, maximo):
+    """
+    Damerau-Levenshtein (transposiciones adyacentes). Corta en cuanto la
+    distancia supera 'maximo' y devuelve maximo + 1.
+    """
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    anterior2, anterior = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            costo = 0 if ca == cb else 1
+            actual[j] = min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + costo)
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                actual[j] = min(actual[j], anterior2[j - 2] + 1)
+        if min(actual) > maximo:
+            return maximo + 1
+        anterior2, anterior = anterior, actual
+    return anterior[-1]
+
+def _reconstruir_derivados():
+    """
+    Recalcula el vocabulario y el índice de trigramas y descarta las
+    puntuaciones compiladas (cambian idf y longitudes medias).
+    """
+    global _vocabulario, _max_id, _texto_sucio
+    _max_id = max(_productos, default=0)
+    vocabulario = set()
+    for campo in PESOS_CAMPOS:
+        vocabulario.update(_indice[campo])
+    _vocabulario = sorted(vocabulario)
+    _trigramas.clear()
+    for token in _vocabulario:
+        for trigrama in _trigramas_de(token):
+            _trigramas[trigrama].add(token)
+    _compilados.clear()
+    _expansiones.invalidar()
+    _texto_sucio = False
+
+def _en_vocabulario(token):
+    i = bisect.bisect_left(_vocabulario, token)
+    return i < len(_vocabulario) and _vocabulario[i] == token
+
+def _expandir(token):
+    """
+    Tokens del vocabulario que representan al token de la consulta, con su
+    peso: el propio token (1.0), los que empiezan por él y, si no existe
+    en el vocabulario, los que están a distancia de edición 1-2.
+    """
+    expansiones = _expansiones.obtener(token)
+    if expansiones is not None:
+        return expansiones
+    expansiones = {}
+    if _en_vocabulario(token):
+        expansiones[token] = 1.0
+    if len(token) >= 3:
+        i = bisect.bisect_right(_vocabulario, token)
+        while i < len(_vocabulario) and _vocabulario[i].startswith(token) and len(expansiones) < _MAX_EXPANSIONES:
+            expansiones[_vocabulario[i]] = PESO_PREFIJO
+            i += 1
+    if token not in expansiones and len(token) >= 3:
+        maximo = 1 if len(token) <= 5 else 2
+        trigramas = _trigramas_de(token)
+        coincidencias = Counter()
+        for trigrama in trigramas:
+            coincidencias.update(_trigramas.get(trigrama, ()))
+        # Cada edición rompe a lo sumo 3 trigramas
+        minimo = max(1, len(trigramas) - 3 * maximo)
+        for candidato, comunes in coincidencias.most_common(_MAX_EXPANSIONES * 4):
+            if comunes < minimo:
+                break
+            distancia = _distancia_edicion(token, candidato, maximo)
+            if distancia <= maximo:
+                expansiones.setdefault(candidato, PESO_TIPEO[distancia])
+    expansiones = list(expansiones.items())
+    _expansiones.guardar(token, expansiones)
+    return expansiones
+
+def _compilar(token):
+    """
+    Puntuación BM25F del token para cada producto que lo contiene, como
+    arrays (ids, puntuaciones). Se calcula una vez por token y se reutiliza
+    hasta que cambie el texto del catálogo.
+    """
+    compilado = _compilados.get(token)
+    if compilado is not None:
+        return compilado
+    total = len(_productos) or 1
+    puntuaciones = defaultdict(float)
+    for campo, peso in PESOS_CAMPOS.items():
+        postings = _indice[campo].get(token)
+        if not postings:
+            continue
+        idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+        longitud_media = _suma_longitudes[campo] / total or 1
+        longitudes = _longitudes[campo]
+        for pid, tf in postings.items():
+            norma = BM25_K1 * (1 - BM25_B + BM25_B * longitudes[pid] / longitud_media)
+            puntuaciones[pid] += peso * idf * tf * (BM25_K1 + 1) / (tf + norma)
+    compilado = (np.fromiter(puntuaciones.keys(), dtype=np.int64, count=len(puntuaciones)),
+                 np.fromiter(puntuaciones.values(), dtype=float, count=len(puntuaciones)))
+    _compilados[token] = compilado
+    return compilado
+
+def buscar_ranking(termino, limite=3, solo_activos=False, id_vendedor=None, excluir=()):
+    """
+    Los 'limite' productos más relevantes para el término según BM25F sobre
+    nombre, categoría y descripción. Tolera errores de tipeo y palabras
+    incompletas. Devuelve copias de las filas con la clave 'puntaje',
+    ordenadas de mayor a menor relevancia.
+    """
+    tokens = list(dict.fromkeys(_TOKEN_RE.findall(normalizar(termino))))
+    with _lock:
+        if _texto_sucio:
+            _reconstruir_derivados()
+        # Acumulación densa indexada por id_producto (sin ordenar ni agrupar)
+        totales = np.zeros(_max_id + 1)
+        tocados = np.zeros(_max_id + 1, dtype=bool)
+        for token in tokens:
+            for expansion, peso in _expandir(token):
+                ids_token, puntajes_token = _compilar(expansion)
+                # Dentro de un token los ids no se repiten: la suma indexada es segura
+                totales[ids_token] += puntajes_token * peso
+                tocados[ids_token] = True
+        unicos = np.flatnonzero(tocados)
+        if not len(unicos):
+            return []
+        totales = totales[unicos]
+
+        # Top-k: selección parcial (O(n)) y orden solo de los preseleccionados.
+        # Se preseleccionan de más por si los filtros descartan alguno.
+        k = min(len(unicos), max(limite * 8, 32))
+        while True:
+            preseleccion = np.argpartition(-totales, k - 1)[:k] if k < len(unicos) else np.arange(len(unicos))
+            orden = preseleccion[np.lexsort((unicos[preseleccion], -totales[preseleccion]))]
+            filas = []
+            for i in orden:
+                pid = int(unicos[i])
+                if pid in excluir or not _filtrar(pid, solo_activos, id_vendedor):
+                    continue
+                filas.append(dict(_productos[pid], puntaje=round(float(totales[i]), 4)))
+                if len(filas) >= limite:
+                    return filas
+            if k >= len(unicos):
+                return filas
+            k = len(unicos)
@@ -0,0 +1,239 @@
+import functools
+import sys
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector import pooling
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+from config import DB_CONFIG, DB_POOL_ESPERA_SEG, DB_POOL_FUGA_SEG
+
+# ======================================================================
+# POOL DE CONEXIONES GESTIONADO
+# ======================================================================
+# Un solo pool de DB_POOL_TAMANO conexiones por proceso, para las dos vías
+# de acceso a MySQL:
+# - mysql.connector (consultas del chat): el pool de la librería falla al
+#   instante cuando se agota; aquí se espera hasta DB_POOL_ESPERA_SEG por
+#   una conexión libre. Cada préstamo se verifica (ping con reconexión) y se
+#   registra quién la pidió: las que siguen prestadas tras DB_POOL_FUGA_SEG
+#   se reportan, y las que se pierden sin close() vuelven al pool.
+# - motor SQLAlchemy (pandas): sin pool propio (NullPool); cada conexión
+#   que abre es un préstamo de este mismo pool (creator=) y vuelve a él al
+#   cerrarse, así que cuenta contra el mismo límite, espera y detección de fugas.
+# estadisticas() sirve para detectar y dimensionar la falta de conexiones
+# bajo carga (/pool_stats).
+
+class ConexionNoDisponible(Exception):
+    """
+    No hay servidor o no se liberó ninguna conexión en DB_POOL_ESPERA_SEG.
+    """
+
+class _Prestada:
+    """
+    Conexión prestada. Se usa igual que la de mysql.connector (también como
+    conexión DBAPI de SQLAlchemy); close() la devuelve al pool aunque el
+    servidor la haya cortado.
+    """
+    _PROPIOS = frozenset(("_pool", "_real", "_cerrada", "origen", "desde", "avisada"))
+
+    def __init__(self, pool, real, origen):
+        self._pool, self._real, self._cerrada = pool, real, False
+        self.origen, self.desde, self.avisada = origen, time.monotonic(), False
+
+    def __getattr__(self, nombre):
+        return getattr(self._real, nombre)
+
+    def __setattr__(self, nombre, valor):
+        # p. ej. conn.autocommit = True (SQLAlchemy) va a la conexión real
+        if nombre in _Prestada._PROPIOS:
+            object.__setattr__(self, nombre, valor)
+        else:
+            setattr(self._real, nombre, valor)
+
+    def close(self):
+        if self._cerrada: return
+        self._cerrada = True
+        try:
+            self._real.close()
+        except mysql.connector.Error:
+            pass  # conexión cortada: mysql.connector la devuelve igual al pool
+        finally:
+            self._pool._devolver(self)
+
+    def __del__(self):
+        # Nadie llamó a close(): se recupera la conexión y se cuenta la fuga
+        if not self._cerrada:
+            self._pool._fugas += 1
+            print(f"⚠️  Conexión a MySQL no cerrada por {self.origen}; se devuelve al pool.")
+            self.close()
+
+_PAQUETES_INTERMEDIOS = ("sqlalchemy", "pandas")
+
+def _origen():
+    # Primer marco fuera de esta capa (y de SQLAlchemy/pandas): quién pidió la conexión
+    marco = sys._getframe(1)
+    while marco and (marco.f_code.co_filename in (__file__, _ARCHIVO_CONTEXTLIB)
+                     or marco.f_globals.get("__name__", "").partition(".")[0] in _PAQUETES_INTERMEDIOS):
+        marco = marco.f_back
+    if not marco:
+        return "desconocido"
+    return f"{marco.f_code.co_name} ({marco.f_code.co_filename.rsplit('/', 1)[-1]}:{marco.f_lineno})"
+
+_ARCHIVO_CONTEXTLIB = contextmanager.__code__.co_filename
+
+class PoolGestionado:
+    def __init__(self, config, espera=DB_POOL_ESPERA_SEG, umbral_fuga=DB_POOL_FUGA_SEG):
+        self.tamano = config["pool_size"]
+        self.espera, self.umbral_fuga = espera, umbral_fuga
+        self._config = {k: v for k, v in config.items() if not k.startswith("pool_")}
+        try:
+            self._pool = pooling.MySQLConnectionPool(**config)
+            print("✅  Pool de conexiones MySQL inicializado correctamente.")
+        except Exception as e:
+            # Sin pool (p. ej. la BD no respondía al arrancar): conexiones directas, mismo límite
+            print(f"❌  Error al crear el pool de conexiones: {e}")
+            self._pool = None
+        self._cupos = threading.BoundedSemaphore(self.tamano)
+        self._lock = threading.RLock()  # __del__ de una conexión perdida puede llegar con el lock tomado
+        self._prestadas = weakref.WeakSet()  # sin retenerlas: las perdidas llegan a __del__
+        self._ultimo_escaneo = time.monotonic()
+        self._prestamos = self._esperas = self._agotados = self._fallos_salud = self._fugas = 0
+        self._espera_total = self._espera_max = 0.0
+        self._max_en_uso = 0
+
+    def prestar(self):
+        """
+        Devuelve una conexión verificada o lanza ConexionNoDisponible.
+        """
+        if not self._cupos.acquire(blocking=False):
+            inicio = time.perf_counter()
+            obtenido = self._cupos.acquire(timeout=self.espera)
+            esperado = time.perf_counter() - inicio
+            with self._lock:
+                self._esperas += 1
+                self._espera_total += esperado
+                self._espera_max = max(self._espera_max, esperado)
+                if not obtenido:
+                    self._agotados += 1
+            if not obtenido:
+                raise ConexionNoDisponible(f"Pool agotado: {self.tamano} conexiones en uso durante {self.espera}s")
+        try:
+            # get_connection hace ping y reconecta si el servidor cerró la conexión
+            real = self._pool.get_connection() if self._pool else mysql.connector.connect(**self._config)
+        except Exception as e:
+            self._cupos.release()
+            with self._lock:
+                self._fallos_salud += 1
+            raise ConexionNoDisponible(str(e)) from e
+        conn = _Prestada(self, real, _origen())
+        with self._lock:
+            self._prestadas.add(conn)
+            self._prestamos += 1
+            self._max_en_uso = max(self._max_en_uso, len(self._prestadas))
+        self._escanear_fugas()
+        return conn
+
+    def _devolver(self, conn):
+        with self._lock:
+            self._prestadas.discard(conn)
+        self._cupos.release()
+
+    def _escanear_fugas(self, forzar=False):
+        ahora = time.monotonic()
+        if not forzar and ahora - self._ultimo_escaneo < min(5.0, self.umbral_fuga):
+            return []
+        self._ultimo_escaneo = ahora
+        with self._lock:
+            retenidas = [c for c in self._prestadas if ahora - c.desde > self.umbral_fuga]
+        for conn in retenidas:
+            if not conn.avisada:
+                conn.avisada = True
+                print(f"⚠️  Conexión a MySQL prestada hace {ahora - conn.desde:.1f}s por {conn.origen} (¿fuga?)")
+        return retenidas
+
+    def estadisticas(self):
+        retenidas = self._escanear_fugas(forzar=True)
+        with self._lock:
+            return {
+                "tamano": self.tamano,
+                "en_uso": len(self._prestadas),
+                "max_en_uso": self._max_en_uso,
+                "prestamos": self._prestamos,
+                "esperas": self._esperas,
+                "espera_media_ms": round(self._espera_total / self._esperas * 1000, 2) if self._esperas else 0.0,
+                "espera_max_ms": round(self._espera_max * 1000, 2),
+                "agotados": self._agotados,
+                "fallos_salud": self._fallos_salud,
+                "fugas_recuperadas": self._fugas,
+                "retenidas": sorted(f"{c.origen}: {time.monotonic() - c.desde:.1f}s" for c in retenidas),
+            }
+
+# ======================================================================
+# INSTANCIAS DEL PROCESO
+# ======================================================================
+
+_pool = PoolGestionado(DB_CONFIG)
+
+def prestar():
+    return _pool.prestar()
+
+_prestamos_motor = 0
+
+def _prestar_motor():
+    global _prestamos_motor
+    _prestamos_motor += 1
+    return _pool.prestar()
+
+# Usado para operaciones con Pandas (Predicciones y Excel); sus conexiones salen de _pool
+motor = create_engine("mysql+mysqlconnector://", creator=_prestar_motor, poolclass=NullPool)
+
+@contextmanager
+def conexion():
+    """
+    with conexion() as conn: ... La conexión vuelve al pool al salir del
+    bloque, haya o no excepción. Lanza ConexionNoDisponible si no hay.
+    """
+    conn = _pool.prestar()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+def si_no_hay_conexion(valor):
+    """
+    Decorador para funciones que usan `with conexion()`: si no hay conexión
+    (ConexionNoDisponible), lo informa y devuelve 'valor', lo que el
+    llamador espera cuando no hay BD. Si 'valor' es una clase (list, dict)
+    se devuelve una instancia nueva, para no compartir el mismo objeto.
+    """
+    def decorar(funcion):
+        @functools.wraps(funcion)
+        def envuelta(*args, **kwargs):
+            try:
+                return funcion(*args, **kwargs)
+            except ConexionNoDisponible as err:
+                print(f"Error al obtener conexión del pool en {funcion.__name__}: {err}")
+                return valor() if isinstance(valor, type) else valor
+        return envuelta
+    return decorar
+
+def reiniciar():
+    """
+    Para procesos creados con fork después de importar este módulo
+    (gunicorn.conf.py con preload_app): descarta las conexiones heredadas del
+    proceso padre, que no pueden compartirse, y abre un pool propio.
+    """
+    global _pool
+    _pool = PoolGestionado(DB_CONFIG)
+
+def estadisticas():
+    """
+    Estadísticas del pool; 'prestamos_pandas' son los préstamos que pidió
+    el motor SQLAlchemy (incluidos en 'prestamos').
+    """
+    return dict(_pool.estadisticas(), prestamos_pandas=_prestamos_motor)
@@ -9,6 +9,23 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # Aseguramos que static/exports exista, ya que se usa en database.py
 EXPORT_DIR = os.path.join(BASE_DIR, 'static', 'exports')
 os.makedirs(EXPORT_DIR, exist_ok=True)
+# Resúmenes incrementales de las exportaciones (fuera de static/: contienen datos de clientes)
+EXPORTES_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'exportes')
+os.makedirs(EXPORTES_CACHE_DIR, exist_ok=True)
+# Exportación en streaming (memoria constante, no incremental): 'global' (solo reporte admin), 'todos' o 'nunca'
+EXPORT_STREAMING = os.getenv('EXPORT_STREAMING', 'global')
+EXPORT_LOTE_FILAS = int(os.getenv('EXPORT_LOTE_FILAS', '5000'))
+# Cola de exportaciones: hilos, limpieza de static/exports y vida de los trabajos terminados (s)
+EXPORT_WORKERS = int(os.getenv('EXPORT_WORKERS', '2'))
+EXPORT_MAX_HORAS = float(os.getenv('EXPORT_MAX_HORAS', '24'))
+EXPORT_MAX_MB = float(os.getenv('EXPORT_MAX_MB', '500'))
+EXPORT_TRABAJOS_TTL = int(os.getenv('EXPORT_TRABAJOS_TTL', '3600'))
+# Generar cada Excel en un proceso aparte en vez de en un hilo: no compite por el GIL con
+# las peticiones, pero el progreso no se informa hasta terminar (asgi.py lo activa)
+EXPORT_EN_PROCESOS = os.getenv('EXPORT_EN_PROCESOS', 'False').lower() in ('true', '1', 't')
+# Estado de los trabajos de exportación (un JSON por trabajo, compartido entre procesos)
+EXPORT_TRABAJOS_DIR = os.path.join(BASE_DIR, 'cache', 'trabajos_exportacion')
+os.makedirs(EXPORT_TRABAJOS_DIR, exist_ok=True)
 
 # --- BASE DE DATOS ---
 DB_HOST = os.getenv('DB_HOST', 'localhost')
@@ -18,7 +35,7 @@ DB_NAME = os.getenv('DB_NAME', 'bitware')
 
 DB_CONFIG = {
     'pool_name': "bitware_pool",
-    'pool_size': 10,
+    'pool_size': int(os.getenv('DB_POOL_TAMANO', '10')),
     'pool_reset_session': True,
     'host': DB_HOST,
     'user': DB_USER,
@@ -26,7 +43,116 @@ DB_CONFIG = {
     'database': DB_NAME
 }
 
-SQLALCHEMY_DATABASE_URI = f'mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}/{DB_NAME}'
+# Pool gestionado (conexiones.py): segundos máximos esperando una conexión libre
+# antes de rendirse, y segundos que una conexión puede estar prestada antes de
+# reportarse como posible fuga
+DB_POOL_ESPERA_SEG = float(os.getenv('DB_POOL_ESPERA_SEG', '5'))
+DB_POOL_FUGA_SEG = float(os.getenv('DB_POOL_FUGA_SEG', '30'))
 
 # --- FLASK ---
 FLASK_DEBUG = os.getenv('FLASK_DEBUG', 'False').lower() in ('true', '1', 't')
+
+# --- PREDICCIONES ---
+# Pronósticos precalculados (un JSON por producto, compartido entre procesos)
+PREDICCIONES_DIR = os.path.join(BASE_DIR, 'cache', 'predicciones')
+os.makedirs(PREDICCIONES_DIR, exist_ok=True)
+# Mínimo de días con ventas para poder ajustar el modelo
+PREDICCION_MIN_DIAS = int(os.getenv('PREDICCION_MIN_DIAS', '15'))
+# Máximo de días nuevos de ventas para reutilizar los parámetros del último ajuste (warm start)
+PREDICCION_DIAS_WARM_START = int(os.getenv('PREDICCION_DIAS_WARM_START', '7'))
+# Stale-while-revalidate: la petición nunca espera un ajuste; devuelve lo guardado
+# y recalcula en segundo plano
+PREDICCION_STALE_WHILE_REVALIDATE = os.getenv('PREDICCION_STALE_WHILE_REVALIDATE', 'False').lower() in ('true', '1', 't')
+PREDICCION_WORKERS_REVALIDACION = int(os.getenv('PREDICCION_WORKERS_REVALIDACION', '1'))
+# Procesos para /predict_demand/batch (0 = uno por núcleo) y máximo de productos por lote
+PREDICCION_WORKERS_LOTE = int(os.getenv('PREDICCION_WORKERS_LOTE', '0'))
+PREDICCION_MAX_LOTE = int(os.getenv('PREDICCION_MAX_LOTE', '500'))
+# Segundos que el chat espera un pronóstico del pool de tareas largas; pasado ese plazo
+# responde que se está calculando (el pool largo termina el ajuste y lo deja en caché)
+PREDICCION_CHAT_TIMEOUT = float(os.getenv('PREDICCION_CHAT_TIMEOUT', '20'))
+# Motor de pronóstico: 'sarimax' (por defecto, el de siempre), 'holt_winters', 'naive_estacional' o 'auto'
+# 'auto' (opcional: cambia los pronósticos de las series cortas) elige por los días con ventas:
+# naive (< HOLT_WINTERS) / Holt-Winters (< SARIMAX) / SARIMAX. El usado va en la respuesta ("motor")
+PREDICCION_MOTOR = os.getenv('PREDICCION_MOTOR', 'sarimax')
+PREDICCION_AUTO_DIAS_HOLT_WINTERS = int(os.getenv('PREDICCION_AUTO_DIAS_HOLT_WINTERS', '21'))
+PREDICCION_AUTO_DIAS_SARIMAX = int(os.getenv('PREDICCION_AUTO_DIAS_SARIMAX', '60'))
+
+# --- NLP ---
+# Caché LRU de mensaje normalizado -> intención (nº máximo de mensajes distintos)
+NLP_CACHE_MAX = int(os.getenv('NLP_CACHE_MAX', '4096'))
+
+# --- CATÁLOGO EN MEMORIA ---
+# Índice de productos para las búsquedas del chat (False = siempre consultar la BD)
+CATALOGO_INDICE = os.getenv('CATALOGO_INDICE', 'True').lower() in ('true', '1', 't')
+# Cada cuántos segundos se comprueba si la tabla producto cambió
+CATALOGO_REFRESCO_SEG = int(os.getenv('CATALOGO_REFRESCO_SEG', '60'))
+
+# --- RECOMENDACIONES (recomendaciones.py) ---
+# Modelo de co-compras y popularidad en memoria (False = productos más nuevos con stock)
+RECOMENDACIONES = os.getenv('RECOMENDACIONES', 'True').lower() in ('true', '1', 't')
+# Cada cuántos segundos se recalcula el modelo (en segundo plano)
+RECOMENDACIONES_REFRESCO_SEG = int(os.getenv('RECOMENDACIONES_REFRESCO_SEG', '600'))
+# Vecinos guardados por producto y productos recientes del usuario que se consideran
+RECOMENDACIONES_VECINOS = int(os.getenv('RECOMENDACIONES_VECINOS', '20'))
+RECOMENDACIONES_HISTORIAL = int(os.getenv('RECOMENDACIONES_HISTORIAL', '10'))
+
+# --- BÚSQUEDA DE PRODUCTOS ---
+# Motor de las búsquedas con ranking del chat (buscar y comparar productos):
+# 'memoria' (índice en memoria, BM25), 'fulltext' (MATCH ... AGAINST; requiere
+# BD/migraciones/001_producto_fulltext.sql) o 'like'. Si falla, se usa LIKE.
+BUSQUEDA_BACKEND = os.getenv('BUSQUEDA_BACKEND', 'memoria')
+# Modo FULLTEXT: 'natural' (lenguaje natural) o 'booleano' (exige todas las palabras, admite prefijos)
+BUSQUEDA_FULLTEXT_MODO = os.getenv('BUSQUEDA_FULLTEXT_MODO', 'natural')
+
+# --- MÉTRICAS DEL ADMIN ---
+# Segundos que se reutilizan los contadores del panel (alertas, estadísticas, ventas de hoy)
+METRICAS_ADMIN_TTL = int(os.getenv('METRICAS_ADMIN_TTL', '30'))
+
+# --- RESUMEN DIARIO DE VENTAS ---
+# Tablas ventas_diarias* (BD/migraciones/002_ventas_diarias.sql); False = agrupar los pedidos en cada consulta
+VENTAS_DIARIAS = os.getenv('VENTAS_DIARIAS', 'True').lower() in ('true', '1', 't')
+# Cada cuántos segundos se incorporan los pedidos nuevos al resumen
+VENTAS_DIARIAS_REFRESCO_SEG = int(os.getenv('VENTAS_DIARIAS_REFRESCO_SEG', '60'))
+# Días recientes que se recalculan en cada refresco (cambios de estado hechos desde la web)
+VENTAS_DIARIAS_DIAS_RECALCULO = int(os.getenv('VENTAS_DIARIAS_DIAS_RECALCULO', '7'))
+
+# --- AVISOS DE STOCK (notificaciones_stock.py) ---
+# Segundos entre pasadas del despachador y filas por consulta/UPDATE
+NOTIFICACIONES_INTERVALO_SEG = int(os.getenv('NOTIFICACIONES_INTERVALO_SEG', '30'))
+NOTIFICACIONES_LOTE = int(os.getenv('NOTIFICACIONES_LOTE', '1000'))
+# Servidor de correo (por defecto uno local de pruebas: python benchmarks/smtp_local.py)
+NOTIFICACIONES_SMTP_HOST = os.getenv('NOTIFICACIONES_SMTP_HOST', 'localhost')
+NOTIFICACIONES_SMTP_PUERTO = int(os.getenv('NOTIFICACIONES_SMTP_PUERTO', '1025'))
+NOTIFICACIONES_SMTP_USUARIO = os.getenv('NOTIFICACIONES_SMTP_USUARIO', '')
+NOTIFICACIONES_SMTP_CLAVE = os.getenv('NOTIFICACIONES_SMTP_CLAVE', '')
+NOTIFICACIONES_SMTP_TLS = os.getenv('NOTIFICACIONES_SMTP_TLS', 'False').lower() in ('true', '1', 't')
+NOTIFICACIONES_REMITENTE = os.getenv('NOTIFICACIONES_REMITENTE', 'Bitware <no-reply@bitware.site>')
+# Conexiones SMTP simultáneas (cada una en su hilo, reutilizada entre correos)
+NOTIFICACIONES_SMTP_CONEXIONES = int(os.getenv('NOTIFICACIONES_SMTP_CONEXIONES', '4'))
+
+# --- CONTEXTO DE SESIÓN ---
+# Caché por usuario de último pedido, elegibilidad de devolución y contadores del vendedor
+SESIONES_CACHE_MAX = int(os.getenv('SESIONES_CACHE_MAX', '10000'))
+# Segundos de vigencia (0 = desactivada); los cambios hechos desde la web se ven al caducar
+SESIONES_CACHE_TTL = int(os.getenv('SESIONES_CACHE_TTL', '30'))
+
+# --- MODO ASGI (asgi.py) ---
+# Conexiones máximas del pool asíncrono de MySQL (aiomysql)
+ASYNC_DB_POOL_MAX = int(os.getenv('ASYNC_DB_POOL_MAX', '20'))
+# Hilos para el trabajo que sigue siendo bloqueante (consultas síncronas, rutas Flask)
+ASGI_HILOS_IO = int(os.getenv('ASGI_HILOS_IO', '32'))
+
+# --- SERVIDOR DE PRODUCCIÓN (gunicorn.conf.py) ---
+# Procesos del pool de chat (0 = uno por núcleo) e hilos por proceso
+GUNICORN_WORKERS = int(os.getenv('GUNICORN_WORKERS', '0'))
+GUNICORN_HILOS = int(os.getenv('GUNICORN_HILOS', '8'))
+# Procesos del pool de tareas largas: pronósticos y exportaciones (0 = la mitad de los núcleos)
+GUNICORN_WORKERS_LARGO = int(os.getenv('GUNICORN_WORKERS_LARGO', '0'))
+# Dirección interna del pool de tareas largas ('' = todo se atiende en este proceso, como app.py)
+SERVIDOR_URL_LARGO = os.getenv('SERVIDOR_URL_LARGO', '')
+
+# --- MÉTRICAS (/metrics) ---
+# Instrumentación de latencias (False = solo se miden las peticiones HTTP)
+METRICAS_HABILITADAS = os.getenv('METRICAS_HABILITADAS', 'True').lower() in ('true', '1', 't')
+# Segundos a partir de los cuales una petición se registra como lenta, con su desglose (0 = no registrar)
+METRICAS_LENTA_SEG = float(os.getenv('METRICAS_LENTA_SEG', '2'))
@@ -1,298 +1,555 @@
 import mysql.connector
-from mysql.connector import pooling
-from sqlalchemy import create_engine
 import pandas as pd
-from openpyxl import load_workbook
+from openpyxl import Workbook, load_workbook
 from openpyxl.chart import BarChart, PieChart, LineChart, Reference
-import warnings
 from datetime import datetime
+from collections import defaultdict
+from itertools import zip_longest
 import os
-from statsmodels.tsa.statespace.sarimax import SARIMAX
+import re
+import threading
 
 # Importación local de configuración
-from config import DB_CONFIG, SQLALCHEMY_DATABASE_URI, EXPORT_DIR
+from config import (EXPORT_DIR, EXPORT_STREAMING, EXPORT_LOTE_FILAS,
+                    PREDICCION_STALE_WHILE_REVALIDATE, PREDICCION_MOTOR, BUSQUEDA_BACKEND, BUSQUEDA_FULLTEXT_MODO,
+                    METRICAS_ADMIN_TTL)
+import cache_exportes
+import conexiones
+import metricas
+from cache_lru import CacheLRU
+import catalogo
+import recomendaciones
+import ventas_diarias
+import sesiones
+import cache_predicciones
+import pronostico
 
-# --- CONEXIÓN SQLALCHEMY ---
-# Usada para operaciones con Pandas (Predicciones y Excel)
-db_engine = create_engine(SQLALCHEMY_DATABASE_URI, pool_size=5, max_overflow=10)
+# --- CONEXIONES ---
+# Pool gestionado de mysql.connector, del que también saca sus conexiones el motor
+# SQLAlchemy (Pandas): conexiones.py
+# `with conexion() as conn:` devuelve la conexión al pool al salir del bloque; si
+# no hay conexión, @si_no_hay_conexion responde con el valor de respaldo de la función
+db_engine = conexiones.motor
+conexion = conexiones.conexion
+si_no_hay_conexion = conexiones.si_no_hay_conexion
 
-# --- MYSQL CONNECTION POOL ---
-try:
-    db_pool = pooling.MySQLConnectionPool(**DB_CONFIG)
-    print("✅  Pool de conexiones MySQL inicializado correctamente.")
-except Exception as e:
-    print(f"❌  Error al crear el pool de conexiones: {e}")
-    db_pool = None
+def reiniciar_conexiones():
+    conexiones.reiniciar()
 
-def conectar_db():
-    """
-    Obtiene una conexión del pool gestionado.
-    Es mucho más eficiente que abrir/cerrar conexiones reales cada vez.
-    """
-    if not db_pool:
-        # Fallback si el pool falló (intenta conectar directo)
-        try:
-            return mysql.connector.connect(**DB_CONFIG)
-        except mysql.connector.Error as err:
-            print(f"Error Crítico DB (Fallback): {err}")
-            return None
-            
-    try:
-        connection = db_pool.get_connection()
-        if connection.is_connected():
-            return connection
-    except Exception as err:
-        print(f"Error al obtener conexión del pool: {err}")
-        return None
-    return None
+def estadisticas_pool():
+    return conexiones.estadisticas()
 
 # ======================================================================
 # FUNCIONES DE BASE DE DATOS
 # ======================================================================
 
-def recomendar_productos():
-    conn = conectar_db()
-    if not conn: return []
-    try:
+@si_no_hay_conexion(list)
+def recomendar_productos(id_usuario=None, limite=3):
+    # Modelo en memoria: según las compras y favoritos del usuario, o populares si es invitado
+    productos = recomendaciones.recomendar(id_usuario, limite)
+    if productos is not None:
+        return productos
+    with conexion() as conn:
         cursor = conn.cursor(dictionary=True)
-        query = "SELECT id_producto AS id, nombre, precio, imagen_principal FROM producto WHERE stock > 0 AND imagen_principal IS NOT NULL AND activo = 1 ORDER BY RAND() LIMIT 3"
-        cursor.execute(query)
+        # Sin modelo (desactivado o aún cargando): los más nuevos, recorriendo la clave primaria
+        query = "SELECT id_producto AS id, nombre, precio, imagen_principal FROM producto WHERE stock > 0 AND imagen_principal IS NOT NULL AND activo = 1 ORDER BY id_producto DESC LIMIT %s"
+        cursor.execute(query, (limite,))
         productos = cursor.fetchall()
         for p in productos:
             if p.get('precio'): p['precio'] = float(p['precio'])
         return productos
-    finally:
-        if conn and conn.is_connected(): conn.close()
 
+# --- BÚSQUEDA FULLTEXT ---
+# MATCH ... AGAINST sobre el índice ft_producto_busqueda. Si el índice no
+# existe (migración sin aplicar) se desactiva y se vuelve al LIKE.
+_ERROR_SIN_INDICE_FULLTEXT = 1191  # ER_FT_MATCHING_KEY_NOT_FOUND
+_MIN_LARGO_PALABRA_FULLTEXT = 3    # innodb_ft_min_token_size por defecto
+_fulltext_disponible = True
+
+def _expresion_fulltext(termino):
+    palabras = [p for p in re.findall(r"\w+", termino) if len(p) >= _MIN_LARGO_PALABRA_FULLTEXT]
+    if BUSQUEDA_FULLTEXT_MODO == 'booleano':
+        return " ".join(f"+{p}*" for p in palabras), "IN BOOLEAN MODE"
+    return " ".join(palabras), "IN NATURAL LANGUAGE MODE"
+
+@si_no_hay_conexion(None)
+def _buscar_fulltext(termino, limite=3, solo_activos=True, excluir=()):
+    """
+    Productos ordenados por relevancia FULLTEXT. Devuelve None si la búsqueda
+    no se puede resolver con el índice (no existe, error o término con solo
+    palabras cortas): el llamador usa LIKE.
+    """
+    global _fulltext_disponible
+    expresion, modo = _expresion_fulltext(termino)
+    if not _fulltext_disponible or not expresion:
+        return None
+    with conexion() as conn:
+        try:
+            cursor = conn.cursor(dictionary=True)
+            match = f"MATCH(nombre, categoria, descripcion) AGAINST (%s {modo})"
+            query = f"SELECT id_producto, nombre, precio, imagen_principal, descripcion, {match} AS puntaje FROM producto WHERE {match}"
+            params = [expresion, expresion]
+            if solo_activos:
+                query += " AND activo = 1"
+            if excluir:
+                query += f" AND id_producto NOT IN ({', '.join(['%s'] * len(excluir))})"
+                params += list(excluir)
+            query += " ORDER BY puntaje DESC LIMIT %s"
+            params.append(limite)
+            cursor.execute(query, tuple(params))
+            productos = cursor.fetchall()
+            for p in productos:
+                if p.get('precio') is not None: p['precio'] = float(p['precio'])
+            return productos
+        except mysql.connector.Error as e:
+            if e.errno == _ERROR_SIN_INDICE_FULLTEXT:
+                print("⚠️  Falta el índice FULLTEXT de producto (BD/migraciones/001_producto_fulltext.sql): se usará LIKE.")
+                _fulltext_disponible = False
+            else:
+                print(f"!!! ERROR en búsqueda FULLTEXT: {e}")
+            return None
+
+def _buscar_con_ranking(termino, limite, excluir=()):
+    """
+    Búsqueda ordenada por relevancia con el motor configurado (índice en
+    memoria o FULLTEXT). None si no está disponible: usar LIKE.
+    """
+    if BUSQUEDA_BACKEND == 'memoria' and catalogo.disponible():
+        return catalogo.buscar_ranking(termino, limite=limite, solo_activos=True, excluir=excluir)
+    if BUSQUEDA_BACKEND == 'fulltext':
+        return _buscar_fulltext(termino, limite=limite, excluir=excluir)
+    return None
+
+@si_no_hay_conexion(list)
 def buscar_productos_por_nombre(termino_busqueda):
-    conn = conectar_db()
-    if not conn: return []
-    try:
-        cursor = conn.cursor(dictionary=True)
+    productos = _buscar_con_ranking(termino_busqueda, limite=3)
+    if productos is not None:
+        return [{"id": p["id_producto"], "nombre": p["nombre"], "precio": p["precio"],
+                 "imagen_principal": p["imagen_principal"]} for p in productos]
+    with conexion() as conn:
+        try:
+            cursor = conn.cursor(dictionary=True)
+            query = """
+                SELECT id_producto AS id, nombre, precio, imagen_principal
+                FROM producto
+                WHERE (nombre LIKE %s OR categoria LIKE %s)
+                  AND activo = 1
+                LIMIT 3
+            """
+            like_term = f"%{termino_busqueda}%"
+            cursor.execute(query, (like_term, like_term))
+            productos = cursor.fetchall()
+            processed_productos = []
+            for p in productos:
+                try:
+                    if p.get('precio') is not None:
+                        p['precio'] = float(p['precio'])
+                    processed_productos.append(p)
+                except Exception as e:
+                    print(f"!!! ERROR: Procesando producto {p.get('id')}: {e}")
+            return processed_productos
+        except Exception as e:
+            print(f"!!! ERROR inesperado en buscar_productos_por_nombre: {e}")
+            return []
+
+def _consulta_ventas_excel(id_vendedor, es_admin, desde_id_pedido=None):
+    """
+    Arma la consulta del detalle de ventas. Con desde_id_pedido solo trae
+    las líneas de pedidos posteriores (exportación incremental).
+    """
+    columnas = """
+            DATE(p.fecha_pedido) AS 'Fecha',
+            p.id_pedido AS 'ID Pedido',
+            pr.nombre AS 'Producto',
+            pr.categoria AS 'Categoria',
+            pp.cantidad AS 'Cantidad',
+            pp.precio_unitario AS 'Precio Unitario',
+            (pp.cantidad * pp.precio_unitario) AS 'Total Venta',
+            p.estado AS 'Estado Pedido',
+            u.nombre AS 'Cliente',
+            u.email AS 'Email Cliente',
+            u.region AS 'Region'"""
+    if es_admin:
+        columnas += ",\n            pr.id_vendedor AS 'ID Vendedor'"
+    query = f"""
+        SELECT {columnas}
+        FROM pedidos_productos pp
+        JOIN pedidos p ON pp.id_pedido = p.id_pedido
+        JOIN producto pr ON pp.id_producto = pr.id_producto
+        JOIN usuario u ON p.id_usuario = u.id_usuario
+        WHERE p.estado IN ('Pagado', 'Enviado', 'Entregado')
+    """
+    params = []
+    if not es_admin:
+        query += " AND pr.id_vendedor = %s"
+        params.append(id_vendedor)
+    if desde_id_pedido is not None:
+        query += " AND p.id_pedido > %s"
+        params.append(desde_id_pedido)
+    query += " ORDER BY p.fecha_pedido DESC"
+    return query, tuple(params) or None
+
+@si_no_hay_conexion(None)
+def _marca_agua_exportacion(id_vendedor, es_admin, hasta_id_pedido=None):
+    """
+    (máximo id_pedido, nº de líneas, firma) de las ventas que entrarían en el
+    reporte; con hasta_id_pedido, solo de los pedidos hasta ese ID. El nº de
+    líneas detecta pedidos antiguos que entraron o salieron del reporte; la
+    firma (XOR de un CRC32 por línea con su estado, cantidad y precio), los
+    que cambiaron sin salir (p. ej. de 'Pagado' a 'Enviado'). La tabla
+    pedidos no tiene fecha de actualización que sirva para esto.
+    """
+    with conexion() as conn:
+        cursor = conn.cursor()
         query = """
-            SELECT id_producto AS id, nombre, precio, imagen_principal
-            FROM producto
-            WHERE (nombre LIKE %s OR categoria LIKE %s)
-              AND activo = 1
-            LIMIT 3
+            SELECT MAX(p.id_pedido), COUNT(*),
+                   BIT_XOR(CRC32(CONCAT_WS('|', pp.id_detalle, p.estado, pp.cantidad, pp.precio_unitario)))
+            FROM pedidos_productos pp
+            JOIN pedidos p ON pp.id_pedido = p.id_pedido
+            JOIN producto pr ON pp.id_producto = pr.id_producto
+            JOIN usuario u ON p.id_usuario = u.id_usuario
+            WHERE p.estado IN ('Pagado', 'Enviado', 'Entregado')
         """
-        like_term = f"%{termino_busqueda}%"
-        cursor.execute(query, (like_term, like_term))
-        productos = cursor.fetchall()
-        processed_productos = []
-        for p in productos:
-            try:
-                if p.get('precio') is not None:
-                    p['precio'] = float(p['precio'])
-                processed_productos.append(p)
-            except Exception as e:
-                print(f"!!! ERROR: Procesando producto {p.get('id')}: {e}")
-        return processed_productos
-    except Exception as e:
-        print(f"!!! ERROR inesperado en buscar_productos_por_nombre: {e}")
-        return []
-    finally:
-        if conn and conn.is_connected():
-            conn.close()
+        params = ()
+        if not es_admin:
+            query += " AND pr.id_vendedor = %s"
+            params = (id_vendedor,)
+        if hasta_id_pedido is not None:
+            query += " AND p.id_pedido <= %s"
+            params += (hasta_id_pedido,)
+        cursor.execute(query, params)
+        max_id, lineas, firma = cursor.fetchone()
+        return (int(max_id) if max_id is not None else 0, int(lineas), int(firma))
+
+def _sumar_por(df, columna):
+    return df.groupby(columna)['Total Venta'].sum()
+
+def _resumenes_excel(df):
+    """Sumas de 'Total Venta' por producto, categoría, región y fecha."""
+    return {col: _sumar_por(df, col) for col in ('Producto', 'Categoria', 'Region', 'Fecha')}
+
+def _acumular_resumenes(resumenes, nuevas):
+    """Suma los resúmenes de las líneas nuevas sobre los ya guardados."""
+    return {col: resumenes[col].add(serie, fill_value=0) for col, serie in _resumenes_excel(nuevas).items()}
 
-def generar_excel_ventas(id_vendedor, base_url, es_admin=False):
+def _agregar_graficos(ws, filas_prod, filas_cat, filas_reg, filas_date):
+    """
+    Agrega los 4 gráficos a la hoja Dashboard. filas_*: filas de cada tabla
+    resumen contando el encabezado (tablas en A-B, D-E, G-H y J-K).
+    """
+    # --- GRÁFICO 1: BARRAS (Productos) ---
+    chart1 = BarChart()
+    chart1.type = "col"
+    chart1.style = 10
+    chart1.title = "Top Productos (Ingresos)"
+    chart1.y_axis.title = "$"
+    chart1.x_axis.title = "Producto"
+    
+    data1 = Reference(ws, min_col=2, min_row=1, max_row=filas_prod, max_col=2)
+    cats1 = Reference(ws, min_col=1, min_row=2, max_row=filas_prod)
+    chart1.add_data(data1, titles_from_data=True)
+    chart1.set_categories(cats1)
+    chart1.width = 18
+    chart1.height = 10
+    ws.add_chart(chart1, "A20") 
+
+    # --- GRÁFICO 2: TORTA (Categorías) ---
+    chart2 = PieChart()
+    chart2.title = "Ventas por Categoría"
+    
+    data2 = Reference(ws, min_col=5, min_row=1, max_row=filas_cat, max_col=5)
+    cats2 = Reference(ws, min_col=4, min_row=2, max_row=filas_cat)
+    chart2.add_data(data2, titles_from_data=True)
+    chart2.set_categories(cats2)
+    ws.add_chart(chart2, "F20") 
+
+    # --- GRÁFICO 3: TORTA (Regiones) ---
+    chart3 = PieChart()
+    chart3.title = "Ventas por Región"
+    
+    data3 = Reference(ws, min_col=8, min_row=1, max_row=filas_reg, max_col=8)
+    cats3 = Reference(ws, min_col=7, min_row=2, max_row=filas_reg)
+    chart3.add_data(data3, titles_from_data=True)
+    chart3.set_categories(cats3)
+    ws.add_chart(chart3, "K20")
+
+    # --- GRÁFICO 4: LÍNEA (Tendencia) ---
+    chart4 = LineChart()
+    chart4.title = "Tendencia de Ventas (Diaria)"
+    chart4.style = 12
+    chart4.y_axis.title = "$"
+    chart4.x_axis.title = "Fecha"
+    
+    data4 = Reference(ws, min_col=11, min_row=1, max_row=filas_date, max_col=11)
+    cats4 = Reference(ws, min_col=10, min_row=2, max_row=filas_date)
+    chart4.add_data(data4, titles_from_data=True)
+    chart4.set_categories(cats4)
+    chart4.width = 30
+    chart4.height = 10
+    ws.add_chart(chart4, "A40")
+
+def _tablas_resumen(resumenes):
+    # Tabla A: Productos (Columna A=1, B=2)
+    res_prod = resumenes['Producto'].to_frame('Total Venta').sort_values('Total Venta', ascending=False).reset_index()
+    # Tabla B: Categorías (Columna D=4, E=5)
+    res_cat = resumenes['Categoria'].to_frame('Total Venta').reset_index()
+    # Tabla C: Regiones (Columna G=7, H=8)
+    res_reg = resumenes['Region'].to_frame('Total Venta').sort_values('Total Venta', ascending=False).head(10).reset_index()
+    # Tabla D: Fechas (Columna J=10, K=11)
+    res_date = resumenes['Fecha'].to_frame('Total Venta').sort_index().reset_index()
+    return res_prod, res_cat, res_reg, res_date
+
+def _escribir_excel(filepath, df, resumenes):
+    # --- 3. CREAR TABLAS RESUMEN ---
+    res_prod, res_cat, res_reg, res_date = _tablas_resumen(resumenes)
+
+    with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='Detalle', index=False)
+        
+        # Ubicamos las tablas separadas por una columna vacía
+        res_prod.to_excel(writer, sheet_name='Dashboard', startcol=0, index=False)  # Cols A, B
+        res_cat.to_excel(writer, sheet_name='Dashboard', startcol=3, index=False)   # Cols D, E
+        res_reg.to_excel(writer, sheet_name='Dashboard', startcol=6, index=False)   # Cols G, H
+        res_date.to_excel(writer, sheet_name='Dashboard', startcol=9, index=False)  # Cols J, K
+
+    # --- 4. GENERAR GRÁFICOS (CORREGIDO) ---
+    wb = load_workbook(filepath)
+    ws = wb['Dashboard']
+    _agregar_graficos(ws, len(res_prod) + 1, len(res_cat) + 1, len(res_reg) + 1, len(res_date) + 1)
+    wb.save(filepath)
+
+def _escribir_excel_streaming(filepath, columnas, lotes, progreso=None, total_filas=None):
+    """
+    Escribe el reporte en una sola pasada y con memoria constante:
+    la hoja 'Detalle' se escribe fila a fila (openpyxl write-only) mientras
+    se acumulan los resúmenes; al final se escribe el Dashboard con sus
+    gráficos, sin volver a abrir el archivo.
+    lotes: iterable de listas de filas con las columnas de 'columnas'.
+    progreso: función opcional que recibe el % avanzado tras cada lote.
+    Devuelve los resúmenes (None si no hubo filas).
+    """
+    wb = Workbook(write_only=True)
+    ws_detalle = wb.create_sheet('Detalle')
+    ws_dash = wb.create_sheet('Dashboard')
+    ws_detalle.append(columnas)
+
+    i_total = columnas.index('Total Venta')
+    indices = [(col, columnas.index(col), defaultdict(float)) for col in ('Producto', 'Categoria', 'Region', 'Fecha')]
+    filas = 0
+    for lote in lotes:
+        for fila in lote:
+            fila = tuple(fila)
+            ws_detalle.append(fila)
+            total = float(fila[i_total] or 0)
+            for _, i, acumulado in indices:
+                # Igual que groupby: las claves nulas no se agrupan
+                if fila[i] is not None:
+                    acumulado[fila[i]] += total
+            filas += 1
+        if progreso and total_filas:
+            progreso(min(95, 5 + 90 * filas // total_filas))
+    if filas == 0:
+        return None
+
+    resumenes = {col: pd.Series(dict(acumulado), dtype=float).sort_index().rename_axis(col)
+                 for col, _, acumulado in indices}
+    tablas = _tablas_resumen(resumenes)
+
+    # Las 4 tablas van lado a lado, separadas por una columna vacía
+    encabezado = []
+    for tabla in tablas:
+        encabezado += list(tabla.columns) + [None]
+    ws_dash.append(encabezado[:-1])
+    for grupo in zip_longest(*(tabla.itertuples(index=False) for tabla in tablas)):
+        fila = []
+        for valores in grupo:
+            fila += (list(valores) if valores is not None else [None, None]) + [None]
+        ws_dash.append(fila[:-1])
+
+    _agregar_graficos(ws_dash, *(len(tabla) + 1 for tabla in tablas))
+    wb.save(filepath)
+    return resumenes
+
+def _exportar_streaming(filepath, id_vendedor, es_admin, progreso=None, total_filas=None):
+    """
+    Lee las ventas con un cursor sin buffer de mysql.connector (por lotes de
+    EXPORT_LOTE_FILAS) y las escribe con _escribir_excel_streaming. El
+    dialecto mysqlconnector de SQLAlchemy no tiene cursores del lado del
+    servidor, así que aquí se usa la conexión del pool directamente.
+    """
+    query, params = _consulta_ventas_excel(id_vendedor, es_admin)
+    with conexion() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, params) if params else cursor.execute(query)
+            lotes = iter(lambda: cursor.fetchmany(EXPORT_LOTE_FILAS), [])
+            return _escribir_excel_streaming(filepath, list(cursor.column_names), lotes, progreso, total_filas)
+        finally:
+            if conn.unread_result:
+                conn.consume_results()  # si la escritura falló a medias
+
+def _datos_excel_incremental(id_vendedor, es_admin, estado, marca_agua):
+    """
+    Devuelve (detalle, resumenes). Si el estado guardado tiene el detalle y
+    solo llegaron pedidos nuevos, consulta únicamente esos y acumula sus
+    resúmenes; si no, consulta todo. (None, None) si no hay ventas.
+    """
+    nuevas = None
+    if estado and estado.get("detalle") is not None:
+        # Los pedidos hasta la marca anterior deben seguir igual (líneas y firma)
+        hasta = estado["marca_agua"][0]
+        if _marca_agua_exportacion(id_vendedor, es_admin, hasta_id_pedido=hasta) == tuple(estado["marca_agua"]):
+            query, params = _consulta_ventas_excel(id_vendedor, es_admin, desde_id_pedido=hasta)
+            nuevas = pd.read_sql(query, db_engine, params=params)
+            # Si el total no cuadra, cambió algo entre ambas consultas: se reconstruye todo
+            if estado["marca_agua"][1] + len(nuevas) != marca_agua[1]:
+                nuevas = None
+
+    if nuevas is not None:
+        return pd.concat([nuevas, estado["detalle"]], ignore_index=True), _acumular_resumenes(estado["resumenes"], nuevas)
+
+    query, params = _consulta_ventas_excel(id_vendedor, es_admin)
+    df = pd.read_sql(query, db_engine, params=params)
+    if df.empty: return None, None
+    return df, _resumenes_excel(df)
+
+def generar_excel_ventas(id_vendedor, base_url, es_admin=False, progreso=None):
+    """
+    Genera el reporte Excel de ventas y devuelve su URL ("empty" si no hay
+    ventas, None si hubo un error). progreso: función opcional que recibe
+    el % avanzado (la usa la cola de exportaciones).
+    """
+    avisar = progreso or (lambda porcentaje: None)
     try:
-        # --- 1. CONSULTA SQL ---
-        if es_admin:
-            query = """
-                SELECT 
-                    DATE(p.fecha_pedido) AS 'Fecha',
-                    p.id_pedido AS 'ID Pedido',
-                    pr.nombre AS 'Producto',
-                    pr.categoria AS 'Categoria', 
-                    pp.cantidad AS 'Cantidad',
-                    pp.precio_unitario AS 'Precio Unitario',
-                    (pp.cantidad * pp.precio_unitario) AS 'Total Venta',
-                    p.estado AS 'Estado Pedido',
-                    u.nombre AS 'Cliente',
-                    u.email AS 'Email Cliente',
-                    u.region AS 'Region',
-                    pr.id_vendedor AS 'ID Vendedor'
-                FROM pedidos_productos pp
-                JOIN pedidos p ON pp.id_pedido = p.id_pedido
-                JOIN producto pr ON pp.id_producto = pr.id_producto
-                JOIN usuario u ON p.id_usuario = u.id_usuario
-                WHERE p.estado IN ('Pagado', 'Enviado', 'Entregado')
-                ORDER BY p.fecha_pedido DESC
-            """
-            params = None
-        else:
-            query = """
-                SELECT 
-                    DATE(p.fecha_pedido) AS 'Fecha',
-                    p.id_pedido AS 'ID Pedido',
-                    pr.nombre AS 'Producto',
-                    pr.categoria AS 'Categoria',
-                    pp.cantidad AS 'Cantidad',
-                    pp.precio_unitario AS 'Precio Unitario',
-                    (pp.cantidad * pp.precio_unitario) AS 'Total Venta',
-                    p.estado AS 'Estado Pedido',
-                    u.nombre AS 'Cliente',
-                    u.email AS 'Email Cliente',
-                    u.region AS 'Region'
-                FROM pedidos_productos pp
-                JOIN pedidos p ON pp.id_pedido = p.id_pedido
-                JOIN producto pr ON pp.id_producto = pr.id_producto
-                JOIN usuario u ON p.id_usuario = u.id_usuario
-                WHERE pr.id_vendedor = %s
-                  AND p.estado IN ('Pagado', 'Enviado', 'Entregado')
-                ORDER BY p.fecha_pedido DESC
-            """
-            params = (id_vendedor,)
+        alcance = "global" if es_admin else f"vendedor_{int(id_vendedor)}"
 
-        # --- 2. PROCESAR DATOS ---
-        df = pd.read_sql(query, db_engine, params=params)
-        if df.empty: return "empty"
+        # --- 1. CACHÉ: si no hay ventas nuevas, se devuelve el archivo existente ---
+        with metricas.excel_segundos.medir("marca_agua"):
+            marca_agua = _marca_agua_exportacion(id_vendedor, es_admin)
+        if marca_agua is None:
+            return None
+        if marca_agua[1] == 0:
+            return "empty"
+        estado = cache_exportes.obtener(alcance)
+        if (estado and estado["marca_agua"] == marca_agua
+                and os.path.exists(os.path.join(EXPORT_DIR, estado["archivo"]))):
+            return f"{base_url}static/exports/{estado['archivo']}"
+        avisar(5)
 
         fecha_hora = datetime.now().strftime("%Y-%m-%d_%H-%M")
         prefix = "Reporte_Global" if es_admin else f"Ventas_Vendedor_{id_vendedor}"
         filename = f"{prefix}_{fecha_hora}.xlsx"
         filepath = os.path.join(EXPORT_DIR, filename)
+        streaming = EXPORT_STREAMING == "todos" or (EXPORT_STREAMING == "global" and es_admin)
 
-        # --- 3. CREAR TABLAS RESUMEN ---
-        # Tabla A: Productos (Columna A=1, B=2)
-        res_prod = df.groupby('Producto')[['Total Venta']].sum().sort_values('Total Venta', ascending=False).reset_index()
-        # Tabla B: Categorías (Columna D=4, E=5)
-        res_cat = df.groupby('Categoria')[['Total Venta']].sum().reset_index()
-        # Tabla C: Regiones (Columna G=7, H=8)
-        res_reg = df.groupby('Region')[['Total Venta']].sum().sort_values('Total Venta', ascending=False).head(10).reset_index()
-        # Tabla D: Fechas (Columna J=10, K=11)
-        res_date = df.groupby('Fecha')[['Total Venta']].sum().reset_index()
-
-        with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Detalle', index=False)
-            
-            # Ubicamos las tablas separadas por una columna vacía
-            res_prod.to_excel(writer, sheet_name='Dashboard', startcol=0, index=False)  # Cols A, B
-            res_cat.to_excel(writer, sheet_name='Dashboard', startcol=3, index=False)   # Cols D, E
-            res_reg.to_excel(writer, sheet_name='Dashboard', startcol=6, index=False)   # Cols G, H
-            res_date.to_excel(writer, sheet_name='Dashboard', startcol=9, index=False)  # Cols J, K
-
-        # --- 4. GENERAR GRÁFICOS (CORREGIDO) ---
-        wb = load_workbook(filepath)
-        ws = wb['Dashboard']
-        
-        # --- GRÁFICO 1: BARRAS (Productos) ---
-        chart1 = BarChart()
-        chart1.type = "col"
-        chart1.style = 10
-        chart1.title = "Top Productos (Ingresos)"
-        chart1.y_axis.title = "$"
-        chart1.x_axis.title = "Producto"
-        
-        filas_prod = len(res_prod) + 1
-        data1 = Reference(ws, min_col=2, min_row=1, max_row=filas_prod, max_col=2)
-        cats1 = Reference(ws, min_col=1, min_row=2, max_row=filas_prod)
-        chart1.add_data(data1, titles_from_data=True)
-        chart1.set_categories(cats1)
-        chart1.width = 18
-        chart1.height = 10
-        ws.add_chart(chart1, "A20") 
-
-        # --- GRÁFICO 2: TORTA (Categorías) ---
-        chart2 = PieChart()
-        chart2.title = "Ventas por Categoría"
-        
-        filas_cat = len(res_cat) + 1
-        data2 = Reference(ws, min_col=5, min_row=1, max_row=filas_cat, max_col=5)
-        cats2 = Reference(ws, min_col=4, min_row=2, max_row=filas_cat)
-        chart2.add_data(data2, titles_from_data=True)
-        chart2.set_categories(cats2)
-        ws.add_chart(chart2, "F20") 
-
-        # --- GRÁFICO 3: TORTA (Regiones) ---
-        chart3 = PieChart()
-        chart3.title = "Ventas por Región"
-        
-        filas_reg = len(res_reg) + 1
-        data3 = Reference(ws, min_col=8, min_row=1, max_row=filas_reg, max_col=8)
-        cats3 = Reference(ws, min_col=7, min_row=2, max_row=filas_reg)
-        chart3.add_data(data3, titles_from_data=True)
-        chart3.set_categories(cats3)
-        ws.add_chart(chart3, "K20")
-
-        # --- GRÁFICO 4: LÍNEA (Tendencia) ---
-        chart4 = LineChart()
-        chart4.title = "Tendencia de Ventas (Diaria)"
-        chart4.style = 12
-        chart4.y_axis.title = "$"
-        chart4.x_axis.title = "Fecha"
-        
-        filas_date = len(res_date) + 1
-        data4 = Reference(ws, min_col=11, min_row=1, max_row=filas_date, max_col=11)
-        cats4 = Reference(ws, min_col=10, min_row=2, max_row=filas_date)
-        chart4.add_data(data4, titles_from_data=True)
-        chart4.set_categories(cats4)
-        chart4.width = 30
-        chart4.height = 10
-        ws.add_chart(chart4, "A40")
-
-        wb.save(filepath)
+        if streaming:
+            # --- 2a. MODO STREAMING: memoria constante, sin DataFrame completo ---
+            # No es incremental: guardar el detalle para la próxima vez iría contra la
+            # memoria constante, y la hoja Detalle se reescribe entera igual. Los
+            # resúmenes se acumulan en la misma pasada que escribe las filas.
+            with metricas.excel_segundos.medir("streaming"):
+                resumenes = _exportar_streaming(filepath, id_vendedor, es_admin, avisar, marca_agua[1])
+            if resumenes is None: return "empty"
+            df = None
+        else:
+            # --- 2b. EN MEMORIA (incremental si solo hay pedidos nuevos) ---
+            with metricas.excel_segundos.medir("datos"):
+                df, resumenes = _datos_excel_incremental(id_vendedor, es_admin, estado, marca_agua)
+            if df is None: return "empty"
+            avisar(50)
+            with metricas.excel_segundos.medir("escritura"):
+                _escribir_excel(filepath, df, resumenes)
+
+        # El archivo anterior no se borra: su URL puede estar en el historial del
+        # chat o en una consulta de estado; lo retira limpiar_exportes por antigüedad
+        cache_exportes.guardar(alcance, {"marca_agua": marca_agua, "archivo": filename,
+                                         "detalle": df, "resumenes": resumenes})
         return f"{base_url}static/exports/{filename}"
 
     except Exception as e:
         print(f"Error generando Excel Dashboard: {e}")
         return None
 
+# Consultas compartidas con db_async.py (modo ASGI)
+SQL_ULTIMO_PEDIDO = "SELECT id_pedido, fecha_pedido, estado FROM pedidos WHERE id_usuario = %s ORDER BY fecha_pedido DESC LIMIT 1"
+SQL_PEDIDO_DEVOLVIBLE = """
+    SELECT id_pedido
+    FROM pedidos 
+    WHERE id_usuario = %s 
+      AND estado IN ('Entregado', 'Completado')
+    LIMIT 1
+"""
+
+_DEVOLUCION_SIN_CONEXION = {"elegible": False, "mensaje": "No pude conectarme a la base de datos para verificar tus pedidos."}
+_DEVOLUCION_ERROR = {"elegible": False, "mensaje": "Tuve un problema al consultar tus pedidos."}
+
 def solicitar_devolucion_db(id_usuario):
-    conn = conectar_db()
-    if not conn: 
-        return {"elegible": False, "mensaje": "No pude conectarme a la base de datos para verificar tus pedidos."}
-    try:
-        cursor = conn.cursor(dictionary=True)
-        query_elegible = """
-            SELECT id_pedido
-            FROM pedidos 
-            WHERE id_usuario = %s 
-              AND estado IN ('Entregado', 'Completado')
-            LIMIT 1
-        """
-        cursor.execute(query_elegible, (id_usuario,))
-        pedido_elegible = cursor.fetchone()
-        
-        if pedido_elegible:
-            return {
-                "elegible": True, 
-                "mensaje": (
-                    "¡Claro! He verificado que tienes pedidos **entregados** que son elegibles para devolución.\n\n"
-                    "Para iniciar la solicitud de forma segura (y adjuntar fotos si es necesario), "
-                    "por favor ve a **Mi Cuenta > Mis Pedidos**.\n\n"
-                    "Ahí­ verás el botón **'Solicitar Devolución'** junto a los pedidos que aplican."
-                )
-            }
-        
-        query_otros = "SELECT estado FROM pedidos WHERE id_usuario = %s ORDER BY fecha_pedido DESC LIMIT 1"
-        cursor.execute(query_otros, (id_usuario,))
-        ultimo_pedido = cursor.fetchone()
-        
-        if ultimo_pedido:
-            return {
-                "elegible": False, 
-                "mensaje": f"Revisé tu cuenta y veo que tu último pedido está en estado **'{ultimo_pedido['estado']}'**. \n\nSolo puedes iniciar una devolución **después de que el pedido haya sido 'Entregado'**."
-            }
-        else:
-            return {
-                "elegible": False, 
-                "mensaje": "Revisé tu cuenta, pero no encontré ningún pedido registrado."
-            }
-    except Exception as e:
-        print(f"!!! ERROR en solicitar_devolucion_db: {e}")
-        return {"elegible": False, "mensaje": "Tuve un problema al consultar tus pedidos."}
-    finally:
-        if conn and conn.is_connected(): conn.close()
+    respuesta = sesiones.obtener("devolucion", id_usuario)
+    if respuesta is None:
+        respuesta = _consultar_devolucion(id_usuario)
+        if respuesta is not _DEVOLUCION_SIN_CONEXION and respuesta is not _DEVOLUCION_ERROR:
+            sesiones.guardar("devolucion", id_usuario, respuesta)
+    return respuesta
+
+def respuesta_devolucion(pedido_elegible, ultimo_pedido):
+    """
+    Arma la respuesta de elegibilidad a partir de las dos consultas
+    (SQL_PEDIDO_DEVOLVIBLE y, si no hay elegible, SQL_ULTIMO_PEDIDO).
+    """
+    if pedido_elegible:
+        return {
+            "elegible": True, 
+            "mensaje": (
+                "¡Claro! He verificado que tienes pedidos **entregados** que son elegibles para devolución.\n\n"
+                "Para iniciar la solicitud de forma segura (y adjuntar fotos si es necesario), "
+                "por favor ve a **Mi Cuenta > Mis Pedidos**.\n\n"
+                "Ahí­ verás el botón **'Solicitar Devolución'** junto a los pedidos que aplican."
+            )
+        }
+    if ultimo_pedido:
+        return {
+            "elegible": False, 
+            "mensaje": f"Revisé tu cuenta y veo que tu último pedido está en estado **'{ultimo_pedido['estado']}'**. \n\nSolo puedes iniciar una devolución **después de que el pedido haya sido 'Entregado'**."
+        }
+    return {
+        "elegible": False, 
+        "mensaje": "Revisé tu cuenta, pero no encontré ningún pedido registrado."
+    }
+
+@si_no_hay_conexion(_DEVOLUCION_SIN_CONEXION)
+def _consultar_devolucion(id_usuario):
+    with conexion() as conn:
+        try:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(SQL_PEDIDO_DEVOLVIBLE, (id_usuario,))
+            pedido_elegible = cursor.fetchone()
+            if pedido_elegible:
+                return respuesta_devolucion(pedido_elegible, None)
 
+            cursor.execute(SQL_ULTIMO_PEDIDO, (id_usuario,))
+            ultimo_pedido = cursor.fetchone()
+            sesiones.guardar("ultimo_pedido", id_usuario, ultimo_pedido)
+            return respuesta_devolucion(None, ultimo_pedido)
+        except Exception as e:
+            print(f"!!! ERROR en solicitar_devolucion_db: {e}")
+            return _DEVOLUCION_ERROR
+
+@si_no_hay_conexion("No pude procesar tu solicitud.")
 def solicitar_notificacion_db(id_usuario, email_usuario, nombre_producto):
-    conn = conectar_db()
-    if not conn: return "No pude procesar tu solicitud."
-    try:
+    en_memoria = catalogo.disponible()
+    with conexion() as conn:
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT id_producto, stock, nombre FROM producto WHERE nombre LIKE %s LIMIT 1", (f"%{nombre_producto}%",))
-        producto = cursor.fetchone()
+        if en_memoria:
+            encontrados = catalogo.buscar(nombre_producto, limite=1)
+            producto = None
+            if encontrados:
+                # El stock se confirma por clave primaria: el índice puede tener unos segundos de retraso
+                cursor.execute("SELECT id_producto, stock, nombre FROM producto WHERE id_producto = %s",
+                               (encontrados[0]['id_producto'],))
+                producto = cursor.fetchone()
+        else:
+            cursor.execute("SELECT id_producto, stock, nombre FROM producto WHERE nombre LIKE %s LIMIT 1", (f"%{nombre_producto}%",))
+            producto = cursor.fetchone()
         if not producto:
             return f"No encontré el producto '{nombre_producto}'."
         if producto['stock'] > 0:
@@ -301,106 +558,185 @@ def solicitar_notificacion_db(id_usuario, email_usuario, nombre_producto):
         cursor.execute("INSERT INTO notificaciones_stock (id_usuario, id_producto, email_usuario) VALUES (%s, %s, %s)", (id_usuario, id_producto, email_usuario))
         conn.commit()
         return f"¡Entendido! Te enviaré un correo a {email_usuario} tan pronto como '{producto['nombre']}' vuelva a estar disponible."
-    finally:
-        if conn and conn.is_connected(): conn.close()
 
-def comparar_productos_db(producto1_nombre, producto2_nombre):
-    conn = conectar_db()
-    if not conn: return "No pude obtener la información de los productos."
-    try:
+@si_no_hay_conexion(None)
+def _productos_a_comparar(producto1_nombre, producto2_nombre):
+    # El más relevante para cada nombre (sin repetir el mismo producto)
+    productos = []
+    for nombre in (producto1_nombre, producto2_nombre):
+        encontrados = _buscar_con_ranking(nombre, limite=1, excluir={p["id_producto"] for p in productos})
+        if encontrados is None:
+            break
+        productos += encontrados
+    else:
+        return productos
+    with conexion() as conn:
         cursor = conn.cursor(dictionary=True)
         query = "SELECT nombre, precio, descripcion FROM producto WHERE nombre LIKE %s OR nombre LIKE %s LIMIT 2"
         cursor.execute(query, (f"%{producto1_nombre}%", f"%{producto2_nombre}%"))
-        productos = cursor.fetchall()
-        if len(productos) < 2:
-            return "No pude encontrar uno o ambos productos para comparar."
-        p1, p2 = productos[0], productos[1]
-        respuesta = (f"**Comparando {p1['nombre']} vs {p2['nombre']}:**\n"
-                     f"- **Precio {p1['nombre']}**: ${p1['precio']:,.0f}\n"
-                     f"- **Precio {p2['nombre']}**: ${p2['precio']:,.0f}\n")
-        if p1['precio'] < p2['precio']:
-            respuesta += f"**Conclusión:** {p1['nombre']} es más económico."
-        else:
-            respuesta += f"**Conclusión:** {p2['nombre']} es más económico."
-        return respuesta
-    finally:
-        if conn and conn.is_connected(): conn.close()
+        return cursor.fetchall()
+
+def comparar_productos_db(producto1_nombre, producto2_nombre):
+    productos = _productos_a_comparar(producto1_nombre, producto2_nombre)
+    if productos is None: return "No pude obtener la información de los productos."
+    if len(productos) < 2:
+        return "No pude encontrar uno o ambos productos para comparar."
+    p1, p2 = productos[0], productos[1]
+    respuesta = (f"**Comparando {p1['nombre']} vs {p2['nombre']}:**\n"
+                 f"- **Precio {p1['nombre']}**: ${p1['precio']:,.0f}\n"
+                 f"- **Precio {p2['nombre']}**: ${p2['precio']:,.0f}\n")
+    if p1['precio'] < p2['precio']:
+        respuesta += f"**Conclusión:** {p1['nombre']} es más económico."
+    else:
+        respuesta += f"**Conclusión:** {p2['nombre']} es más económico."
+    return respuesta
 
+@si_no_hay_conexion("No pude actualizar tu dirección.")
 def actualizar_direccion_db(id_usuario, nueva_direccion):
-    conn = conectar_db()
-    if not conn: return "No pude actualizar tu dirección."
-    try:
+    with conexion() as conn:
         cursor = conn.cursor()
         cursor.execute("UPDATE usuario SET direccion = %s WHERE id_usuario = %s", (nueva_direccion, id_usuario))
         conn.commit()
+        sesiones.invalidar(id_usuario)
         return "¡Listo! He actualizado tu dirección de enví­o principal."
-    finally:
-        if conn and conn.is_connected(): conn.close()
         
+@si_no_hay_conexion(None)
 def estado_ultimo_pedido(id_usuario):
-    conn = conectar_db()
-    if not conn: return None
-    try:
+    pedido = sesiones.obtener("ultimo_pedido", id_usuario, sesiones.AUSENTE)
+    if pedido is not sesiones.AUSENTE:
+        return pedido
+    with conexion() as conn:
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT id_pedido, fecha_pedido, estado FROM pedidos WHERE id_usuario = %s ORDER BY fecha_pedido DESC LIMIT 1", (id_usuario,))
-        return cursor.fetchone()
-    finally:
-        if conn and conn.is_connected(): conn.close()
+        cursor.execute(SQL_ULTIMO_PEDIDO, (id_usuario,))
+        pedido = cursor.fetchone()
+        sesiones.guardar("ultimo_pedido", id_usuario, pedido)
+        return pedido
 
 # --- Funciones de Administrador ---
+# --- MÉTRICAS DEL PANEL DE ADMINISTRACIÓN ---
+# Todos los contadores del admin salen de una sola consulta y se guardan
+# METRICAS_ADMIN_TTL segundos. Si varios admins piden las métricas a la vez
+# con la caché vacía, solo uno consulta; el resto espera su resultado.
+_cache_metricas = CacheLRU(1, ttl=METRICAS_ADMIN_TTL)
+_lock_metricas = threading.Lock()
+
+@si_no_hay_conexion(None)
+def _consultar_metricas_admin():
+    if ventas_diarias.disponible():
+        ventas_hoy = "SELECT COALESCE(SUM(total), 0) FROM ventas_diarias_tienda WHERE dia = CURDATE()"
+    else:
+        ventas_hoy = ("SELECT COALESCE(SUM(total), 0) FROM pedidos "
+                      "WHERE estado IN ('Pagado', 'Enviado', 'Entregado') AND fecha_pedido = CURDATE()")
+    with conexion() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"""
+            SELECT
+                (SELECT COUNT(*) FROM contacto_mensajes WHERE leido = 0) AS nuevos_mensajes,
+                (SELECT COUNT(*) FROM solicitudes_servicio WHERE estado = 'Pendiente') AS servicios_pendientes,
+                (SELECT COUNT(*) FROM producto WHERE stock < 10 AND activo = 1) AS bajo_stock,
+                (SELECT COUNT(*) FROM usuario) AS total_usuarios,
+                ({ventas_hoy}) AS ventas_hoy
+        """)
+        valores = cursor.fetchone()
+        valores['ventas_hoy'] = float(valores['ventas_hoy'])
+        return valores
+
+def obtener_metricas_admin():
+    """
+    Devuelve {nuevos_mensajes, servicios_pendientes, bajo_stock,
+    total_usuarios, ventas_hoy} desde la caché o con una sola consulta.
+    """
+    valores = _cache_metricas.obtener("admin")
+    if valores is not None:
+        return valores
+    with _lock_metricas:
+        valores = _cache_metricas.obtener("admin")
+        if valores is None:
+            valores = _consultar_metricas_admin()
+            if valores is not None:
+                _cache_metricas.guardar("admin", valores)
+    return valores
+
+def invalidar_metricas_admin():
+    """
+    Descarta las métricas en caché (tras escrituras que las afectan:
+    estados de pedidos, stock).
+    """
+    _cache_metricas.invalidar()
+
+def estadisticas_cache_metricas():
+    return _cache_metricas.estadisticas()
+
 def get_proactive_alerts():
-    conn = conectar_db()
-    if not conn: return ""
-    try:
-        cursor = conn.cursor()
-        alerts = []
-        cursor.execute("SELECT COUNT(*) FROM producto WHERE stock < 10 AND activo = 1")
-        low_stock = cursor.fetchone()[0]
-        if low_stock > 0: alerts.append(f"Tienes **{low_stock} productos con bajo stock**.")
-        cursor.execute("SELECT COUNT(*) FROM solicitudes_servicio WHERE estado = 'Pendiente'")
-        pending_services = cursor.fetchone()[0]
-        if pending_services > 0: alerts.append(f"Hay **{pending_services} solicitudes de servicio** pendientes.")
-        return " ".join(alerts)
-    finally:
-        if conn and conn.is_connected(): conn.close()
+    valores = obtener_metricas_admin()
+    if not valores: return ""
+    alerts = []
+    if valores['bajo_stock'] > 0: alerts.append(f"Tienes **{valores['bajo_stock']} productos con bajo stock**.")
+    if valores['servicios_pendientes'] > 0: alerts.append(f"Hay **{valores['servicios_pendientes']} solicitudes de servicio** pendientes.")
+    return " ".join(alerts)
 
+@si_no_hay_conexion("No pude actualizar el pedido.")
 def cambiar_estado_pedido_db(id_pedido, nuevo_estado):
-    conn = conectar_db()
-    if not conn: return "No pude actualizar el pedido."
-    try:
+    with conexion() as conn:
         cursor = conn.cursor()
         cursor.execute("UPDATE pedidos SET estado = %s WHERE id_pedido = %s", (nuevo_estado, id_pedido))
-        if cursor.rowcount > 0:
-            conn.commit()
-            return f"¡Hecho! El pedido #{id_pedido} ha sido actualizado a **{nuevo_estado}**."
-        else:
+        if cursor.rowcount == 0:
             return f"No encontré el pedido #{id_pedido}."
-    finally:
-        if conn and conn.is_connected(): conn.close()
+        conn.commit()
+        invalidar_metricas_admin()
+        _invalidar_sesiones_pedido(cursor, id_pedido)
+    # Con la conexión ya devuelta: el recálculo corre en segundo plano
+    ventas_diarias.recalcular_pedido(id_pedido)
+    return f"¡Hecho! El pedido #{id_pedido} ha sido actualizado a **{nuevo_estado}**."
         
+def _invalidar_sesiones_pedido(cursor, id_pedido):
+    """
+    Tras cambiar el estado de un pedido: el cliente tiene otro último pedido
+    y otra elegibilidad de devolución; sus vendedores, otras ventas.
+    """
+    cursor.execute("""
+        SELECT p.id_usuario, pr.id_vendedor
+        FROM pedidos p
+        LEFT JOIN pedidos_productos pp ON pp.id_pedido = p.id_pedido
+        LEFT JOIN producto pr ON pr.id_producto = pp.id_producto
+        WHERE p.id_pedido = %s
+    """, (id_pedido,))
+    for id_cliente, id_vendedor in cursor.fetchall():
+        sesiones.invalidar(id_cliente, ("ultimo_pedido", "devolucion"))
+        sesiones.invalidar(id_vendedor, ("vendedor",))
+
+@si_no_hay_conexion("No pude realizar el análisis.")
 def get_category_growth_analysis():
-    conn = conectar_db()
-    if not conn: return "No pude realizar el análisis."
-    try:
+    resumen = ventas_diarias.disponible()
+    with conexion() as conn:
         cursor = conn.cursor(dictionary=True)
-        query = """
-            SELECT pr.categoria, SUM(p.total) as ventas_mes_actual
-            FROM pedidos p JOIN producto pr ON p.id_producto = pr.id_producto
-            WHERE p.estado = 'Pagado' AND p.fecha_pedido >= DATE_FORMAT(NOW(), '%Y-%m-01')
-            GROUP BY pr.categoria ORDER BY ventas_mes_actual DESC LIMIT 1;
-        """
+        if resumen:
+            query = """
+                SELECT categoria, SUM(ingresos) as ventas_mes_actual
+                FROM ventas_diarias
+                WHERE dia >= DATE_FORMAT(NOW(), '%Y-%m-01') AND categoria IS NOT NULL
+                GROUP BY categoria ORDER BY ventas_mes_actual DESC LIMIT 1;
+            """
+        else:
+            # Los ingresos por categoría salen de las líneas del pedido (pedidos no tiene id_producto)
+            query = """
+                SELECT pr.categoria, SUM(pp.cantidad * pp.precio_unitario) as ventas_mes_actual
+                FROM pedidos p
+                JOIN pedidos_productos pp ON pp.id_pedido = p.id_pedido
+                JOIN producto pr ON pr.id_producto = pp.id_producto
+                WHERE p.estado IN ('Pagado', 'Enviado', 'Entregado') AND p.fecha_pedido >= DATE_FORMAT(NOW(), '%Y-%m-01')
+                  AND pr.categoria IS NOT NULL
+                GROUP BY pr.categoria ORDER BY ventas_mes_actual DESC LIMIT 1;
+            """
         cursor.execute(query)
         top_category = cursor.fetchone()
         if not top_category:
             return "No hay ventas este mes para analizar."
         return f"La categorí­a con mayores ingresos este mes es **{top_category['categoria'].upper()}**."
-    finally:
-        if conn and conn.is_connected(): conn.close()
 
+@si_no_hay_conexion(None)
 def buscar_cliente_por_email_o_nombre(termino):
-    conn = conectar_db()
-    if not conn: return None
-    try:
+    with conexion() as conn:
         cursor = conn.cursor(dictionary=True)
         query_user = "SELECT id_usuario, nombre, email, region FROM usuario WHERE email = %s OR nombre LIKE %s LIMIT 1"
         cursor.execute(query_user, (termino, f"%{termino}%"))
@@ -410,28 +746,52 @@ def buscar_cliente_por_email_o_nombre(termino):
             cursor.execute(query_pedidos, (cliente['id_usuario'],))
             cliente['total_pedidos'] = cursor.fetchone()['total_pedidos']
         return cliente
-    finally:
-        if conn and conn.is_connected(): conn.close()
 
 def obtener_estadisticas_admin():
-    conn = conectar_db()
-    if not conn: return None
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM contacto_mensajes WHERE leido = 0")
-        nuevos_mensajes = cursor.fetchone()[0]
-        cursor.execute("SELECT COUNT(*) FROM solicitudes_servicio WHERE estado = 'Pendiente'")
-        servicios_pendientes = cursor.fetchone()[0]
-        cursor.execute("SELECT COUNT(*) FROM producto WHERE stock < 10 AND activo = 1")
-        bajo_stock = cursor.fetchone()[0]
-        return { "nuevos_mensajes": nuevos_mensajes, "servicios_pendientes": servicios_pendientes, "bajo_stock": bajo_stock }
-    finally:
-        if conn and conn.is_connected(): conn.close()
+    return obtener_metricas_admin()
 
+@si_no_hay_conexion(None)
+def estadisticas_vendedor(id_vendedor):
+    """
+    Devuelve {num_productos, total_stock, num_ventas, total_revenue} de un
+    vendedor. Las ventas salen del resumen diario si está disponible.
+    """
+    estadisticas = sesiones.obtener("vendedor", id_vendedor)
+    if estadisticas is not None:
+        return estadisticas
+    resumen = ventas_diarias.disponible()
+    with conexion() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT COUNT(*) as num_productos, COALESCE(SUM(stock), 0) as total_stock "
+                       "FROM producto WHERE id_vendedor = %s", (id_vendedor,))
+        estadisticas = cursor.fetchone()
+        if resumen:
+            query = """
+                SELECT COALESCE(SUM(pedidos), 0) as num_ventas, COALESCE(SUM(ingresos), 0) as total_revenue
+                FROM ventas_diarias_vendedor WHERE id_vendedor = %s
+            """
+        else:
+            query = """
+                SELECT COUNT(DISTINCT p.id_pedido) as num_ventas,
+                       COALESCE(SUM(pp.cantidad * pp.precio_unitario), 0) as total_revenue
+                FROM pedidos p
+                JOIN pedidos_productos pp ON p.id_pedido = pp.id_pedido
+                JOIN producto pr ON pp.id_producto = pr.id_producto
+                WHERE pr.id_vendedor = %s AND p.estado IN ('Pagado', 'Enviado', 'Entregado')
+            """
+        cursor.execute(query, (id_vendedor,))
+        estadisticas.update(cursor.fetchone())
+        sesiones.guardar("vendedor", id_vendedor, estadisticas)
+        return estadisticas
+
+@si_no_hay_conexion(None)
 def find_product_id_by_name(product_name, id_vendedor=None):
-    conn = conectar_db()
-    if not conn: return None
-    try:
+    if catalogo.disponible():
+        encontrados = catalogo.buscar(product_name, limite=1, id_vendedor=id_vendedor)
+        if not encontrados: return None
+        p = encontrados[0]
+        return {"id_producto": p["id_producto"], "nombre": p["nombre"], "id_vendedor": p["id_vendedor"]}
+    with conexion() as conn:
         cursor = conn.cursor(dictionary=True)
         # 1. Usamos LOWER() en la BD y en Python para ignorar mayúsculas.
         # 2. Comparamos con LIKE para ser más flexibles.
@@ -445,55 +805,223 @@ def find_product_id_by_name(product_name, id_vendedor=None):
         cursor.execute(sql, tuple(params))
         producto = cursor.fetchone()
         return producto
-    finally:
-        if conn and conn.is_connected(): conn.close()
 
-def get_prediction_data(product_id):
-    try:
-        # Usamos db_engine y read_sql normal para evitar warning
+def _marca_agua_ventas(product_id):
+    """
+    Devuelve la marca de agua de las ventas pagadas de un producto:
+    (última fecha_pedido, nº de líneas, unidades). Si cambia, el pronóstico
+    guardado ya no es válido.
+    """
+    return _marcas_agua_ventas([product_id]).get(int(product_id))
+
+@si_no_hay_conexion(dict)
+def _marcas_agua_ventas(ids_productos):
+    """
+    Marcas de agua de varios productos en una sola consulta.
+    Devuelve {id_producto: marca}; vacío si no hay conexión.
+    """
+    resumen = ventas_diarias.disponible()
+    with conexion() as conn:
+        cursor = conn.cursor()
+        marcadores = ", ".join(["%s"] * len(ids_productos))
+        if resumen:
+            query = f"""
+                SELECT id_producto, MAX(dia), SUM(lineas), COALESCE(SUM(unidades), 0)
+                FROM ventas_diarias
+                WHERE id_producto IN ({marcadores})
+                GROUP BY id_producto
+            """
+        else:
+            query = f"""
+                SELECT pp.id_producto, MAX(p.fecha_pedido), COUNT(*), COALESCE(SUM(pp.cantidad), 0)
+                FROM pedidos p
+                JOIN pedidos_productos pp ON p.id_pedido = pp.id_pedido
+                WHERE pp.id_producto IN ({marcadores})
+                  AND p.estado IN ('Pagado', 'Enviado', 'Entregado')
+                GROUP BY pp.id_producto
+            """
+        cursor.execute(query, tuple(ids_productos))
+        marcas = {int(pid): (None, 0, 0) for pid in ids_productos}
+        for pid, ultima_fecha, lineas, unidades in cursor.fetchall():
+            marcas[int(pid)] = (str(ultima_fecha) if ultima_fecha else None, int(lineas), int(unidades))
+        return marcas
+
+def _consultar_ventas_producto(product_id):
+    # Usamos db_engine y read_sql normal para evitar warning
+    if ventas_diarias.disponible():
+        # Una fila por día y región en el resumen: se suman las regiones
         query = """
-            SELECT DATE(p.fecha_pedido) as dia, SUM(pp.cantidad) as total_vendido
+            SELECT dia, SUM(unidades) as total_vendido
+            FROM ventas_diarias
+            WHERE id_producto = %s AND dia >= DATE_SUB(NOW(), INTERVAL 6 MONTH)
+            GROUP BY dia
+            ORDER BY dia ASC;
+        """
+        return pd.read_sql(query, db_engine, params=(product_id,))
+    query = """
+        SELECT DATE(p.fecha_pedido) as dia, SUM(pp.cantidad) as total_vendido
+        FROM pedidos p
+        JOIN pedidos_productos pp ON p.id_pedido = pp.id_pedido
+        WHERE pp.id_producto = %s
+          AND p.estado IN ('Pagado', 'Enviado', 'Entregado')
+          AND p.fecha_pedido >= DATE_SUB(NOW(), INTERVAL 6 MONTH)
+        GROUP BY DATE(p.fecha_pedido)
+        ORDER BY dia ASC;
+    """
+    return pd.read_sql(query, db_engine, params=(product_id,))
+
+def _consultar_ventas_productos(ids_productos):
+    """
+    Ventas diarias de varios productos en una sola consulta agrupada.
+    Devuelve {id_producto: DataFrame(dia, total_vendido)}.
+    """
+    marcadores = ", ".join(["%s"] * len(ids_productos))
+    if ventas_diarias.disponible():
+        query = f"""
+            SELECT id_producto, dia, SUM(unidades) as total_vendido
+            FROM ventas_diarias
+            WHERE id_producto IN ({marcadores}) AND dia >= DATE_SUB(NOW(), INTERVAL 6 MONTH)
+            GROUP BY id_producto, dia
+            ORDER BY id_producto, dia ASC;
+        """
+    else:
+        query = f"""
+            SELECT pp.id_producto, DATE(p.fecha_pedido) as dia, SUM(pp.cantidad) as total_vendido
             FROM pedidos p
             JOIN pedidos_productos pp ON p.id_pedido = pp.id_pedido
-            WHERE pp.id_producto = %s
+            WHERE pp.id_producto IN ({marcadores})
               AND p.estado IN ('Pagado', 'Enviado', 'Entregado')
               AND p.fecha_pedido >= DATE_SUB(NOW(), INTERVAL 6 MONTH)
-            GROUP BY DATE(p.fecha_pedido)
-            ORDER BY dia ASC;
+            GROUP BY pp.id_producto, DATE(p.fecha_pedido)
+            ORDER BY pp.id_producto, dia ASC;
         """
-        sales_data = pd.read_sql(query, db_engine, params=(product_id,))
-        
-        if sales_data.empty or len(sales_data) < 15:
-            return {"success": False, "error": "Datos insuficientes para la predicción (se necesitan al menos 15 dí­as de ventas)."}
-
-        # Procesamiento del DataFrame
-        sales_data['dia'] = pd.to_datetime(sales_data['dia'])
-        sales_data = sales_data.set_index('dia')
-        sales_data['total_vendido'] = pd.to_numeric(sales_data['total_vendido'])
-        df_resampled = sales_data.resample('D').sum().fillna(0).astype(float)
-        
-        order = (1, 1, 1)
-        seasonal_order = (1, 1, 1, 7)
-        warnings.filterwarnings("ignore") 
-        
-        model = SARIMAX(df_resampled['total_vendido'],
-                        order=order,
-                        seasonal_order=seasonal_order,
-                        enforce_stationarity=False,
-                        enforce_invertibility=False)
-        
-        model_fit = model.fit(disp=False) 
-        forecast = model_fit.forecast(steps=30)
-        
-        forecast_dates = pd.date_range(start=df_resampled.index.max() + pd.Timedelta(days=1), periods=30).strftime('%Y-%m-%d').tolist()
-        forecast_values = [round(val) if val > 0 else 0 for val in forecast.tolist()]
+    ventas = pd.read_sql(query, db_engine, params=tuple(ids_productos))
+    por_producto = {int(pid): pd.DataFrame(columns=['dia', 'total_vendido']) for pid in ids_productos}
+    for pid, grupo in ventas.groupby('id_producto'):
+        por_producto[int(pid)] = grupo[['dia', 'total_vendido']].reset_index(drop=True)
+    return por_producto
 
-        return {
-            "success": True,
-            "forecast_labels": forecast_dates,
-            "forecast_data": forecast_values,
-            "total_forecast": sum(forecast_values) 
-        }
+def _guardar_pronostico(product_id, marca_agua, ajuste, motor):
+    if marca_agua is not None:
+        cache_predicciones.guardar(product_id, marca_agua, ajuste["resultado"], ajuste["params"],
+                                   ajuste["ultimo_dia"], ajuste["segundos"], motor or PREDICCION_MOTOR)
+
+def _entrada_vigente(entrada, marca_agua, motor):
+    """
+    True si el pronóstico guardado corresponde a las ventas actuales y al
+    motor pedido (o al motor por defecto).
+    """
+    return (entrada is not None and marca_agua is not None
+            and entrada["marca_agua"] == list(marca_agua)
+            and entrada.get("motor", PREDICCION_MOTOR) == (motor or PREDICCION_MOTOR))
+
+@si_no_hay_conexion(None)
+def productos_de_vendedor(id_vendedor):
+    """
+    IDs de los productos activos del vendedor; None si no hay conexión.
+    """
+    with conexion() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id_producto FROM producto WHERE id_vendedor = %s AND activo = 1", (id_vendedor,))
+        return [fila[0] for fila in cursor.fetchall()]
+
+def calcular_prediccion(product_id, marca_agua=None, entrada=None, forzar=False, motor=None):
+    """
+    Ajusta el modelo de un producto y guarda el resultado en el almacén de
+    pronósticos. Si la marca de agua coincide con lo guardado (y no se fuerza),
+    devuelve el pronóstico guardado sin ajustar.
+    """
+    try:
+        if marca_agua is None:
+            marca_agua = _marca_agua_ventas(product_id)
+        if entrada is None:
+            entrada = cache_predicciones.obtener(product_id)
+        if not forzar and _entrada_vigente(entrada, marca_agua, motor):
+            return entrada["resultado"]
+
+        # El resultado "datos insuficientes" también se guarda: así no se
+        # vuelve a consultar hasta que haya ventas nuevas
+        with metricas.prediccion_segundos.medir("consulta", "ninguno"):
+            ventas = _consultar_ventas_producto(product_id)
+        ajuste = pronostico.pronosticar_ventas(ventas, entrada, motor)
+        _guardar_pronostico(product_id, marca_agua, ajuste, motor)
+        return ajuste["resultado"]
     except Exception as e:
         print(f"Error en get_prediction_data: {e}")
         return {"success": False, "error": str(e)}
+
+RESULTADO_PENDIENTE = {"success": False, "pendiente": True,
+                       "error": "El pronóstico de este producto se está calculando. Inténtalo de nuevo en unos minutos."}
+
+def get_prediction_data(product_id, motor=None):
+    """
+    Pronóstico de demanda a 30 días de un producto. 'motor' elige el motor de
+    pronóstico ('sarimax', 'holt_winters', 'naive_estacional' o 'auto');
+    por defecto, PREDICCION_MOTOR.
+    """
+    try:
+        # --- 1. CACHÉ: si las ventas no cambiaron, no se ajusta el modelo ---
+        marca_agua = _marca_agua_ventas(product_id)
+        entrada = cache_predicciones.obtener(product_id)
+        if _entrada_vigente(entrada, marca_agua, motor):
+            return entrada["resultado"]
+
+        # --- 2. STALE-WHILE-REVALIDATE: nunca bloquear la petición en un ajuste ---
+        if PREDICCION_STALE_WHILE_REVALIDATE:
+            import worker_predicciones
+            worker_predicciones.revalidar_en_segundo_plano(product_id, motor)
+            if entrada:
+                return entrada["resultado"]
+            return dict(RESULTADO_PENDIENTE)
+
+        # --- 3. AJUSTE EN LÍNEA ---
+        return calcular_prediccion(product_id, marca_agua, entrada, motor=motor)
+    except Exception as e:
+        print(f"Error en get_prediction_data: {e}")
+        return {"success": False, "error": str(e)}
+
+def get_prediction_data_batch(ids_productos, motor=None):
+    """
+    Pronósticos de varios productos en una sola pasada:
+    1 consulta para las marcas de agua, 1 consulta agrupada para las ventas
+    de los que no están en caché y ajustes en paralelo en el pool de procesos.
+    Devuelve {id_producto: resultado} con el mismo formato que get_prediction_data.
+    """
+    ids_productos = list(dict.fromkeys(int(pid) for pid in ids_productos))
+    if not ids_productos:
+        return {}
+    resultados = {}
+    try:
+        marcas = _marcas_agua_ventas(ids_productos)
+        pendientes = {}
+        for pid in ids_productos:
+            entrada = cache_predicciones.obtener(pid)
+            marca = marcas.get(pid)
+            if _entrada_vigente(entrada, marca, motor):
+                resultados[pid] = entrada["resultado"]
+            elif PREDICCION_STALE_WHILE_REVALIDATE:
+                import worker_predicciones
+                worker_predicciones.revalidar_en_segundo_plano(pid, motor)
+                resultados[pid] = entrada["resultado"] if entrada else dict(RESULTADO_PENDIENTE)
+            else:
+                pendientes[pid] = entrada
+
+        if pendientes:
+            import worker_predicciones
+            ventas = _consultar_ventas_productos(list(pendientes))
+            for pid, ajuste in worker_predicciones.ajustar_en_paralelo(
+                    {pid: (ventas[pid], entrada) for pid, entrada in pendientes.items()}, motor):
+                if "error_ajuste" in ajuste:
+                    resultados[pid] = {"success": False, "error": ajuste["error_ajuste"]}
+                    continue
+                _guardar_pronostico(pid, marcas.get(pid), ajuste, motor)
+                resultados[pid] = ajuste["resultado"]
+        return resultados
+    except Exception as e:
+        print(f"Error en get_prediction_data_batch: {e}")
+        for pid in ids_productos:
+            resultados.setdefault(pid, {"success": False, "error": str(e)})
+        return resultados
+
+# Latencia de cada función pública en /metrics (bitware_bd_segundos)
+metricas.instrumentar_modulo(globals(), excluir=("reiniciar_conexiones", "estadisticas_pool"))
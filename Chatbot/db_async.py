@@ -0,0 +1,87 @@
+from config import DB_HOST, DB_USER, DB_PASS, DB_NAME, ASYNC_DB_POOL_MAX
+import database as db
+import sesiones
+
+# ======================================================================
+# ACCESO ASÍNCRONO A MYSQL (MODO ASGI)
+# ======================================================================
+# Pool de aiomysql usado solo como precarga de dos intenciones del chat de
+# clientes ('pedido' y 'solicitar_devolucion'); el resto de las consultas
+# del chat siguen siendo síncronas y se ejecutan en hilos (asgi.py).
+# No duplica la lógica de respuestas: cada "precarga" ejecuta sin bloquear
+# las mismas consultas que database.py (SQL_...) y deja el resultado en el
+# contexto de sesión (sesiones.py). Después, app.responder_chat lo encuentra
+# en caché y arma la respuesta sin tocar la BD.
+# Si aiomysql no está instalado o la BD no responde, las precargas
+# devuelven False y asgi.py usa el camino síncrono en un hilo.
+
+_pool = None
+
+async def iniciar():
+    global _pool
+    try:
+        import aiomysql
+        _pool = await aiomysql.create_pool(host=DB_HOST, user=DB_USER, password=DB_PASS, db=DB_NAME,
+                                           minsize=1, maxsize=ASYNC_DB_POOL_MAX, autocommit=True,
+                                           charset="utf8mb4")
+        print(f"✅ Pool asíncrono de MySQL listo (máx. {ASYNC_DB_POOL_MAX} conexiones).")
+    except ImportError:
+        print("⚠️  aiomysql no está instalado: el modo ASGI usará las consultas síncronas en hilos.")
+    except Exception as e:
+        print(f"❌  Error al crear el pool asíncrono: {e}")
+
+async def cerrar():
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+
+async def _fila(sql, params):
+    import aiomysql
+    async with _pool.acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute(sql, params)
+            return await cursor.fetchone()
+
+def _puede_precargar(id_usuario):
+    try:
+        int(id_usuario)
+    except (TypeError, ValueError):
+        return False  # invitado
+    return _pool is not None and sesiones.habilitado()
+
+async def precargar_ultimo_pedido(id_usuario):
+    """
+    Deja en sesión el último pedido del usuario. True si quedó disponible.
+    """
+    if not _puede_precargar(id_usuario):
+        return False
+    if sesiones.contiene("ultimo_pedido", id_usuario):
+        return True
+    try:
+        sesiones.guardar("ultimo_pedido", id_usuario, await _fila(db.SQL_ULTIMO_PEDIDO, (id_usuario,)))
+        return True
+    except Exception as e:
+        print(f"!!! ERROR en precargar_ultimo_pedido: {e}")
+        return False
+
+async def precargar_devolucion(id_usuario):
+    """
+    Deja en sesión la respuesta de elegibilidad de devolución. True si quedó disponible.
+    """
+    if not _puede_precargar(id_usuario):
+        return False
+    if sesiones.contiene("devolucion", id_usuario):
+        return True
+    try:
+        pedido_elegible = await _fila(db.SQL_PEDIDO_DEVOLVIBLE, (id_usuario,))
+        ultimo_pedido = None
+        if not pedido_elegible:
+            ultimo_pedido = await _fila(db.SQL_ULTIMO_PEDIDO, (id_usuario,))
+            sesiones.guardar("ultimo_pedido", id_usuario, ultimo_pedido)
+        sesiones.guardar("devolucion", id_usuario, db.respuesta_devolucion(pedido_elegible, ultimo_pedido))
+        return True
+    except Exception as e:
+        print(f"!!! ERROR en precargar_devolucion: {e}")
+        return False
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor de producción con gunicorn (varios procesos).
+
+app.py se importa una sola vez en el proceso maestro (preload_app): el
+modelo de intenciones, el motor SQLAlchemy y el índice del catálogo quedan
+cargados antes del fork y los procesos hijos los comparten copy-on-write.
+Cada hijo abre después sus propias conexiones a MySQL.
+
+Dos pools, elegidos con GUNICORN_POOL:
+- chat (por defecto): 0.0.0.0:5000 con los mismos certificados que app.py.
+  Procesos gthread (GUNICORN_WORKERS, 0 = uno por núcleo) con GUNICORN_HILOS
+  hilos cada uno. /predict_demand y /predict_demand/batch se reenvían al
+  pool largo (servidor.py), los pronósticos pedidos por chat se le piden
+  a él y las exportaciones a Excel se encolan allí.
+- largo: 127.0.0.1:5001, procesos sync con timeout amplio para ajustes de
+  pronóstico y generación de Excel (GUNICORN_WORKERS_LARGO, 0 = la mitad
+  de los núcleos). Así una ráfaga de pronósticos no deja sin procesos al chat.
+
+Uso (desde Chatbot/, un comando por pool):
+    GUNICORN_POOL=largo gunicorn -c gunicorn.conf.py
+    gunicorn -c gunicorn.conf.py
+Con SERVIDOR_URL_LARGO='' el pool de chat atiende todo, sin pool largo.
+"""
+import gc
+import multiprocessing
+import os
+import sys
+
+DIR_CHATBOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, DIR_CHATBOT)
+
+POOL = os.getenv("GUNICORN_POOL", "chat")
+PUERTO_LARGO = os.getenv("GUNICORN_PUERTO_LARGO", "5001")
+# Antes de importar config: app.py y trabajos_exportacion.py lo leen al importarse
+if POOL == "largo":
+    os.environ["SERVIDOR_URL_LARGO"] = ""
+else:
+    os.environ.setdefault("SERVIDOR_URL_LARGO", f"http://127.0.0.1:{PUERTO_LARGO}")
+
+from config import GUNICORN_WORKERS, GUNICORN_HILOS, GUNICORN_WORKERS_LARGO, CATALOGO_INDICE
+
+NUCLEOS = multiprocessing.cpu_count()
+
+chdir = DIR_CHATBOT
+preload_app = True
+
+if POOL == "largo":
+    wsgi_app = "servidor:app_largo"
+    bind = [f"127.0.0.1:{PUERTO_LARGO}"]
+    workers = GUNICORN_WORKERS_LARGO or max(1, NUCLEOS // 2)
+    worker_class = "sync"
+    timeout = 300
+else:
+    wsgi_app = "servidor:app_chat"
+    bind = ["0.0.0.0:5000"]
+    workers = GUNICORN_WORKERS or NUCLEOS
+    worker_class = "gthread"
+    threads = GUNICORN_HILOS
+    timeout = 30
+    from app import buscar_certificados
+    certificados = buscar_certificados()
+    if certificados:
+        certfile, keyfile = certificados
+    else:
+        print("⚠️ ADVERTENCIA: No se encontraron certificados válidos. Pool de chat en HTTP.")
+
+# ======================================================================
+# HOOKS
+# ======================================================================
+
+def when_ready(server):
+    # Cargar en el maestro lo que los hijos comparten; gc.freeze evita que
+    # el recolector toque esos objetos y fuerce la copia de sus páginas
+    if POOL == "chat" and CATALOGO_INDICE:
+        import catalogo
+        catalogo.disponible()
+    gc.freeze()
+    server.log.info(f"Pool '{POOL}' listo: {workers} procesos ({worker_class}).")
+
+def post_fork(server, worker):
+    import database
+    database.reiniciar_conexiones()
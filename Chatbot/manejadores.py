@@ -0,0 +1,424 @@
+import json
+import random
+import re
+import socket
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from config import SERVIDOR_URL_LARGO, PREDICCION_CHAT_TIMEOUT
+import database as db
+import trabajos_exportacion as exportaciones
+
+# ======================================================================
+# RESPUESTAS DEL CHAT POR ROL E INTENCIÓN
+# ======================================================================
+# Cada rol (admin, vendedor, cliente, invitado) tiene una lista ordenada de
+# reglas, registradas con @regla: las intenciones que atiende, palabras que
+# la activan aunque la intención sea otra (p. ej. "ayuda") y el manejador
+# (función que recibe el mensaje, los datos extraídos por nlp_engine y el
+# JSON de la petición, o un texto fijo). Gana la primera regla que coincide,
+# como en una cadena if/elif, pero al importar se compila a un diccionario
+# intención -> manejador: por mensaje solo se revisan las pocas palabras
+# de las reglas que van antes de la de su intención.
+# Un manejador devuelve el texto de la respuesta o la respuesta completa:
+# {"respuesta", "productos"[, "exportacion"]}.
+
+URL_BASE = "https://bitware.site:5000/"
+ROLES = {'A': 'admin', 'V': 'vendedor'}
+ROLES_CHAT = ("admin", "vendedor", "cliente", "invitado")
+
+_reglas = {r: [] for r in ROLES_CHAT}
+
+def regla(roles, intenciones=(), palabras=()):
+    """
+    Decorador: registra el manejador para esos roles, después de los ya
+    registrados. También acepta un texto fijo: regla(...)("texto").
+    """
+    def registrar(manejador):
+        for r in roles:
+            _reglas[r].append((tuple(intenciones), tuple(palabras), manejador))
+        return manejador
+    return registrar
+
+# --- TEXTOS FIJOS ---
+NO_ENTENDI = {
+    "admin": "No entendí ese comando de Admin. Escribe 'ayuda' para ver las opciones.",
+    "vendedor": "No entendí ese comando. Escribe 'ayuda' para ver tus opciones.",
+    "cliente": "Lo siento, no entendí. Puedes pedirme que **busque un producto** o que revise el **estado de tu pedido**.",
+}
+NO_ENTENDI["invitado"] = NO_ENTENDI["cliente"]
+
+SALUDOS_INVITADO = (
+    "¡Hola! Bienvenido a Bitware. Inicia sesión para sacar el máximo provecho.",
+    "¡Bienvenido! Soy tu asistente virtual. Escribe 'ayuda' para ver qué puedo hacer.",
+)
+
+AYUDA_ADMIN = (
+    "**Comandos de Administrador:**\n"
+    "* **'Exportar ventas'**: Descarga un reporte global de todas las ventas.\n"
+    "* **'Estadísticas'**: Muestra el resumen rápido del sistema.\n"
+    "* **'Total usuarios'**: Muestra el conteo total de usuarios registrados.\n"
+    "* **'Reporte de ventas hoy'**: Calcula los ingresos del día.\n"
+    "* **'Busca al cliente [dato]'**: Encuentra información de un cliente.\n"
+    "* **'Actualiza pedido [ID] a [estado]'**: Cambia estado (Ej: 'pedido 105 a Enviado').\n"
+    "* **'Predice stock de [producto]'**: Pronóstico de demanda."
+)
+AYUDA_VENDEDOR = (
+    "**Comandos de Vendedor:**\n"
+    "* **'Exportar ventas'**: Descarga un Excel seguro con tus transacciones.\n"
+    "* **'Mis ventas'**: Muestra el total de ventas e ingresos.\n"
+)
+_AYUDA_BASICA = (
+    "* **'Busca [producto]'**: Para encontrar productos (Ej: 'Busca RTX 3060').\n"
+    "* **'Compara [A] con [B]'**: Muestra una comparativa de precios.\n"
+    "* **'Horarios de atención'**: Muestra los horarios de la tienda.\n"
+    "* **'Soporte'**: Te indica cómo contactar a soporte técnico."
+)
+AYUDA_INVITADO = (
+    "**Hola, Invitado. Esto es lo que puedes hacer:**\n"
+    f"{_AYUDA_BASICA}\n"
+    "\n¡**Inicia sesión** para ver tu pedido, actualizar tu dirección y más!"
+)
+_AYUDA_CLIENTE = (
+    "**SOBRE TUS PEDIDOS:**\n"
+    "* **'Estado de mi pedido'**: Revisa dónde está tu última compra.\n"
+    "* **'Quiero devolver [motivo]'**: Inicia una solicitud de devolución para tu último pedido.\n\n"
+    "**SOBRE PRODUCTOS:**\n"
+    "* **'Avísame de [producto]'**: Te notificaré cuando un producto vuelva a estar disponible.\n"
+) + _AYUDA_BASICA
+
+SIN_ESTADISTICAS = "No pude obtener las estadísticas en este momento."
+PREGUNTA_BUSQUEDA = "¿Qué producto te gustaría buscar?"
+
+# --- EXPRESIONES Y FRASES (respaldo cuando el enrutador de nlp_engine no extrajo los datos) ---
+_PRODUCTO_ADMIN_RE = re.compile(r'(?:de|del)\s(.+)')
+_PRODUCTO_STOCK_RE = re.compile(r'stock\s(.+)')
+_ESTADO_PEDIDO_RE = re.compile(r'pedido\s#?(\d+)\s(?:a|como)\s(\w+)')
+_CLIENTE_RE = re.compile(r'(?:busca al cliente|datos de cliente|info de|encuentra a|cliente)\s(.+)')
+_NOTIFICACION_RE = re.compile(r'(?:avísame de|notifícame de|disponible)\s(?:el|la)\s(.+)')
+_COMPARACION_RE = re.compile(r'compara\s(.+)\s(?:con|y)\s(.+)')
+_DIRECCION_RE = re.compile(r'dirección\s(?:a|es)\s(.+)')
+PREFIJOS_PREDICCION_VENDEDOR = ("predice stock de", "predice el stock de", "predice stock", "predicción de",
+                                "demanda de", "pronostica")
+FRASES_SOLO_BUSCAR = frozenset(("buscar producto", "busca producto", "encontrar producto"))
+PREFIJOS_BUSQUEDA = tuple(p + " " for p in ("busca", "búscame", "encuentra", "tienes", "precio de", "cotiza",
+                                            "buscar", "quiero buscar"))
+
+# ======================================================================
+# ADMINISTRADORES ('A')
+# ======================================================================
+
+@regla(("admin",), ("saludo",))
+def _saludo_admin(mensaje, datos, usuario):
+    nombre = usuario.get("nombre_usuario", "Invitado")
+    alertas = db.get_proactive_alerts()
+    if alertas:
+        return random.choice((f"Hola, Admin **{nombre}**. Atención: {alertas}",
+                              f"Bienvenido de nuevo. Tengo novedades importantes: {alertas}",
+                              f"¡Hola! Antes de empezar, revisa esto: {alertas}"))
+    return random.choice((f"Hola, Admin **{nombre}**. Todo el sistema opera al 100%.",
+                          f"¡Bienvenido, **{nombre}**! No hay alertas pendientes por ahora."))
+
+def _prediccion_en_pool_largo(id_producto):
+    """
+    Pide el pronóstico a /predict_demand del pool de tareas largas, para que
+    el ajuste no ocupe el proceso del chat. None si el pool no responde.
+    """
+    cuerpo = json.dumps({"id_producto": id_producto}).encode("utf-8")
+    peticion = Request(f"{SERVIDOR_URL_LARGO}/predict_demand", data=cuerpo,
+                       headers={"Content-Type": "application/json"})
+    try:
+        with urlopen(peticion, timeout=PREDICCION_CHAT_TIMEOUT) as respuesta:
+            return json.load(respuesta)
+    except HTTPError as e:
+        # 404 (datos insuficientes) o 500: el cuerpo trae el error
+        try:
+            return {"success": False, "error": json.load(e)["error"]}
+        except (ValueError, KeyError):
+            return {"success": False, "error": str(e)}
+    except (socket.timeout, TimeoutError):
+        # El pool largo sigue ajustando y deja el resultado en caché
+        return dict(db.RESULTADO_PENDIENTE)
+    except URLError as e:
+        if isinstance(e.reason, (socket.timeout, TimeoutError)):
+            return dict(db.RESULTADO_PENDIENTE)
+        print(f"⚠️  Pool de tareas largas no disponible ({e}); pronóstico en este proceso.")
+        return None
+
+def _pronostico(producto, sujeto):
+    resultado = None
+    if SERVIDOR_URL_LARGO:
+        resultado = _prediccion_en_pool_largo(producto['id_producto'])
+    if resultado is None:
+        resultado = db.get_prediction_data(producto['id_producto'])
+    if resultado.get("pendiente"):
+        return (f"Estoy calculando el pronóstico de {sujeto}'{producto['nombre']}'. "
+                "Pregúntame de nuevo en unos minutos.")
+    if resultado["success"]:
+        return (f"La demanda pronosticada para {sujeto}'{producto['nombre']}' en los próximos 30 días "
+                f"es de **{resultado['total_forecast']} unidades**.")
+    return f"No pude predecir '{producto['nombre']}': {resultado['error']}"
+
+@regla(("admin",), ("prediccion_stock",))
+def _prediccion_admin(mensaje, datos, usuario):
+    termino = datos.get("producto")
+    if termino is None:
+        match = _PRODUCTO_ADMIN_RE.search(mensaje) or _PRODUCTO_STOCK_RE.search(mensaje)
+        termino = match.group(1).strip() if match else ""
+    if not termino:
+        return "Claro, dime el nombre del producto que quieres predecir. Ej: 'Predice el stock de RTX 3060'"
+    producto = db.find_product_id_by_name(termino)
+    if not producto:
+        return f"No encontré el producto '{termino}'."
+    return _pronostico(producto, "")
+
+def _exportacion(job_id, respuesta):
+    # El frontend consulta status_url hasta que el Excel esté listo
+    return {"respuesta": respuesta, "productos": [],
+            "exportacion": {"job_id": job_id, "status_url": f"{URL_BASE}export_status/{job_id}"}}
+
+@regla(("admin",), ("exportar_ventas",))
+def _exportar_admin(mensaje, datos, usuario):
+    job_id = exportaciones.encolar_exportacion(usuario.get("userId"), URL_BASE, es_admin=True)
+    return _exportacion(job_id, f"⏳ Generando reporte GLOBAL de ventas (trabajo <strong>{job_id[:8]}</strong>). "
+                                "Te dejaré el enlace de descarga aquí apenas esté listo.")
+
+@regla(("admin",), ("stats_admin",))
+def _estadisticas_admin(mensaje, datos, usuario):
+    if "total usuarios" in mensaje or "cuantos usuarios" in mensaje:
+        metricas = db.obtener_metricas_admin()
+        if not metricas:
+            return SIN_ESTADISTICAS
+        return f"Actualmente hay <strong>{metricas['total_usuarios']}</strong> usuarios registrados en total."
+    if "reporte de ventas hoy" in mensaje or "ventas hoy" in mensaje:
+        metricas = db.obtener_metricas_admin()
+        if not metricas:
+            return SIN_ESTADISTICAS
+        return f"Los ingresos totales de hoy (pedidos pagados) son: <strong>${metricas['ventas_hoy']:,.0f}</strong>."
+    stats = db.obtener_estadisticas_admin()
+    if not stats:
+        return SIN_ESTADISTICAS
+    return (f"**Resumen Rápido del Sistema:**\n"
+            f"- **Mensajes Nuevos:** {stats['nuevos_mensajes']}\n"
+            f"- **Servicios Pendientes:** {stats['servicios_pendientes']}\n"
+            f"- **Productos con Bajo Stock:** {stats['bajo_stock']}")
+
+@regla(("admin",), ("cambiar_estado_pedido",))
+def _cambiar_estado_admin(mensaje, datos, usuario):
+    if "id_pedido" in datos:
+        id_pedido, nuevo_estado = datos["id_pedido"], datos["estado"]
+    else:
+        match = _ESTADO_PEDIDO_RE.search(mensaje)
+        id_pedido, nuevo_estado = match.groups() if match else (None, None)
+    if not id_pedido:
+        return "Claro. Dime el número de pedido y el nuevo estado. Ej: 'Actualiza el pedido 123 a Enviado'."
+    return db.cambiar_estado_pedido_db(id_pedido, nuevo_estado.capitalize())
+
+@regla(("admin",), ("analisis_admin",))
+def _analisis_admin(mensaje, datos, usuario):
+    return db.get_category_growth_analysis()
+
+@regla(("admin",), ("buscar_cliente_admin",))
+def _buscar_cliente_admin(mensaje, datos, usuario):
+    termino = datos.get("cliente")
+    if termino is None:
+        match = _CLIENTE_RE.search(mensaje)
+        termino = match.group(1).strip() if match else mensaje
+    if not termino:
+        return "Dime el nombre o email del cliente que buscas."
+    cliente = db.buscar_cliente_por_email_o_nombre(termino)
+    if not cliente:
+        return f"No encontré al cliente '{termino}'."
+    return (f"**Cliente Encontrado:**\n- **Nombre:** {cliente['nombre']}\n- **Email:** {cliente['email']}\n"
+            f"- **Región:** {cliente['region'] or 'N/A'}\n- **Pedidos:** {cliente['total_pedidos']}")
+
+regla(("admin",), ("funciones",), ("ayuda",))(AYUDA_ADMIN)
+
+# ======================================================================
+# VENDEDORES ('V')
+# ======================================================================
+
+@regla(("vendedor",), ("saludo",))
+def _saludo_vendedor(mensaje, datos, usuario):
+    nombre = usuario.get("nombre_usuario", "Invitado")
+    return random.choice((f"¡Hola, Vendedor **{nombre}**. ¿Listo para vender más hoy?",
+                          f"Bienvenido a tu panel, **{nombre}**."))
+
+@regla(("vendedor",), ("prediccion_stock",))
+def _prediccion_vendedor(mensaje, datos, usuario):
+    termino = datos.get("producto")
+    if termino is None:
+        termino = mensaje
+        for prefijo in PREFIJOS_PREDICCION_VENDEDOR:
+            if termino.startswith(prefijo):
+                termino = termino[len(prefijo):].strip()
+                break
+    if not termino:
+        return "Claro, dime el nombre de tu producto que quieres predecir. Ej: 'Predice el stock de AdoLuche'"
+    producto = db.find_product_id_by_name(termino, id_vendedor=usuario.get("userId"))
+    if not producto:
+        return f"No encontré el producto '{termino}' en tu inventario."
+    return _pronostico(producto, "tu producto ")
+
+@regla(("vendedor",), ("exportar_ventas",))
+def _exportar_vendedor(mensaje, datos, usuario):
+    job_id = exportaciones.encolar_exportacion(usuario.get("userId"), URL_BASE)
+    return _exportacion(job_id, f"⏳ Generando tu reporte de ventas seguro (trabajo <strong>{job_id[:8]}</strong>). "
+                                "Te dejaré el enlace de descarga aquí apenas esté listo.")
+
+@regla(("vendedor",), ("stats_admin", "stock_admin"), ("productos", "ventas"))
+def _estadisticas_vendedor(mensaje, datos, usuario):
+    estadisticas = db.estadisticas_vendedor(usuario.get("userId")) or {}
+    if "ventas" in mensaje:
+        num_ventas = estadisticas.get('num_ventas') or 0
+        total_revenue = estadisticas.get('total_revenue') or 0
+        return (f"Hasta ahora, has realizado <strong>{num_ventas}</strong> ventas, "
+                f"generando un total de <strong>${total_revenue:,.0f}</strong>.")
+    num_productos = estadisticas.get('num_productos') or 0
+    total_stock = estadisticas.get('total_stock') or 0
+    return (f"Actualmente tienes <strong>{num_productos}</strong> productos listados, "
+            f"con un stock total de <strong>{total_stock}</strong> unidades.")
+
+regla(("vendedor",), ("funciones",), ("ayuda",))(AYUDA_VENDEDOR)
+
+# ======================================================================
+# CLIENTES E INVITADOS ('U' o sin permisos)
+# ======================================================================
+
+regla(("cliente", "invitado"), ("prediccion_stock", "exportar_ventas"))(
+    "Lo siento, esa función es exclusiva para Vendedores y Administradores.")
+regla(("invitado",), ("pedido", "solicitar_devolucion", "solicitar_notificacion", "actualizar_direccion"))(
+    "Para esa función, primero debes **iniciar sesión** en tu cuenta.")
+
+@regla(("cliente",), ("saludo",))
+def _saludo_cliente(mensaje, datos, usuario):
+    nombre = usuario.get("nombre_usuario", "Invitado")
+    return random.choice((f"¡Hola de nuevo, **{nombre}**. ¿Buscas algo especial hoy?",
+                          f"Bienvenido a Bitware, **{nombre}**. ¿En qué te ayudo?"))
+
+@regla(("invitado",), ("saludo",))
+def _saludo_invitado(mensaje, datos, usuario):
+    return random.choice(SALUDOS_INVITADO)
+
+@regla(("cliente",), ("funciones",), ("ayuda",))
+def _ayuda_cliente(mensaje, datos, usuario):
+    return f"**Hola, {usuario.get('nombre_usuario', 'Invitado')}. ¡Puedes pedirme todo esto!:**\n\n{_AYUDA_CLIENTE}"
+
+regla(("invitado",), ("funciones",), ("ayuda",))(AYUDA_INVITADO)
+
+@regla(("cliente", "invitado"), ("producto",))
+def _recomendar(mensaje, datos, usuario):
+    return {"respuesta": "¡Claro! Aquí tienes algunas recomendaciones:",
+            "productos": db.recomendar_productos(usuario.get("userId"))}
+
+@regla(("cliente", "invitado"), ("busqueda_producto",))
+def _buscar_producto(mensaje, datos, usuario):
+    if mensaje in FRASES_SOLO_BUSCAR:
+        return PREGUNTA_BUSQUEDA
+    termino = datos.get("producto")
+    if termino is None:
+        termino = mensaje
+        for prefijo in PREFIJOS_BUSQUEDA:
+            if termino.startswith(prefijo):
+                termino = termino[len(prefijo):].strip()
+                break
+    if not termino:
+        return PREGUNTA_BUSQUEDA
+    encontrados = db.buscar_productos_por_nombre(termino)
+    if not encontrados:
+        return f"Lo siento, no encontré nada relacionado con **'{termino}'**."
+    return {"respuesta": f"Encontré esto relacionado con **'{termino}'**:", "productos": encontrados}
+
+@regla(("cliente",), ("pedido",))
+def _ultimo_pedido(mensaje, datos, usuario):
+    pedido = db.estado_ultimo_pedido(usuario.get("userId"))
+    if not pedido:
+        return "Aún no tienes pedidos."
+    return f"Tu último pedido es el #{pedido['id_pedido']} y su estado es: **{pedido['estado']}**."
+
+@regla(("cliente",), ("solicitar_devolucion",))
+def _devolucion(mensaje, datos, usuario):
+    return db.solicitar_devolucion_db(usuario.get("userId"))["mensaje"]
+
+@regla(("cliente",), ("solicitar_notificacion",))
+def _notificacion(mensaje, datos, usuario):
+    match = _NOTIFICACION_RE.search(mensaje)
+    return db.solicitar_notificacion_db(usuario.get("userId"), usuario.get("email_usuario", ""), match.group(1).strip() if match else "")
+
+@regla(("cliente", "invitado"), ("comparar_productos",))
+def _comparar(mensaje, datos, usuario):
+    if "otro" in datos:
+        p1, p2 = datos["producto"], datos["otro"]
+    else:
+        match = _COMPARACION_RE.search(mensaje)
+        p1, p2 = match.groups() if match else (None, None)
+    if not p1:
+        return "Dime los dos productos que quieres comparar. Ej: 'Compara RTX 3060 con RX 6600'."
+    return db.comparar_productos_db(p1.strip(), p2.strip())
+
+@regla(("cliente",), ("actualizar_direccion",))
+def _direccion(mensaje, datos, usuario):
+    nueva = datos.get("direccion")
+    if nueva is None:
+        match = _DIRECCION_RE.search(mensaje)
+        nueva = match.group(1).strip() if match else ""
+    if not nueva:
+        return "Dime cuál es tu nueva dirección. Ej: 'Actualizar mi dirección a Calle Falsa 123'."
+    return db.actualizar_direccion_db(usuario.get("userId"), nueva)
+
+regla(("cliente", "invitado"), ("horarios",))(
+    "Nuestros horarios de atención son de **Lunes a Viernes de 9:00 a 18:00 hrs**.")
+regla(("cliente", "invitado"), ("pagos",))("Aceptamos pagos a través de **Webpay (Tarjetas de Crédito/Débito)**")
+regla(("cliente", "invitado"), ("soporte",))(
+    "Para soporte técnico, visita nuestra sección de **Ayuda** o envíanos un mensaje desde **Soporte** en el pie de página.")
+
+# ======================================================================
+# DESPACHO
+# ======================================================================
+
+def _compilar(reglas, por_defecto):
+    """
+    Tabla de un rol: intención -> (pares (palabra, manejador) de las reglas
+    por palabra que van antes de la primera regla de esa intención, su
+    manejador). La clave None es para las intenciones sin regla.
+    """
+    tabla, por_palabra = {}, []
+    for intenciones, palabras, manejador in reglas:
+        for intencion in intenciones:
+            tabla.setdefault(intencion, (tuple(por_palabra), manejador))
+        por_palabra.extend((palabra, manejador) for palabra in palabras)
+    tabla[None] = (tuple(por_palabra), por_defecto)
+    return tabla
+
+_tablas = {}        # rol -> tabla
+_por_permisos = {}  # permisos ('A', 'V') -> (rol, tabla)
+_cliente = _invitado = None
+
+def compilar():
+    """
+    Arma las tablas de despacho. Se llama al importar; volver a llamarla
+    después de registrar reglas nuevas.
+    """
+    global _cliente, _invitado
+    _tablas.update({r: _compilar(_reglas[r], NO_ENTENDI[r]) for r in ROLES_CHAT})
+    _por_permisos.update({permisos: (r, _tablas[r]) for permisos, r in ROLES.items()})
+    _cliente, _invitado = ("cliente", _tablas["cliente"]), ("invitado", _tablas["invitado"])
+
+def responder(usuario, mensaje, intencion, datos):
+    """
+    (rol, {"respuesta", "productos"[, "exportacion"]}) para el mensaje.
+    'usuario' es el JSON de la petición (permisos, userId, nombre_usuario...).
+    """
+    rol, tabla = _por_permisos.get(usuario.get("permisos")) or (_cliente if usuario.get("userId") else _invitado)
+    previas, elegido = tabla.get(intencion) or tabla[None]
+    for palabra, manejador in previas:
+        if palabra in mensaje:
+            elegido = manejador
+            break
+    if elegido.__class__ is not str:
+        elegido = elegido(mensaje, datos, usuario)
+        if elegido.__class__ is dict:
+            return rol, elegido
+    return rol, {"respuesta": elegido, "productos": []}
+
+compilar()
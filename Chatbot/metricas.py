@@ -0,0 +1,198 @@
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from config import METRICAS_HABILITADAS, METRICAS_LENTA_SEG
+
+# ======================================================================
+# MÉTRICAS DE LATENCIA (formato Prometheus)
+# ======================================================================
+# Histogramas y contadores en memoria, por proceso, expuestos en /metrics
+# con el formato de texto de Prometheus. Se miden:
+# - cada petición HTTP (ruta, código) y cada mensaje del chat (intención, rol);
+# - el clasificador de intenciones;
+# - cada función pública de database.py (instrumentar_modulo);
+# - las fases de un pronóstico (consulta, remuestreo, ajuste, pronostico) y
+#   de un Excel (marca_agua, datos, escritura, streaming).
+# Con METRICAS_LENTA_SEG > 0, las peticiones más lentas que el umbral se
+# registran con el detalle de lo que se midió dentro de ellas.
+# Con gunicorn cada proceso tiene sus propias cifras.
+
+CUBETAS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registro = []
+_indicadores = []  # funciones que devuelven métricas instantáneas (gauges)
+_local = threading.local()
+
+def _etiquetas(nombres, valores, extra=None):
+    pares = [f'{n}="{str(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+class Contador:
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+        _registro.append(self)
+
+    def incrementar(self, *valores, cantidad=1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + cantidad
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        with self._lock:
+            for valores, total in sorted(self._valores.items()):
+                lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, valores)} {total}")
+        return lineas
+
+class Histograma:
+    def __init__(self, nombre, ayuda, etiquetas=(), cubetas=CUBETAS):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, tuple(etiquetas)
+        self.cubetas = tuple(cubetas)
+        self._series = {}  # valores de etiquetas -> [conteo por cubeta..., suma, total]
+        self._lock = threading.Lock()
+        _registro.append(self)
+
+    def observar(self, segundos, *valores):
+        i = bisect_left(self.cubetas, segundos)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [0] * (len(self.cubetas) + 2)
+            if i < len(self.cubetas):
+                serie[i] += 1
+            serie[-2] += segundos
+            serie[-1] += 1
+
+    @contextmanager
+    def medir(self, *valores):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            segundos = time.perf_counter() - inicio
+            self.observar(segundos, *valores)
+            _anotar(self.nombre.removeprefix("bitware_").removesuffix("_segundos"), valores, segundos)
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            series = sorted((valores, list(serie)) for valores, serie in self._series.items())
+        for valores, serie in series:
+            acumulado = 0
+            for limite, conteo in zip(self.cubetas, serie):
+                acumulado += conteo
+                le = 'le="%s"' % limite
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, valores, le)} {acumulado}")
+            le = 'le="+Inf"'
+            lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, valores, le)} {serie[-1]}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, valores)} {serie[-2]:.6f}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, valores)} {serie[-1]}")
+        return lineas
+
+# ======================================================================
+# MÉTRICAS DEL CHATBOT
+# ======================================================================
+
+http_segundos = Histograma("bitware_http_segundos", "Duración de las peticiones HTTP.", ("ruta", "metodo"))
+http_peticiones = Contador("bitware_http_peticiones_total", "Peticiones HTTP atendidas.", ("ruta", "codigo"))
+chat_segundos = Histograma("bitware_chat_segundos", "Duración de la respuesta del chat por intención.",
+                           ("intencion", "rol"))
+nlp_segundos = Histograma("bitware_nlp_clasificacion_segundos", "Duración de la clasificación de intenciones.")
+nlp_enrutador = Contador("bitware_nlp_enrutador_total", "Mensajes resueltos por reglas o por el modelo.", ("via",))
+bd_segundos = Histograma("bitware_bd_segundos", "Duración de las funciones de database.py.", ("funcion",))
+bd_errores = Contador("bitware_bd_errores_total", "Excepciones lanzadas por funciones de database.py.", ("funcion",))
+prediccion_segundos = Histograma("bitware_prediccion_fase_segundos", "Duración de cada fase de un pronóstico.",
+                                 ("fase", "motor"))
+excel_segundos = Histograma("bitware_excel_fase_segundos", "Duración de cada fase de una exportación a Excel.",
+                            ("fase",))
+
+def registrar_indicadores(funcion):
+    """
+    funcion() devuelve [(nombre, ayuda, ((etiqueta, valor), ...), número[, tipo])]:
+    valores que se leen al exponer, p. ej. el pool de BD. tipo: 'gauge' (por
+    defecto) o 'counter'.
+    """
+    _indicadores.append(funcion)
+
+def exponer():
+    """
+    Todas las métricas en formato de texto de Prometheus.
+    """
+    lineas = []
+    for metrica in _registro:
+        lineas += metrica.exponer()
+    vistos = set()
+    for funcion in _indicadores:
+        try:
+            muestras = funcion()
+        except Exception as e:
+            print(f"!!! ERROR leyendo indicadores para /metrics: {e}")
+            continue
+        for nombre, ayuda, etiquetas, valor, *tipo in muestras:
+            if nombre not in vistos:
+                vistos.add(nombre)
+                lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo[0] if tipo else 'gauge'}"]
+            nombres, valores = zip(*etiquetas) if etiquetas else ((), ())
+            lineas.append(f"{nombre}{_etiquetas(nombres, valores)} {valor}")
+    return "\n".join(lineas) + "\n"
+
+# ======================================================================
+# INSTRUMENTACIÓN
+# ======================================================================
+
+def _instrumentar_funcion(funcion):
+    nombre = funcion.__name__
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        except Exception:
+            bd_errores.incrementar(nombre)
+            raise
+        finally:
+            segundos = time.perf_counter() - inicio
+            bd_segundos.observar(segundos, nombre)
+            _anotar("bd", (nombre,), segundos)
+    return envoltura
+
+def instrumentar_modulo(espacio, excluir=()):
+    """
+    Reemplaza en 'espacio' (globals() de un módulo) cada función pública
+    definida en ese módulo por una versión que mide su duración en
+    bitware_bd_segundos{funcion}. Los generadores se dejan tal cual.
+    """
+    if not METRICAS_HABILITADAS:
+        return
+    modulo = espacio["__name__"]
+    for nombre, objeto in list(espacio.items()):
+        if (inspect.isfunction(objeto) and objeto.__module__ == modulo and not nombre.startswith("_")
+                and nombre not in excluir and not inspect.isgeneratorfunction(objeto)):
+            espacio[nombre] = _instrumentar_funcion(objeto)
+
+# --- PETICIONES LENTAS ---
+# Mientras dura una petición se anota cada medición en una lista del hilo;
+# al terminar, si superó METRICAS_LENTA_SEG, se imprime el desglose.
+
+def _anotar(nombre, valores, segundos):
+    traza = getattr(_local, "traza", None)
+    if traza is not None:
+        traza.append((f"{nombre}[{','.join(map(str, valores))}]" if valores else nombre, segundos))
+
+def iniciar_traza():
+    _local.traza = [] if METRICAS_LENTA_SEG > 0 else None
+
+def terminar_traza(descripcion, segundos):
+    traza, _local.traza = getattr(_local, "traza", None), None
+    if traza is None or segundos < METRICAS_LENTA_SEG:
+        return
+    detalle = ", ".join(f"{nombre} {s * 1000:.0f}ms" for nombre, s in sorted(traza, key=lambda t: -t[1])[:8])
+    print(f"🐢 Petición lenta ({segundos:.2f}s): {descripcion}" + (f" | {detalle}" if detalle else ""))
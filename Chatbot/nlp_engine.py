@@ -1,5 +1,16 @@
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.naive_bayes import MultinomialNB
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+
+import numpy as np
+
+from cache_lru import CacheLRU
+from config import NLP_CACHE_MAX
+from metricas import nlp_segundos, nlp_enrutador
 
 # --- Intenciones de Usuario ---
 saludos = ["hola", "buenas", "qué tal", "hey", "saludos"]
@@ -55,15 +66,313 @@ intenciones = (
     ["exportar_ventas"] * len(exportar_frases)
 )
 
-# Inicializar y entrenar el modelo al cargar el módulo
-vectorizer = CountVectorizer()
-X = vectorizer.fit_transform(frases)
-modelo = MultinomialNB()
-modelo.fit(X, intenciones)
+# ======================================================================
+# MODELO PRECOMPILADO
+# ======================================================================
+# El vocabulario y las log-probabilidades del Naive Bayes se guardan en un
+# .npz (python nlp_engine.py --build). Al arrancar solo se carga ese archivo
+# y se clasifica con NumPy, sin importar sklearn. Si las listas de frases
+# cambiaron (el hash no coincide), se reentrena y se reescribe el archivo.
+
+ARTEFACTO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'modelo_intenciones.npz')
+# Mismo patrón de tokens que CountVectorizer por defecto
+_TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+
+def _hash_frases():
+    contenido = json.dumps([frases, intenciones], ensure_ascii=False)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+def _entrenar():
+    """
+    Entrena CountVectorizer + MultinomialNB (sklearn solo se importa aquí).
+    """
+    from sklearn.feature_extraction.text import CountVectorizer
+    from sklearn.naive_bayes import MultinomialNB
+
+    vectorizer = CountVectorizer()
+    X = vectorizer.fit_transform(frases)
+    modelo = MultinomialNB()
+    modelo.fit(X, intenciones)
+    return vectorizer, modelo
+
+def construir_artefacto(ruta=ARTEFACTO):
+    """
+    Entrena el modelo y guarda vocabulario, clases y log-probabilidades.
+    """
+    vectorizer, modelo = _entrenar()
+    vocabulario = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    np.savez_compressed(ruta,
+                        vocabulario=np.array(vocabulario),
+                        clases=np.array(modelo.classes_),
+                        feature_log_prob=modelo.feature_log_prob_,
+                        class_log_prior=modelo.class_log_prior_,
+                        hash=np.array(_hash_frases()))
+    print(f"✅  Modelo de intenciones guardado en {ruta}")
+
+def _cargar_modelo():
+    if os.path.exists(ARTEFACTO):
+        with np.load(ARTEFACTO) as datos:
+            if str(datos['hash']) == _hash_frases():
+                return ({palabra: i for i, palabra in enumerate(datos['vocabulario'].tolist())},
+                        datos['clases'].tolist(), datos['feature_log_prob'], datos['class_log_prior'])
+        print("⚠️  Las frases de entrenamiento cambiaron: reentrenando el modelo de intenciones...")
+    try:
+        construir_artefacto()
+    except OSError as e:
+        # Sin permisos de escritura: se entrena igual y se usa en memoria
+        print(f"⚠️  No se pudo guardar el modelo de intenciones: {e}")
+        vectorizer, modelo = _entrenar()
+        return (dict(vectorizer.vocabulary_), list(modelo.classes_),
+                modelo.feature_log_prob_, modelo.class_log_prior_)
+    return _cargar_modelo()
+
+# Cargar el modelo al importar el módulo
+_vocabulario, _clases, _feature_log_prob, _class_log_prior = _cargar_modelo()
+
+_cache = CacheLRU(NLP_CACHE_MAX)
+
+def _normalizar(mensaje):
+    return " ".join(mensaje.lower().split())
+
+def _clasificar(mensaje):
+    # Vector de conteos disperso: solo los índices de palabras conocidas
+    conteos = Counter(_vocabulario[t] for t in _TOKEN_RE.findall(mensaje) if t in _vocabulario)
+    log_prob = _class_log_prior.copy()
+    if conteos:
+        indices = np.fromiter(conteos.keys(), dtype=np.intp, count=len(conteos))
+        valores = np.fromiter(conteos.values(), dtype=float, count=len(conteos))
+        log_prob += _feature_log_prob[:, indices] @ valores
+    return _clases[int(np.argmax(log_prob))]
+
+# ======================================================================
+# ENRUTADOR DE COMANDOS
+# ======================================================================
+# Antes del modelo se buscan las frases de entrenamiento en el mensaje con
+# un autómata Aho-Corasick por palabras (una sola pasada). Se responde sin
+# Naive Bayes cuando el mensaje:
+# - es exactamente una frase ("hola", "total usuarios", "¿dónde está mi pedido?"), o
+# - empieza con una frase de una intención de _DATOS ("busca rtx 3060",
+#   "compara a con b") y el resto no contiene frases de otra intención; el
+#   resto se devuelve ya separado en datos (producto, id_pedido, ...).
+# Si hay varias frases al inicio gana la más larga ("busca al cliente" > "busca").
+# Todo lo demás (frases de varias intenciones, texto libre) va al modelo.
+# El enrutador adelanta al modelo, no lo corrige: solo entran al autómata las
+# frases que el modelo ya clasifica en su propia intención ("encuentra a" es
+# buscar_cliente_admin en la lista, pero el modelo lo lee como busqueda_producto
+# y "encuentra a maria" debe seguir siendo una búsqueda para clientes).
+
+_PALABRA_RE = re.compile(r"\w+")
+_ESTADO_PEDIDO_RE = re.compile(r"#?(\d+)\s(?:a|como)\s(\w+)")
+_COMPARACION_RE = re.compile(r"(.+)\s(?:con|y)\s(.+)")
+_DIRECCION_RE = re.compile(r"(?:a|es)\s(.+)")
+_DE_RE = re.compile(r"(?:de|del)\s")
+
+def _limpiar(texto):
+    # El guion blando (U+00AD) de algunas frases no separa palabras
+    return texto.lower().replace("\u00ad", "")
+
+def _producto(resto):
+    match = _DE_RE.match(resto)
+    return {"producto": resto[match.end():] if match else resto}
+
+def _grupos(expresion, nombres):
+    def extraer(resto):
+        match = expresion.match(resto)
+        return dict(zip(nombres, (g.strip() for g in match.groups()))) if match else {}
+    return extraer
+
+# Intenciones cuyo comando va seguido de un dato: resto del mensaje -> datos
+_DATOS = {
+    "busqueda_producto": lambda resto: {"producto": resto},
+    "prediccion_stock": _producto,
+    "stock_admin": _producto,
+    "comparar_productos": _grupos(_COMPARACION_RE, ("producto", "otro")),
+    "buscar_cliente_admin": lambda resto: {"cliente": resto},
+    "cambiar_estado_pedido": _grupos(_ESTADO_PEDIDO_RE, ("id_pedido", "estado")),
+    "actualizar_direccion": _grupos(_DIRECCION_RE, ("direccion",)),
+    "solicitar_devolucion": lambda resto: {"motivo": resto},
+}
+
+def _construir_automata(frases, intenciones):
+    """
+    Trie de palabras con enlaces de fallo. Devuelve, por nodo, {palabra: nodo},
+    el nodo de fallo y [(largo en palabras, intención)] de las frases que
+    terminan ahí (incluidas las que son sufijo de la ruta).
+    """
+    por_frase = {}
+    for frase, intencion in zip(frases, intenciones):
+        por_frase.setdefault(tuple(_PALABRA_RE.findall(_limpiar(frase))), set()).add(intencion)
+    hijos, salidas = [{}], [[]]
+    for palabras, posibles in por_frase.items():
+        if len(posibles) > 1:
+            continue  # la misma frase en dos intenciones: que decida el modelo
+        nodo = 0
+        for palabra in palabras:
+            if palabra not in hijos[nodo]:
+                hijos.append({})
+                salidas.append([])
+                hijos[nodo][palabra] = len(hijos) - 1
+            nodo = hijos[nodo][palabra]
+        salidas[nodo].append((len(palabras), next(iter(posibles))))
+
+    # Enlaces de fallo por niveles; cada nodo hereda las salidas de su fallo
+    fallo = [0] * len(hijos)
+    pendientes = deque(hijos[0].values())
+    while pendientes:
+        nodo = pendientes.popleft()
+        for palabra, hijo in hijos[nodo].items():
+            f = fallo[nodo]
+            while f and palabra not in hijos[f]:
+                f = fallo[f]
+            fallo[hijo] = hijos[f].get(palabra, 0) if nodo else 0
+            salidas[hijo] = salidas[hijo] + salidas[fallo[hijo]]
+            pendientes.append(hijo)
+    return hijos, fallo, salidas
+
+def _frases_enrutables():
+    """
+    (frases, intenciones) de entrenamiento en las que el modelo coincide con la lista.
+    """
+    pares = [(f, i) for f, i in zip(frases, intenciones) if _clasificar(_limpiar(f)) == i]
+    return [f for f, _ in pares], [i for _, i in pares]
+
+_hijos, _fallo, _salidas = _construir_automata(*_frases_enrutables())
+
+def _coincidencias(palabras):
+    """
+    [(palabra inicial, palabra final exclusiva, intención)] de todas las frases del mensaje.
+    """
+    encontradas, nodo = [], 0
+    for i, palabra in enumerate(palabras):
+        while nodo and palabra not in _hijos[nodo]:
+            nodo = _fallo[nodo]
+        nodo = _hijos[nodo].get(palabra, 0)
+        for largo, intencion in _salidas[nodo]:
+            encontradas.append((i + 1 - largo, i + 1, intencion))
+    return encontradas
+
+def enrutar(mensaje):
+    """
+    (intención, datos) si el mensaje es un comando conocido; None si debe
+    decidirlo el modelo.
+    """
+    texto = _limpiar(mensaje)
+    palabras = list(_PALABRA_RE.finditer(texto))
+    encontradas = _coincidencias([p.group() for p in palabras])
+    iniciales = [c for c in encontradas if c[0] == 0]
+    if not iniciales:
+        return None
+    _, fin, intencion = max(iniciales, key=lambda c: c[1])
+    if fin == len(palabras):
+        return intencion, {}
+    if intencion not in _DATOS or any(c[0] >= fin and c[2] != intencion for c in encontradas):
+        return None
+    resto = texto[palabras[fin - 1].end():].strip(" \t?!.,¿¡")
+    return intencion, _DATOS[intencion](resto)
+
+_lock_uso = threading.Lock()
+_uso = {"reglas": 0, "modelo": 0, "seg_enrutador": 0.0, "seg_modelo": 0.0}
+
+def _registrar_uso(via, seg_enrutador, seg_modelo=0.0):
+    nlp_enrutador.incrementar(via)
+    with _lock_uso:
+        _uso[via] += 1
+        _uso["seg_enrutador"] += seg_enrutador
+        _uso["seg_modelo"] += seg_modelo
+
+def interpretar(mensaje):
+    """
+    (intención, datos) del mensaje. Los comandos conocidos se resuelven con
+    el enrutador y traen los datos ya extraídos (p. ej. {"producto": "rtx 3060"});
+    el resto se clasifica con el modelo y trae {}. Los mensajes repetidos
+    (tras normalizar mayúsculas y espacios) se responden desde una caché LRU.
+    """
+    with nlp_segundos.medir():
+        clave = _normalizar(mensaje)
+        resultado = _cache.obtener(clave)
+        if resultado is None:
+            inicio = time.perf_counter()
+            resultado = enrutar(clave)
+            enrutado = time.perf_counter()
+            if resultado is not None:
+                _registrar_uso("reglas", enrutado - inicio)
+            else:
+                resultado = (_clasificar(clave), {})
+                _registrar_uso("modelo", enrutado - inicio, time.perf_counter() - enrutado)
+            _cache.guardar(clave, resultado)
+        return resultado[0], dict(resultado[1])
 
 def clasificar_intencion(mensaje):
     """
-    Clasifica el mensaje del usuario en una de las intenciones conocidas.
+    Clasifica el mensaje del usuario en una de las intenciones conocidas
+    (interpretar() sin los datos).
+    """
+    return interpretar(mensaje)[0]
+
+def clasificar_intenciones(mensajes):
+    """
+    Clasifica muchos mensajes y devuelve la lista de intenciones en el mismo
+    orden, igual que clasificar_intencion(): primero el enrutador y, los que
+    no resuelve, el modelo en una sola operación matricial. Los mensajes
+    repetidos se clasifican una sola vez. No usa ni modifica la caché LRU.
     """
-    X_new = vectorizer.transform([mensaje])
-    return modelo.predict(X_new)[0]
+    normalizados = [_normalizar(m) for m in mensajes]
+    por_mensaje = {}
+    unicos = []
+    for mensaje in dict.fromkeys(normalizados):
+        enrutado = enrutar(mensaje)
+        if enrutado is not None:
+            por_mensaje[mensaje] = enrutado[0]
+        else:
+            unicos.append(mensaje)
+
+    if unicos:
+        # Matriz de conteos (mensajes únicos x vocabulario)
+        filas, columnas = [], []
+        for i, mensaje in enumerate(unicos):
+            for t in _TOKEN_RE.findall(mensaje):
+                indice = _vocabulario.get(t)
+                if indice is not None:
+                    filas.append(i)
+                    columnas.append(indice)
+        conteos = np.zeros((len(unicos), _feature_log_prob.shape[1]))
+        np.add.at(conteos, (filas, columnas), 1)
+
+        log_prob = conteos @ _feature_log_prob.T + _class_log_prior
+        por_mensaje.update(zip(unicos, (_clases[i] for i in np.argmax(log_prob, axis=1))))
+    return [por_mensaje[m] for m in normalizados]
+
+def estadisticas_cache():
+    """
+    Aciertos, fallos y tamaño de la caché de intenciones.
+    """
+    return _cache.estadisticas()
+
+def estadisticas_enrutador():
+    """
+    Mensajes (no cacheados) resueltos por reglas y por el modelo, costo medio
+    de cada vía y tiempo ahorrado por mensaje: lo que habría costado el
+    modelo en los enrutados, menos lo que cuesta probar las reglas en todos.
+    """
+    with _lock_uso:
+        uso = dict(_uso)
+    total = uso["reglas"] + uso["modelo"]
+    enrutador_us = uso["seg_enrutador"] / total * 1e6 if total else 0.0
+    tasa = uso["reglas"] / total if total else 0.0
+    # Sin mensajes clasificados por el modelo todavía no se sabe cuánto cuesta
+    modelo_us = uso["seg_modelo"] / uso["modelo"] * 1e6 if uso["modelo"] else None
+    return {
+        "reglas": uso["reglas"],
+        "modelo": uso["modelo"],
+        "tasa_aciertos": round(tasa, 4),
+        "enrutador_us": round(enrutador_us, 2),
+        "modelo_us": round(modelo_us, 2) if modelo_us is not None else None,
+        "ahorro_us_por_mensaje": round(tasa * modelo_us - enrutador_us, 2) if modelo_us is not None else None,
+    }
+
+if __name__ == "__main__":
+    import sys
+    if "--build" in sys.argv:
+        construir_artefacto()
+    else:
+        print("Uso: python nlp_engine.py --build")
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+Despacho de avisos de reposición de stock (tabla notificaciones_stock, ver
+BD/migraciones/004_notificaciones_stock.sql).
+
+El chat guarda un aviso pendiente cuando un cliente pide que le avisen de un
+producto sin stock (solicitar_notificacion_db). En cada pasada:
+1. Reposiciones: productos cuyo stock cambió respecto de su marca
+   (notificaciones_stock_marca) y que pasaron de 0 a stock > 0. Un producto
+   inactivo cuenta como stock 0.
+2. Avisos pendientes de los productos repuestos: una consulta por cada
+   NOTIFICACIONES_LOTE avisos (paginando por id_notificacion), para todos
+   los productos a la vez. El mismo correo no se envía dos veces por producto.
+3. Envío por NOTIFICACIONES_SMTP_CONEXIONES conexiones SMTP simultáneas,
+   cada una reutilizada para muchos correos.
+4. Un UPDATE ... WHERE id_notificacion IN (...) por lote y estado; al final,
+   las marcas nuevas en un solo INSERT por lote.
+Un producto con miles de suscriptores cuesta unas pocas consultas por cada
+NOTIFICACIONES_LOTE avisos, no una o dos por aviso. Los avisos que fallan por
+un error temporal del servidor de correo quedan pendientes y la marca de su
+producto no avanza: se reintentan en la pasada siguiente. Un lock de MySQL
+evita que dos despachadores envíen los mismos correos.
+
+Uso (proceso aparte, o cron con --una-vez):
+    python notificaciones_stock.py
+    * * * * * cd /ruta/Chatbot && python notificaciones_stock.py --una-vez
+"""
+import argparse
+import json
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+
+import mysql.connector
+
+from conexiones import ConexionNoDisponible
+from config import (NOTIFICACIONES_INTERVALO_SEG, NOTIFICACIONES_LOTE, NOTIFICACIONES_SMTP_HOST,
+                    NOTIFICACIONES_SMTP_PUERTO, NOTIFICACIONES_SMTP_USUARIO, NOTIFICACIONES_SMTP_CLAVE,
+                    NOTIFICACIONES_SMTP_TLS, NOTIFICACIONES_REMITENTE, NOTIFICACIONES_SMTP_CONEXIONES)
+
+# Valores de notificaciones_stock.notificado
+PENDIENTE, NOTIFICADO, RECHAZADO = 0, 1, 2
+
+_ERROR_TABLA_INEXISTENTE = 1146  # ER_NO_SUCH_TABLE
+_NOMBRE_LOCK_MYSQL = "bitware_notificaciones_stock"
+URL_TIENDA = "https://bitware.site/catalogo.php"
+
+# ======================================================================
+# ENVÍO DE CORREOS
+# ======================================================================
+
+def crear_mensaje(email, nombre_producto):
+    mensaje = EmailMessage()
+    mensaje["From"] = NOTIFICACIONES_REMITENTE
+    mensaje["To"] = email
+    mensaje["Subject"] = f"¡{nombre_producto} volvió a estar disponible!"
+    mensaje.set_content(
+        f"Hola,\n\n"
+        f"Nos pediste que te avisáramos cuando '{nombre_producto}' volviera a tener stock: "
+        f"ya está disponible en Bitware.\n\n"
+        f"{URL_TIENDA}\n\n"
+        f"Este aviso se envía una sola vez.\n",
+        cte="quoted-printable")
+    return mensaje
+
+class EnviadorSMTP:
+    """
+    Envía correos con a lo sumo 'conexiones' conexiones SMTP a la vez: cada
+    hilo abre la suya la primera vez y la reutiliza. Usar con `with`.
+    """
+    def __init__(self, conexiones=NOTIFICACIONES_SMTP_CONEXIONES, host=NOTIFICACIONES_SMTP_HOST,
+                 puerto=NOTIFICACIONES_SMTP_PUERTO):
+        self.host, self.puerto = host, puerto
+        self.ultimo_error = None
+        self.sin_servidor = False
+        self._local = threading.local()
+        self._abiertas = set()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(conexiones, 1), thread_name_prefix="smtp")
+
+    def _conexion(self):
+        smtp = getattr(self._local, "smtp", None)
+        if smtp is None:
+            smtp = smtplib.SMTP(self.host, self.puerto, timeout=30)
+            if NOTIFICACIONES_SMTP_TLS:
+                smtp.starttls()
+            if NOTIFICACIONES_SMTP_USUARIO:
+                smtp.login(NOTIFICACIONES_SMTP_USUARIO, NOTIFICACIONES_SMTP_CLAVE)
+            self._local.smtp = smtp
+            with self._lock:
+                self._abiertas.add(smtp)
+        return smtp
+
+    def _descartar(self):
+        smtp, self._local.smtp = getattr(self._local, "smtp", None), None
+        if smtp is not None:
+            with self._lock:
+                self._abiertas.discard(smtp)
+            smtp.close()
+
+    def _enviar(self, mensaje):
+        if self.sin_servidor:
+            return PENDIENTE
+        try:
+            smtp = self._conexion()
+        except (smtplib.SMTPException, OSError) as e:
+            # No se pudo conectar: el resto de la pasada queda pendiente en vez de reintentar cada correo
+            self.ultimo_error = f"{type(e).__name__}: {e}"
+            self.sin_servidor = True
+            return PENDIENTE
+        try:
+            smtp.send_message(mensaje)
+            return NOTIFICADO
+        except smtplib.SMTPRecipientsRefused:
+            return RECHAZADO
+        except (smtplib.SMTPException, OSError) as e:
+            # Conexión caída o error temporal: se abre otra para el siguiente y este queda pendiente
+            self.ultimo_error = f"{type(e).__name__}: {e}"
+            self._descartar()
+            return PENDIENTE
+
+    def enviar(self, mensajes):
+        """
+        Estado (NOTIFICADO, RECHAZADO o PENDIENTE) de cada mensaje, en el mismo orden.
+        """
+        return list(self._pool.map(self._enviar, mensajes))
+
+    def cerrar(self):
+        self._pool.shutdown(wait=True)
+        with self._lock:
+            abiertas, self._abiertas = self._abiertas, set()
+        for smtp in abiertas:
+            try:
+                smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                smtp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+# ======================================================================
+# PASADA DEL DESPACHADOR
+# ======================================================================
+
+def _en_lotes(valores):
+    for i in range(0, len(valores), NOTIFICACIONES_LOTE):
+        yield valores[i:i + NOTIFICACIONES_LOTE]
+
+def _cambios_de_stock(cursor):
+    """
+    [(id_producto, nombre, stock, marca)] de los productos cuyo stock
+    (0 si está inactivo) difiere de la marca guardada.
+    """
+    cursor.execute("""
+        SELECT p.id_producto, p.nombre, IF(p.activo = 1, GREATEST(COALESCE(p.stock, 0), 0), 0) AS stock,
+               COALESCE(m.stock, 0) AS marca
+        FROM producto p
+        LEFT JOIN notificaciones_stock_marca m ON m.id_producto = p.id_producto
+        HAVING stock <> marca
+    """)
+    return cursor.fetchall()
+
+def _pendientes(cursor, productos):
+    """
+    Genera los avisos pendientes (id_notificacion, id_producto, email) de
+    esos productos, NOTIFICACIONES_LOTE por consulta.
+    """
+    marcadores = ", ".join(["%s"] * len(productos))
+    ultimo = 0
+    while True:
+        cursor.execute(f"""
+            SELECT id_notificacion, id_producto, email_usuario FROM notificaciones_stock
+            WHERE notificado = {PENDIENTE} AND id_producto IN ({marcadores}) AND id_notificacion > %s
+            ORDER BY id_notificacion LIMIT %s
+        """, (*productos, ultimo, NOTIFICACIONES_LOTE))
+        filas = cursor.fetchall()
+        if filas:
+            yield filas
+        if len(filas) < NOTIFICACIONES_LOTE:
+            return
+        ultimo = filas[-1][0]
+
+def _marcar(cursor, ids, estado):
+    for lote in _en_lotes(ids):
+        marcadores = ", ".join(["%s"] * len(lote))
+        cursor.execute(f"UPDATE notificaciones_stock SET notificado = %s WHERE id_notificacion IN ({marcadores})",
+                       (estado, *lote))
+
+def _guardar_marcas(cursor, marcas):
+    for lote in _en_lotes(marcas):
+        valores = ", ".join(["(%s, %s)"] * len(lote))
+        cursor.execute(f"INSERT INTO notificaciones_stock_marca (id_producto, stock) VALUES {valores} "
+                       "ON DUPLICATE KEY UPDATE stock = VALUES(stock)", [v for par in lote for v in par])
+
+def _despachar(conn, cursor, enviador):
+    cambios = _cambios_de_stock(cursor)
+    repuestos = {id_producto: nombre for id_producto, nombre, stock, marca in cambios if stock > 0 and marca <= 0}
+    resumen = {"cambios_de_stock": len(cambios), "reposiciones": len(repuestos), "avisos": 0, "correos": 0,
+               "enviados": 0, "rechazados": 0, "reintentar": 0}
+    estados = {}  # (id_producto, email) -> resultado del correo ya intentado en esta pasada
+    con_fallos = set()
+    for productos in _en_lotes(list(repuestos)):
+        for filas in _pendientes(cursor, productos):
+            claves = [(id_producto, email.strip().lower()) for _, id_producto, email in filas]
+            nuevos = {}
+            for (_, id_producto, email), clave in zip(filas, claves):
+                if clave not in estados and clave not in nuevos:
+                    nuevos[clave] = crear_mensaje(email.strip(), repuestos[id_producto])
+            estados.update(zip(nuevos, enviador.enviar(list(nuevos.values()))))
+            resumen["correos"] += len(nuevos)
+
+            por_estado = {NOTIFICADO: [], RECHAZADO: []}
+            for (id_notificacion, id_producto, _), clave in zip(filas, claves):
+                estado = estados[clave]
+                if estado == PENDIENTE:
+                    con_fallos.add(id_producto)
+                else:
+                    por_estado[estado].append(id_notificacion)
+            _marcar(cursor, por_estado[NOTIFICADO], NOTIFICADO)
+            _marcar(cursor, por_estado[RECHAZADO], RECHAZADO)
+            conn.commit()
+            resumen["avisos"] += len(filas)
+            resumen["enviados"] += len(por_estado[NOTIFICADO])
+            resumen["rechazados"] += len(por_estado[RECHAZADO])
+            resumen["reintentar"] += len(filas) - len(por_estado[NOTIFICADO]) - len(por_estado[RECHAZADO])
+
+    _guardar_marcas(cursor, [(id_producto, stock) for id_producto, _, stock, _ in cambios
+                             if id_producto not in con_fallos])
+    conn.commit()
+    return resumen
+
+def despachar():
+    """
+    Una pasada completa. Devuelve un resumen (reposiciones, avisos, correos
+    enviados, rechazados, a reintentar y segundos), o None si otro
+    despachador tiene el lock.
+    """
+    import database as db
+    inicio = time.perf_counter()
+    with db.conexion() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (_NOMBRE_LOCK_MYSQL,))
+        if not cursor.fetchone()[0]:
+            return None
+        try:
+            with EnviadorSMTP() as enviador:
+                resumen = _despachar(conn, cursor, enviador)
+            if enviador.ultimo_error:
+                resumen["ultimo_error"] = enviador.ultimo_error
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (_NOMBRE_LOCK_MYSQL,))
+            cursor.fetchone()
+    resumen["segundos"] = round(time.perf_counter() - inicio, 3)
+    return resumen
+
+def ejecutar(intervalo=NOTIFICACIONES_INTERVALO_SEG, una_vez=False):
+    """
+    Pasadas cada 'intervalo' segundos (o una sola). Devuelve el resumen de la última.
+    """
+    while True:
+        resumen = None
+        try:
+            resumen = despachar()
+            if resumen is None:
+                print("⏭️  Otro despachador de avisos de stock está trabajando.")
+            elif resumen["reposiciones"]:
+                print(f"📬 {resumen['reposiciones']} productos repuestos: {resumen['enviados']} avisos enviados, "
+                      f"{resumen['rechazados']} rechazados, {resumen['reintentar']} por reintentar "
+                      f"({resumen['segundos']:.1f} s)")
+                if resumen.get("ultimo_error"):
+                    print(f"⚠️  Último error del servidor de correo: {resumen['ultimo_error']}")
+        except mysql.connector.Error as e:
+            if e.errno == _ERROR_TABLA_INEXISTENTE:
+                print("❌  Falta la tabla notificaciones_stock_marca (BD/migraciones/004_notificaciones_stock.sql).")
+                return None
+            print(f"!!! ERROR despachando avisos de stock: {e}")
+        except ConexionNoDisponible as e:
+            print(f"!!! ERROR despachando avisos de stock: {e}")
+        if una_vez:
+            return resumen
+        time.sleep(intervalo)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Envía los avisos de reposición de stock pendientes.")
+    parser.add_argument("--una-vez", action="store_true", help="Hace una sola pasada y termina (para cron)")
+    parser.add_argument("--intervalo", type=int, default=NOTIFICACIONES_INTERVALO_SEG,
+                        help="Segundos entre pasadas (por defecto, NOTIFICACIONES_INTERVALO_SEG)")
+    parser.add_argument("--json", help="Con --una-vez, guarda el resumen de la pasada en este archivo")
+    args = parser.parse_args()
+
+    print(f"--- Despachador de avisos de stock (SMTP {NOTIFICACIONES_SMTP_HOST}:{NOTIFICACIONES_SMTP_PUERTO}, "
+          f"{NOTIFICACIONES_SMTP_CONEXIONES} conexiones) ---")
+    resultado = ejecutar(args.intervalo, una_vez=args.una_vez)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
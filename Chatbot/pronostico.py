@@ -0,0 +1,207 @@
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from config import (PREDICCION_DIAS_WARM_START, PREDICCION_MIN_DIAS, PREDICCION_MOTOR,
+                    PREDICCION_AUTO_DIAS_HOLT_WINTERS, PREDICCION_AUTO_DIAS_SARIMAX)
+from metricas import prediccion_segundos
+
+# ======================================================================
+# PRONÓSTICO DE DEMANDA (sin acceso a BD)
+# ======================================================================
+# Funciones puras sobre las ventas diarias de un producto. No tocan la
+# base de datos, así se pueden ejecutar en procesos hijos (lotes y worker).
+
+DIAS_PRONOSTICO = 30
+ESTACIONALIDAD = 7  # semanal
+MENSAJE_DATOS_INSUFICIENTES = ("Datos insuficientes para la predicción (se necesitan al menos "
+                               f"{PREDICCION_MIN_DIAS} días de ventas).")
+
+# ======================================================================
+# MOTORES DE PRONÓSTICO
+# ======================================================================
+# Todos reciben la serie diaria como array de NumPy y devuelven
+# (pronóstico de 'pasos' días, parámetros ajustados). Los parámetros se
+# guardan en el almacén y vuelven como start_params en el siguiente ajuste.
+
+class MotorSarimax:
+    """SARIMAX((1,1,1),(1,1,1,7)) de statsmodels. Preciso pero costoso."""
+    nombre = "sarimax"
+
+    def ajustar_y_pronosticar(self, valores, pasos, start_params=None):
+        # Importación diferida: statsmodels solo se carga si se usa este motor
+        from statsmodels.tsa.statespace.sarimax import SARIMAX
+        warnings.filterwarnings("ignore")
+
+        model = SARIMAX(valores,
+                        order=(1, 1, 1),
+                        seasonal_order=(1, 1, 1, ESTACIONALIDAD),
+                        enforce_stationarity=False,
+                        enforce_invertibility=False)
+
+        # Warm start: partimos de los parámetros del ajuste anterior si son compatibles
+        with prediccion_segundos.medir("ajuste", self.nombre):
+            if start_params is not None and len(start_params) == model.k_params:
+                model_fit = model.fit(start_params=start_params, disp=False)
+            else:
+                model_fit = model.fit(disp=False)
+        with prediccion_segundos.medir("pronostico", self.nombre):
+            return np.asarray(model_fit.forecast(steps=pasos)), [float(p) for p in model_fit.params]
+
+class MotorHoltWinters:
+    """
+    Holt-Winters aditivo con tendencia amortiguada y estacionalidad semanal.
+    Los parámetros (alpha, beta, gamma) se eligen por búsqueda en rejilla:
+    todas las combinaciones se evalúan a la vez, vectorizadas en NumPy, con
+    una sola pasada sobre la serie.
+    """
+    nombre = "holt_winters"
+    PHI = 0.98  # amortiguación de la tendencia (evita que se dispare a 30 días)
+
+    def __init__(self):
+        a, b, g = np.meshgrid(np.linspace(0.05, 0.95, 10),
+                              np.array([0.0, 0.02, 0.05, 0.1, 0.2]),
+                              np.linspace(0.05, 0.6, 6), indexing='ij')
+        self._alphas, self._betas, self._gammas = a.ravel(), b.ravel(), g.ravel()
+
+    def _filtrar(self, valores, alphas, betas, gammas):
+        m, phi = ESTACIONALIDAD, self.PHI
+        k = len(alphas)
+        nivel = np.full(k, valores[:m].mean())
+        tendencia = np.full(k, (valores[m:2 * m].mean() - valores[:m].mean()) / m if len(valores) >= 2 * m else 0.0)
+        estacion = np.tile(valores[:m] - valores[:m].mean(), (k, 1))
+        sse = np.zeros(k)
+        for t, y in enumerate(valores):
+            i = t % m
+            error = y - (nivel + phi * tendencia + estacion[:, i])
+            if t >= m:
+                sse += error * error
+            nuevo_nivel = alphas * (y - estacion[:, i]) + (1 - alphas) * (nivel + phi * tendencia)
+            tendencia = betas * (nuevo_nivel - nivel) + (1 - betas) * phi * tendencia
+            estacion[:, i] = gammas * (y - nuevo_nivel) + (1 - gammas) * estacion[:, i]
+            nivel = nuevo_nivel
+        return nivel, tendencia, estacion, sse
+
+    def ajustar_y_pronosticar(self, valores, pasos, start_params=None):
+        valores = np.asarray(valores, dtype=float)
+        with prediccion_segundos.medir("ajuste", self.nombre):
+            nivel, tendencia, estacion, sse = self._filtrar(valores, self._alphas, self._betas, self._gammas)
+            mejor = int(np.argmin(sse))
+
+        with prediccion_segundos.medir("pronostico", self.nombre):
+            h = np.arange(1, pasos + 1)
+            amortiguada = np.cumsum(self.PHI ** h)
+            indices = (len(valores) + h - 1) % ESTACIONALIDAD
+            pronostico = nivel[mejor] + amortiguada * tendencia[mejor] + estacion[mejor, indices]
+        params = [float(self._alphas[mejor]), float(self._betas[mejor]), float(self._gammas[mejor])]
+        return pronostico, params
+
+class MotorNaiveEstacional:
+    """
+    Naive estacional: cada día de la semana se pronostica con el promedio de
+    ese mismo día en las últimas semanas. Forma cerrada, sin ajuste.
+    """
+    nombre = "naive_estacional"
+    SEMANAS = 4
+
+    def ajustar_y_pronosticar(self, valores, pasos, start_params=None):
+        with prediccion_segundos.medir("pronostico", self.nombre):
+            return self._pronosticar(np.asarray(valores, dtype=float), pasos), []
+
+    def _pronosticar(self, valores, pasos):
+        m = ESTACIONALIDAD
+        semanas = max(1, min(self.SEMANAS, len(valores) // m))
+        ventana = valores[-semanas * m:]
+        # perfil[j] = promedio del día (len(valores) - semanas*m + j) de cada semana
+        perfil = ventana.reshape(semanas, m).mean(axis=0) if len(ventana) == semanas * m else np.full(m, ventana.mean())
+        return perfil[np.arange(pasos) % m]
+
+MOTORES = {motor.nombre: motor for motor in (MotorSarimax(), MotorHoltWinters(), MotorNaiveEstacional())}
+MOTOR_AUTO = "auto"
+
+def motor_valido(nombre):
+    return nombre is None or nombre == MOTOR_AUTO or nombre in MOTORES
+
+def elegir_motor(nombre, dias_con_ventas):
+    """
+    Resuelve el motor a usar. En modo 'auto' decide por la cantidad de días
+    con ventas: series cortas/dispersas usan los motores ligeros.
+    """
+    nombre = nombre or PREDICCION_MOTOR
+    if nombre != MOTOR_AUTO:
+        return MOTORES[nombre]
+    if dias_con_ventas < PREDICCION_AUTO_DIAS_HOLT_WINTERS:
+        return MOTORES["naive_estacional"]
+    if dias_con_ventas < PREDICCION_AUTO_DIAS_SARIMAX:
+        return MOTORES["holt_winters"]
+    return MOTORES["sarimax"]
+
+# ======================================================================
+# PREPARACIÓN Y FORMATO
+# ======================================================================
+
+def preparar_serie(sales_data):
+    """
+    Convierte las ventas agrupadas por día en una serie diaria continua
+    (los días sin ventas quedan en 0).
+    """
+    sales_data['dia'] = pd.to_datetime(sales_data['dia'])
+    sales_data = sales_data.set_index('dia')
+    sales_data['total_vendido'] = pd.to_numeric(sales_data['total_vendido'])
+    return sales_data.resample('D').sum().fillna(0).astype(float)
+
+def formatear_pronostico(df_resampled, forecast, motor):
+    forecast_dates = pd.date_range(start=df_resampled.index.max() + pd.Timedelta(days=1), periods=DIAS_PRONOSTICO).strftime('%Y-%m-%d').tolist()
+    forecast_values = [round(val) if val > 0 else 0 for val in np.asarray(forecast).tolist()]
+
+    return {
+        "success": True,
+        "forecast_labels": forecast_dates,
+        "forecast_data": forecast_values,
+        "total_forecast": sum(forecast_values),
+        "motor": motor
+    }
+
+def params_warm_start(entrada, ultimo_dia, motor):
+    """
+    Devuelve los parámetros guardados si la serie solo avanzó unos pocos días
+    desde el último ajuste con el mismo motor; en otro caso None (ajuste desde cero).
+    """
+    if not entrada or not entrada.get("params") or not entrada.get("ultimo_dia"):
+        return None
+    if entrada["resultado"].get("motor", "sarimax") != motor:
+        return None
+    dias_nuevos = (ultimo_dia - pd.Timestamp(entrada["ultimo_dia"])).days
+    if 0 <= dias_nuevos <= PREDICCION_DIAS_WARM_START:
+        return entrada["params"]
+    return None
+
+def pronosticar_ventas(sales_data, entrada=None, motor=None):
+    """
+    Ajusta el modelo sobre las ventas diarias (columnas 'dia', 'total_vendido')
+    y devuelve un dict con:
+    - resultado: la respuesta de /predict_demand.
+    - params, ultimo_dia, segundos: datos del ajuste para el almacén (None si
+      no hubo ajuste por falta de datos).
+    """
+    if sales_data.empty or len(sales_data) < PREDICCION_MIN_DIAS:
+        return {"resultado": {"success": False, "error": MENSAJE_DATOS_INSUFICIENTES},
+                "params": None, "ultimo_dia": None, "segundos": None}
+
+    motor = elegir_motor(motor, len(sales_data))
+    with prediccion_segundos.medir("remuestreo", motor.nombre):
+        df_resampled = preparar_serie(sales_data)
+    ultimo_dia = df_resampled.index.max()
+
+    # Ajuste (con warm start si solo llegaron pocos días nuevos)
+    inicio = time.perf_counter()
+    forecast, params = motor.ajustar_y_pronosticar(df_resampled['total_vendido'].to_numpy(), DIAS_PRONOSTICO,
+                                                   start_params=params_warm_start(entrada, ultimo_dia, motor.nombre))
+    return {
+        "resultado": formatear_pronostico(df_resampled, forecast, motor.nombre),
+        "params": params,
+        "ultimo_dia": ultimo_dia.strftime('%Y-%m-%d'),
+        "segundos": round(time.perf_counter() - inicio, 3)
+    }
@@ -0,0 +1,213 @@
+import threading
+import time
+
+import numpy as np
+
+from config import (RECOMENDACIONES, RECOMENDACIONES_REFRESCO_SEG, RECOMENDACIONES_VECINOS,
+                    RECOMENDACIONES_HISTORIAL)
+
+# ======================================================================
+# RECOMENDACIONES DE PRODUCTOS
+# ======================================================================
+# Reemplaza el ORDER BY RAND() de la intención 'producto'. Cada
+# RECOMENDACIONES_REFRESCO_SEG se precalcula, en un hilo aparte:
+# - vecinos: para cada producto, los RECOMENDACIONES_VECINOS productos que
+#   más se compran en el mismo pedido (similitud coseno de co-compras).
+#   Matrices (n_productos x K) de índices y puntajes.
+# - historial: productos comprados o marcados como favoritos por cada
+#   usuario, del más reciente al más antiguo (formato CSR: usuarios
+#   ordenados, inicio de cada uno y productos en un solo array).
+# - popularidad: nº de favoritos + 1, acumulada para muestrear.
+# Por petición:
+# - con userId: se suman los vecinos de sus últimos
+#   RECOMENDACIONES_HISTORIAL productos (los recientes pesan más), se
+#   descartan los que ya tiene y los sin stock, y se toma el top-N;
+# - invitado o sin historial: muestra ponderada por popularidad.
+# El costo depende de K y del historial, no del tamaño del catálogo.
+
+_modelo = None
+_ultimo_refresco = 0.0
+_lock = threading.Lock()
+_rng = np.random.default_rng()
+
+class _Modelo:
+    def __init__(self, ids, filas, disponible, vecinos, puntajes, usuarios, inicio, historial, acumulada):
+        self.ids, self.filas, self.disponible = ids, filas, disponible
+        self.vecinos, self.puntajes = vecinos, puntajes
+        self.usuarios, self.inicio, self.historial = usuarios, inicio, historial
+        self.acumulada = acumulada  # popularidad acumulada de los productos disponibles
+        self.indices_disponibles = np.flatnonzero(disponible)
+
+# ======================================================================
+# CARGA (en segundo plano)
+# ======================================================================
+
+def _top_k_por_fila(filas, columnas, puntajes, n, k):
+    """
+    De pares (fila, columna, puntaje) deja, por fila, los k de mayor puntaje.
+    Devuelve matrices (n x k) de columnas (-1 = vacío) y puntajes.
+    """
+    orden = np.lexsort((-puntajes, filas))
+    filas, columnas, puntajes = filas[orden], columnas[orden], puntajes[orden]
+    rango = np.arange(len(filas)) - np.searchsorted(filas, filas)  # posición dentro de su fila
+    dentro = rango < k
+    vecinos = np.full((n, k), -1, dtype=np.int32)
+    mejores = np.zeros((n, k), dtype=np.float32)
+    vecinos[filas[dentro], rango[dentro]] = columnas[dentro]
+    mejores[filas[dentro], rango[dentro]] = puntajes[dentro]
+    return vecinos, mejores
+
+def _cargar(cursor):
+    cursor.execute("SELECT id_producto, nombre, precio, imagen_principal, "
+                   "(stock > 0 AND activo = 1 AND imagen_principal IS NOT NULL) AS disponible "
+                   "FROM producto ORDER BY id_producto")
+    productos = cursor.fetchall()
+    ids = np.array([p["id_producto"] for p in productos], dtype=np.int64)
+    filas = [{"id": p["id_producto"], "nombre": p["nombre"],
+              "precio": float(p["precio"]) if p["precio"] is not None else None,
+              "imagen_principal": p["imagen_principal"]} for p in productos]
+    disponible = np.array([bool(p["disponible"]) for p in productos], dtype=bool)
+    n = len(ids)
+
+    def indices(valores):
+        # id_producto -> índice en ids (todos existen: las FK apuntan a producto)
+        return np.searchsorted(ids, np.asarray(valores, dtype=np.int64))
+
+    # --- Co-compras: similitud coseno entre productos del mismo pedido ---
+    cursor.execute("""
+        SELECT pp.id_producto, COUNT(DISTINCT pp.id_pedido) AS pedidos
+        FROM pedidos_productos pp JOIN pedidos p ON p.id_pedido = pp.id_pedido
+        WHERE p.estado IN ('Pagado', 'Enviado', 'Entregado')
+        GROUP BY pp.id_producto
+    """)
+    compras = np.zeros(n)
+    filas_compras = cursor.fetchall()
+    if filas_compras:
+        compras[indices([f["id_producto"] for f in filas_compras])] = [f["pedidos"] for f in filas_compras]
+    cursor.execute("""
+        SELECT a.id_producto AS a, b.id_producto AS b, COUNT(DISTINCT a.id_pedido) AS juntos
+        FROM pedidos_productos a
+        JOIN pedidos_productos b ON b.id_pedido = a.id_pedido AND b.id_producto <> a.id_producto
+        JOIN pedidos p ON p.id_pedido = a.id_pedido
+        WHERE p.estado IN ('Pagado', 'Enviado', 'Entregado')
+        GROUP BY a.id_producto, b.id_producto
+    """)
+    pares = cursor.fetchall()
+    a = indices([f["a"] for f in pares])
+    b = indices([f["b"] for f in pares])
+    juntos = np.array([f["juntos"] for f in pares], dtype=float)
+    coseno = juntos / np.sqrt(compras[a] * compras[b]) if len(pares) else juntos
+    vecinos, puntajes = _top_k_por_fila(a, b, coseno, n, RECOMENDACIONES_VECINOS)
+
+    # --- Historial por usuario: compras y favoritos, el más reciente primero ---
+    cursor.execute("""
+        SELECT p.id_usuario, pp.id_producto, UNIX_TIMESTAMP(MAX(p.fecha_pedido)) AS instante
+        FROM pedidos p JOIN pedidos_productos pp ON pp.id_pedido = p.id_pedido
+        WHERE p.estado IN ('Pagado', 'Enviado', 'Entregado')
+        GROUP BY p.id_usuario, pp.id_producto
+    """)
+    interacciones = cursor.fetchall()
+    # Los favoritos no tienen fecha: cuentan como lo más reciente (el id ordena entre ellos)
+    cursor.execute("SELECT id_usuario, id_producto, id_favorito FROM favoritos")
+    favoritos = cursor.fetchall()
+    usuarios_int = np.array([f["id_usuario"] for f in interacciones] + [f["id_usuario"] for f in favoritos],
+                            dtype=np.int64)
+    productos_int = indices([f["id_producto"] for f in interacciones] + [f["id_producto"] for f in favoritos])
+    instantes = np.array([float(f["instante"] or 0) for f in interacciones] +
+                         [1e12 + f["id_favorito"] for f in favoritos])
+    orden = np.lexsort((-instantes, usuarios_int))
+    usuarios_int, productos_int = usuarios_int[orden], productos_int[orden].astype(np.int32)
+    usuarios, inicio = np.unique(usuarios_int, return_index=True)
+    inicio = np.append(inicio, len(usuarios_int))
+
+    # --- Popularidad (favoritos + 1) de los productos disponibles ---
+    popularidad = np.ones(n)
+    if favoritos:
+        np.add.at(popularidad, indices([f["id_producto"] for f in favoritos]), 1)
+    acumulada = np.cumsum(popularidad[disponible])
+
+    return _Modelo(ids, filas, disponible, vecinos, puntajes, usuarios, inicio, productos_int, acumulada)
+
+def _refrescar():
+    global _modelo, _ultimo_refresco
+    import database as db
+    inicio = time.perf_counter()
+    try:
+        with db.conexion() as conn:
+            _modelo = _cargar(conn.cursor(dictionary=True))
+        print(f"✅  Recomendaciones listas: {len(_modelo.ids)} productos, {len(_modelo.usuarios)} usuarios "
+              f"({time.perf_counter() - inicio:.2f}s)")
+    except Exception as e:
+        print(f"!!! ERROR cargando el modelo de recomendaciones: {e}")
+    finally:
+        _ultimo_refresco = time.monotonic()
+        _lock.release()
+
+def _modelo_vigente():
+    """
+    El modelo actual (None si aún no hay). La primera carga la hace el hilo
+    que la dispara; las siguientes, un hilo aparte mientras se usa el actual.
+    """
+    if not RECOMENDACIONES:
+        return None
+    transcurrido = time.monotonic() - _ultimo_refresco
+    if _modelo is None:
+        # Primera carga (o reintento tras un fallo); mientras tanto, los demás hilos reciben None
+        if transcurrido > RECOMENDACIONES_REFRESCO_SEG / 10 and _lock.acquire(blocking=False):
+            _refrescar()
+    elif transcurrido > RECOMENDACIONES_REFRESCO_SEG and _lock.acquire(blocking=False):
+        threading.Thread(target=_refrescar, name="recomendaciones", daemon=True).start()
+    return _modelo
+
+# ======================================================================
+# CONSULTA
+# ======================================================================
+
+def _populares(modelo, limite, excluir=()):
+    if not len(modelo.acumulada):
+        return []
+    sorteo = np.searchsorted(modelo.acumulada, _rng.random(limite * 3) * modelo.acumulada[-1], side="right")
+    elegidos = []
+    for i in modelo.indices_disponibles[np.minimum(sorteo, len(modelo.acumulada) - 1)]:
+        if i not in elegidos and i not in excluir:
+            elegidos.append(int(i))
+            if len(elegidos) == limite:
+                break
+    return elegidos
+
+def _personalizados(modelo, id_usuario, limite):
+    try:
+        u = np.searchsorted(modelo.usuarios, int(id_usuario))
+    except (TypeError, ValueError):
+        return [], ()
+    if u >= len(modelo.usuarios) or modelo.usuarios[u] != int(id_usuario):
+        return [], ()
+    propios = modelo.historial[modelo.inicio[u]:modelo.inicio[u + 1]]
+    recientes = propios[:RECOMENDACIONES_HISTORIAL]
+    pesos = 1.0 / (1.0 + np.arange(len(recientes)))  # lo reciente pesa más
+    candidatos = modelo.vecinos[recientes].ravel()
+    puntajes = (modelo.puntajes[recientes] * pesos[:, None]).ravel()
+    validos = candidatos >= 0
+    candidatos, puntajes = candidatos[validos], puntajes[validos]
+    if not len(candidatos):
+        return [], propios
+    unicos, posiciones = np.unique(candidatos, return_inverse=True)
+    totales = np.bincount(posiciones, weights=puntajes)
+    totales[~modelo.disponible[unicos] | np.isin(unicos, propios)] = 0
+    orden = np.argsort(-totales)[:limite]
+    return [int(unicos[i]) for i in orden if totales[i] > 0], propios
+
+def recomendar(id_usuario=None, limite=3):
+    """
+    Hasta 'limite' productos con stock ({id, nombre, precio, imagen_principal})
+    para el usuario, o None si el modelo no está disponible.
+    """
+    modelo = _modelo_vigente()
+    if modelo is None:
+        return None
+    elegidos, propios = _personalizados(modelo, id_usuario, limite) if id_usuario else ([], ())
+    if len(elegidos) < limite:
+        # Invitado, sin historial o pocos vecinos: se completa con los populares
+        excluir = set(elegidos) | {int(i) for i in propios}
+        elegidos += _populares(modelo, limite - len(elegidos), excluir)
+    return [dict(modelo.filas[i]) for i in elegidos]
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Aplicaciones WSGI para el servidor de producción (gunicorn.conf.py).
+
+- app_chat: la aplicación de app.py, salvo las rutas de RUTAS_LARGAS, que se
+  reenvían al pool de tareas largas (SERVIDOR_URL_LARGO). El hilo del pool
+  de chat solo espera la respuesta: el ajuste del modelo corre en otro
+  proceso y no compite por el GIL con los mensajes del chat.
+- app_largo: la aplicación de app.py tal cual.
+
+La intención prediccion_stock del chat también pide el pronóstico a
+/predict_demand del pool largo (manejadores._pronostico).
+
+Si el pool largo no está escuchando, la petición se atiende en el mismo proceso.
+"""
+import http.client
+import io
+from urllib.parse import urlsplit
+
+from config import SERVIDOR_URL_LARGO
+import app as app_flask
+
+RUTAS_LARGAS = ("/predict_demand",)  # incluye /predict_demand/batch
+TIMEOUT_LARGO = 300
+
+# Cabeceras que describen la conexión, no el contenido: no se reenvían
+_SALTO_A_SALTO = {"connection", "keep-alive", "transfer-encoding", "te", "trailer", "upgrade",
+                  "proxy-authenticate", "proxy-authorization"}
+
+def _cabeceras_entrada(environ):
+    cabeceras = {}
+    for clave, valor in environ.items():
+        if clave.startswith("HTTP_"):
+            nombre = clave[5:].replace("_", "-").lower()
+            if nombre not in _SALTO_A_SALTO and nombre != "host":
+                cabeceras[nombre] = valor
+    for clave in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+        if environ.get(clave):
+            cabeceras[clave.replace("_", "-").lower()] = environ[clave]
+    return cabeceras
+
+def reenviar_largas(app_wsgi, url_base):
+    """
+    Envuelve app_wsgi: las rutas de RUTAS_LARGAS se piden a url_base.
+    """
+    destino = urlsplit(url_base)
+
+    def aplicacion(environ, start_response):
+        ruta = environ.get("PATH_INFO", "")
+        if not ruta.startswith(RUTAS_LARGAS):
+            return app_wsgi(environ, start_response)
+        largo = int(environ.get("CONTENT_LENGTH") or 0)
+        cuerpo = environ["wsgi.input"].read(largo) if largo else b""
+        if environ.get("QUERY_STRING"):
+            ruta = f"{ruta}?{environ['QUERY_STRING']}"
+        conexion = http.client.HTTPConnection(destino.hostname, destino.port, timeout=TIMEOUT_LARGO)
+        try:
+            conexion.request(environ["REQUEST_METHOD"], ruta, body=cuerpo, headers=_cabeceras_entrada(environ))
+            respuesta = conexion.getresponse()
+            contenido = respuesta.read()
+        except ConnectionRefusedError as e:
+            print(f"⚠️  Pool de tareas largas no disponible ({e}); atendiendo {ruta} en este proceso.")
+            environ["wsgi.input"] = io.BytesIO(cuerpo)
+            return app_wsgi(environ, start_response)
+        finally:
+            conexion.close()
+        cabeceras = [(k, v) for k, v in respuesta.getheaders() if k.lower() not in _SALTO_A_SALTO]
+        start_response(f"{respuesta.status} {respuesta.reason}", cabeceras)
+        return [contenido]
+
+    return aplicacion
+
+app_largo = app_flask.app
+app_chat = reenviar_largas(app_flask.app, SERVIDOR_URL_LARGO) if SERVIDOR_URL_LARGO else app_flask.app
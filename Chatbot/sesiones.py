@@ -0,0 +1,60 @@
+from cache_lru import CacheLRU
+from config import SESIONES_CACHE_MAX, SESIONES_CACHE_TTL
+
+# ======================================================================
+# CONTEXTO DE SESIÓN POR USUARIO
+# ======================================================================
+# /chat no tiene estado: el PHP reenvía userId en cada mensaje y las
+# intenciones repiten las mismas consultas del mismo usuario. Aquí se
+# guardan, por userId y con caducidad SESIONES_CACHE_TTL, los datos que se
+# consultan una y otra vez:
+# - "ultimo_pedido": último pedido del cliente (o None si no tiene).
+# - "devolucion":    respuesta de elegibilidad para devoluciones.
+# - "vendedor":      contadores de productos y ventas del vendedor.
+# Cada campo es una CacheLRU propia, así su tasa de aciertos se mide por
+# separado. Las escrituras hechas por el bot invalidan al usuario afectado;
+# las hechas desde la web se ven al caducar la entrada.
+
+CAMPOS = ("ultimo_pedido", "devolucion", "vendedor")
+AUSENTE = object()
+
+_caches = {campo: CacheLRU(SESIONES_CACHE_MAX, ttl=SESIONES_CACHE_TTL) for campo in CAMPOS}
+
+def habilitado():
+    return SESIONES_CACHE_TTL > 0
+
+def _clave(id_usuario):
+    try:
+        return int(id_usuario)
+    except (TypeError, ValueError):
+        return None  # invitado: no se guarda nada
+
+def obtener(campo, id_usuario, defecto=None):
+    clave = _clave(id_usuario)
+    if clave is None or not habilitado():
+        return defecto
+    return _caches[campo].obtener(clave, defecto)
+
+def contiene(campo, id_usuario):
+    clave = _clave(id_usuario)
+    return clave is not None and habilitado() and _caches[campo].contiene(clave)
+
+def guardar(campo, id_usuario, valor):
+    clave = _clave(id_usuario)
+    if clave is not None and habilitado():
+        _caches[campo].guardar(clave, valor)
+
+def invalidar(id_usuario, campos=CAMPOS):
+    """
+    Descarta los campos indicados (todos por defecto) de un usuario.
+    """
+    clave = _clave(id_usuario)
+    if clave is None: return
+    for campo in campos:
+        _caches[campo].invalidar(clave)
+
+def estadisticas():
+    """
+    {campo: {entradas, aciertos, fallos, tasa_aciertos, ...}}
+    """
+    return {campo: cache.estadisticas() for campo, cache in _caches.items()}
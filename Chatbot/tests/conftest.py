@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los módulos del chatbot se importan desde Chatbot/, igual que en los scripts de benchmarks/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
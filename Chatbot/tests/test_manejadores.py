@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Respuestas del chat por rol e intención (manejadores.py) frente a la cadena
+if/elif de responder_chat que reemplazó. tests/datos/despacho_if_elif.json
+guarda lo que respondía esa cadena (app.py anterior a manejadores.py) para
+cada rol (A, V, U e invitado), una o más frases por intención, con los datos
+que extrae nlp.interpretar y sin ellos (respaldo con expresiones). Las
+funciones de database.py y la cola de exportaciones se reemplazan por las
+respuestas fijas de benchmarks/bench_despacho.py.
+
+Regenerar (solo si cambia la cadena de referencia, no para aceptar un cambio de manejadores.py):
+    python tests/test_manejadores.py --regenerar [--revision REV]
+"""
+import json
+import os
+import random
+import sys
+
+import pytest
+
+DIR_TESTS = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(DIR_TESTS), os.path.join(os.path.dirname(DIR_TESTS), "benchmarks")]
+import app  # noqa: E402
+import bench_despacho  # noqa: E402
+import database as db  # noqa: E402
+import manejadores  # noqa: E402
+import nlp_engine as nlp  # noqa: E402
+import trabajos_exportacion as exportaciones  # noqa: E402
+
+ARCHIVO_BASE = os.path.join(DIR_TESTS, "datos", "despacho_if_elif.json")
+
+# Al menos una frase por intención; algunas extra activan reglas por palabra ("ayuda", "ventas")
+# o variantes dentro del manejador ("total usuarios", "buscar producto")
+FRASES = [
+    ("saludo", "hola"),
+    ("producto", "recomiéndame algo"),
+    ("pedido", "mi pedido"),
+    ("soporte", "soporte"),
+    ("soporte", "necesito ayuda con mis ventas"),
+    ("funciones", "funciones"),
+    ("busqueda_producto", "busca rtx 3060"),
+    ("busqueda_producto", "buscar producto"),
+    ("solicitar_devolucion", "quiero devolver mi pedido"),
+    ("solicitar_notificacion", "cuando vuelve a estar disponible la rtx 4090"),
+    ("comparar_productos", "compara rtx 3060 con rx 6600"),
+    ("actualizar_direccion", "actualizar mi dirección a calle falsa 123"),
+    ("horarios", "horarios de atención"),
+    ("pagos", "métodos de pago"),
+    ("stats_admin", "estadísticas"),
+    ("stats_admin", "total usuarios"),
+    ("stats_admin", "reporte de ventas hoy"),
+    ("stock_admin", "stock de ram ddr5"),
+    ("stock_admin", "mis productos"),
+    ("buscar_cliente_admin", "busca al cliente juan"),
+    ("cambiar_estado_pedido", "actualiza el pedido 105 a enviado"),
+    ("analisis_admin", "análisis de crecimiento"),
+    ("prediccion_stock", "predice el stock de rtx 3060"),
+    ("exportar_ventas", "exportar ventas"),
+]
+
+def casos():
+    """
+    [(rol, intención, datos, petición)]: cada frase con los datos de nlp.interpretar y con {}.
+    """
+    resultado = []
+    for intencion, mensaje in FRASES:
+        clasificada, extraidos = nlp.interpretar(mensaje)
+        variantes = [{}] + ([extraidos] if clasificada == intencion and extraidos else [])
+        for rol, usuario in bench_despacho.USUARIOS.items():
+            for datos in variantes:
+                resultado.append((rol, intencion, datos, dict(usuario, message=mensaje)))
+    return resultado
+
+def _responder(responder_chat, intencion, datos, peticion):
+    # La intención va fija: se prueba el despacho, no el clasificador
+    original = nlp.interpretar
+    nlp.interpretar = lambda mensaje: (intencion, dict(datos))
+    try:
+        random.seed(0)
+        return responder_chat(peticion)[0]
+    finally:
+        nlp.interpretar = original
+
+@pytest.fixture
+def dependencias_fijas(monkeypatch):
+    for nombre, falso in bench_despacho.FALSOS.items():
+        monkeypatch.setattr(db, nombre, falso)
+    monkeypatch.setattr(exportaciones, "encolar_exportacion",
+                        lambda id_usuario, base_url, es_admin=False: f"trabajo{id_usuario}{es_admin}")
+    monkeypatch.setattr(manejadores, "SERVIDOR_URL_LARGO", "")
+
+def _base():
+    with open(ARCHIVO_BASE, encoding="utf-8") as f:
+        return {(c["rol"], c["intencion"], c["mensaje"], json.dumps(c["datos"], sort_keys=True)): c["respuesta"]
+                for c in json.load(f)}
+
+def test_la_base_cubre_todas_las_intenciones():
+    cubiertas = {(rol, intencion) for rol, intencion, _, _ in _base()}
+    assert cubiertas == {(rol, i) for rol in bench_despacho.USUARIOS for i in set(nlp.intenciones)}
+
+@pytest.mark.parametrize("rol, intencion, datos, peticion", [
+    pytest.param(*caso, id=f"{caso[0]}-{caso[3]['message']}-{'con' if caso[2] else 'sin'} datos") for caso in casos()])
+def test_misma_respuesta_que_la_cadena_if_elif(dependencias_fijas, rol, intencion, datos, peticion):
+    esperada = _base()[(rol, intencion, peticion["message"], json.dumps(datos, sort_keys=True))]
+    assert _responder(app.responder_chat, intencion, datos, peticion) == esperada
+
+def regenerar(revision):
+    anterior = bench_despacho.cargar_app(revision)
+    todos = casos()  # con el clasificador real, antes de reemplazarlo
+    bench_despacho.reemplazar_dependencias()  # reemplaza database y la cola en el proceso
+    base = [{"rol": rol, "intencion": intencion, "mensaje": peticion["message"], "datos": datos,
+             "respuesta": _responder(anterior.responder_chat, intencion, datos, peticion)}
+            for rol, intencion, datos, peticion in todos]
+    with open(ARCHIVO_BASE, "w", encoding="utf-8") as f:
+        json.dump(base, f, ensure_ascii=False, indent=1, default=str)
+    print(f"{len(base)} respuestas de {revision} guardadas en {ARCHIVO_BASE}")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--regenerar", action="store_true", required=True)
+    parser.add_argument("--revision", help="Revisión con la cadena if/elif (por defecto, la anterior a manejadores.py)")
+    args = parser.parse_args()
+    regenerar(args.revision or bench_despacho.revision_anterior())
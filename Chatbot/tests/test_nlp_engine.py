@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""
+El enrutador de comandos (nlp_engine.enrutar) no debe contradecir al modelo.
+"""
+import pytest
+
+import nlp_engine as nlp
+
+@pytest.mark.parametrize("frase", sorted(set(nlp.frases)))
+def test_enrutador_coincide_con_el_modelo(frase):
+    for mensaje in (nlp._normalizar(frase), nlp._limpiar(frase)):
+        enrutado = nlp.enrutar(mensaje)
+        if enrutado is not None:
+            assert enrutado[0] == nlp._clasificar(mensaje), mensaje
+
+@pytest.mark.parametrize("mensaje", ["encuentra a maria", "encuentra a juan pérez"])
+def test_encuentra_a_sigue_siendo_busqueda(mensaje):
+    # Antes del enrutador el modelo lo clasificaba como búsqueda de producto
+    assert nlp.clasificar_intencion(mensaje) == "busqueda_producto"
+    assert nlp.clasificar_intenciones([mensaje]) == ["busqueda_producto"]
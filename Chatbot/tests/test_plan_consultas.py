@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Planes de ejecución de las consultas del chatbot (benchmarks/plan_consultas.py):
+ninguna consulta nueva puede recorrer una tabla completa ni usar filesort
+salvo las de PERMITIDOS. La revisión de planes necesita MySQL (el usuario de
+.env debe poder crear bases de datos); sin servidor se omite.
+
+    python -m pytest Chatbot/tests/test_plan_consultas.py
+    PLAN_CONSULTAS_PEDIDOS=200000 python -m pytest Chatbot/tests/test_plan_consultas.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+import mysql.connector  # noqa: E402
+import plan_consultas  # noqa: E402
+from config import DB_HOST, DB_USER, DB_PASS  # noqa: E402
+
+BD_PRUEBA = "bitware_planes_pytest"
+PEDIDOS = int(os.getenv("PLAN_CONSULTAS_PEDIDOS", "20000"))
+
+def _consultas():
+    return [c for archivo in plan_consultas.ARCHIVOS
+            for c in plan_consultas.extraer_consultas(os.path.join(plan_consultas.DIR_CHATBOT, archivo))]
+
+def test_permitidos_apuntan_a_consultas_existentes():
+    # Una entrada que ya no coincide con nada escondería una función renombrada
+    consultas = _consultas()
+    for (funcion, fragmento), motivo in plan_consultas.PERMITIDOS.items():
+        propias = [c for c in consultas if f"{c['archivo']}:{c['funcion']}" == funcion]
+        assert propias, f"{funcion} no tiene consultas ({motivo})"
+        assert fragmento is None or any(fragmento in c["sql"] for c in propias), (funcion, fragmento)
+
+@pytest.fixture(scope="module")
+def conexion_prueba():
+    try:
+        conn = mysql.connector.connect(host=DB_HOST, user=DB_USER, password=DB_PASS, connection_timeout=3)
+    except mysql.connector.Error as e:
+        pytest.skip(f"MySQL no disponible: {e}")
+    try:
+        plan_consultas.crear_base(conn, BD_PRUEBA, PEDIDOS)
+        yield conn
+    finally:
+        conn.cursor().execute(f"DROP DATABASE IF EXISTS `{BD_PRUEBA}`")
+        conn.close()
+
+def test_sin_escaneos_completos_ni_filesort(conexion_prueba):
+    resultados = plan_consultas.revisar(conexion_prueba.cursor(), _consultas())
+    fallas = [f"{r['archivo']}:{r['funcion']}:{r['linea']} {'; '.join(r['problemas'])}"
+              for r in resultados if r["estado"] == "FALLA"]
+    assert not fallas, "\n".join(fallas)
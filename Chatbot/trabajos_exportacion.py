@@ -0,0 +1,204 @@
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.request import Request, urlopen
+
+from config import (EXPORT_DIR, EXPORT_WORKERS, EXPORT_MAX_HORAS, EXPORT_MAX_MB, EXPORT_TRABAJOS_TTL,
+                    EXPORT_TRABAJOS_DIR, EXPORT_EN_PROCESOS, SERVIDOR_URL_LARGO)
+import database as db
+
+# ======================================================================
+# COLA DE EXPORTACIONES A EXCEL
+# ======================================================================
+# El chat encola la exportación y responde al instante con un ID de trabajo.
+# El Excel se genera en un pool de hilos; el estado se consulta en
+# /export_status/<job_id>. Pedidos repetidos del mismo alcance (mismo
+# vendedor, o el reporte global) se unen al trabajo que ya está en curso.
+# El estado de cada trabajo se escribe también en EXPORT_TRABAJOS_DIR: con
+# varios procesos (gunicorn.conf.py) la consulta de estado puede caer en un
+# proceso distinto del que genera el Excel. Si SERVIDOR_URL_LARGO está
+# definido, el trabajo se encola en el pool de tareas largas. Con
+# EXPORT_EN_PROCESOS el hilo del trabajo solo espera: el Excel se escribe en
+# un proceso aparte ('spawn', como worker_predicciones.py).
+
+_pool = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="exportacion")
+_pool_procesos = None
+_trabajos = {}
+_activos = {}  # alcance -> job_id de un trabajo en cola o en proceso
+_lock = threading.Lock()
+
+ESTADOS_FINALES = ("listo", "vacio", "error")
+
+def _alcance(id_vendedor, es_admin):
+    return "global" if es_admin else f"vendedor_{id_vendedor}"
+
+def _ruta(job_id):
+    return os.path.join(EXPORT_TRABAJOS_DIR, f"{job_id}.json")
+
+def _persistir(job_id):
+    # Se llama con _lock tomado. Escritura atómica, igual que en cache_predicciones
+    fd, tmp = tempfile.mkstemp(dir=EXPORT_TRABAJOS_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(_trabajos[job_id], f)
+        os.replace(tmp, _ruta(job_id))
+    except OSError as e:
+        print(f"!!! ERROR guardando estado del trabajo {job_id}: {e}")
+        if os.path.exists(tmp): os.remove(tmp)
+
+def _actualizar(job_id, **cambios):
+    with _lock:
+        _trabajos[job_id].update(cambios)
+        _persistir(job_id)
+
+def _purgar_trabajos_viejos():
+    # Se llama con _lock tomado
+    limite = time.time() - EXPORT_TRABAJOS_TTL
+    for job_id in [j for j, t in _trabajos.items() if t["estado"] in ESTADOS_FINALES and t["terminado"] < limite]:
+        del _trabajos[job_id]
+    # Archivos de trabajos de cualquier proceso (incluso de uno que ya terminó)
+    for nombre in os.listdir(EXPORT_TRABAJOS_DIR):
+        ruta = os.path.join(EXPORT_TRABAJOS_DIR, nombre)
+        try:
+            if os.stat(ruta).st_mtime < limite:
+                os.remove(ruta)
+        except FileNotFoundError:
+            pass
+
+def _generar_en_proceso(id_vendedor, base_url, es_admin):
+    global _pool_procesos
+    with _lock:
+        if _pool_procesos is None:
+            _pool_procesos = ProcessPoolExecutor(max_workers=EXPORT_WORKERS,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+    # El progreso de otro proceso no llega aquí: el trabajo pasa de 0 a 100
+    return _pool_procesos.submit(db.generar_excel_ventas, id_vendedor, base_url, es_admin).result()
+
+def _ejecutar(job_id, id_vendedor, base_url, es_admin):
+    _actualizar(job_id, estado="procesando")
+    try:
+        if EXPORT_EN_PROCESOS:
+            url = _generar_en_proceso(id_vendedor, base_url, es_admin)
+        else:
+            url = db.generar_excel_ventas(id_vendedor, base_url, es_admin=es_admin,
+                                          progreso=lambda p: _actualizar(job_id, progreso=p))
+        if url == "empty":
+            _actualizar(job_id, estado="vacio", progreso=100)
+        elif url:
+            _actualizar(job_id, estado="listo", progreso=100, url=url)
+        else:
+            _actualizar(job_id, estado="error")
+    except Exception as e:
+        print(f"!!! ERROR en trabajo de exportación {job_id}: {e}")
+        _actualizar(job_id, estado="error")
+    finally:
+        with _lock:
+            _trabajos[job_id]["terminado"] = time.time()
+            _persistir(job_id)
+            if _activos.get(_trabajos[job_id]["alcance"]) == job_id:
+                del _activos[_trabajos[job_id]["alcance"]]
+        limpiar_exportes()
+
+def encolar_exportacion(id_vendedor, base_url, es_admin=False):
+    """
+    Encola la exportación y devuelve el job_id. Si ya hay un trabajo en curso
+    para el mismo alcance, devuelve el de ese trabajo.
+    """
+    if SERVIDOR_URL_LARGO:
+        job_id = _encolar_en_pool_largo(id_vendedor, base_url, es_admin)
+        if job_id:
+            return job_id
+    return encolar_en_este_proceso(id_vendedor, base_url, es_admin)
+
+def encolar_en_este_proceso(id_vendedor, base_url, es_admin=False):
+    """
+    Como encolar_exportacion, pero sin derivar al pool de tareas largas
+    (lo usa /export_jobs, que es quien recibe lo derivado).
+    """
+    alcance = _alcance(id_vendedor, es_admin)
+    with _lock:
+        _purgar_trabajos_viejos()
+        if alcance in _activos:
+            return _activos[alcance]
+        job_id = uuid.uuid4().hex
+        _trabajos[job_id] = {"estado": "en_cola", "progreso": 0, "url": None, "alcance": alcance,
+                             "creado": time.time(), "terminado": None}
+        _activos[alcance] = job_id
+        _persistir(job_id)
+    _pool.submit(_ejecutar, job_id, id_vendedor, base_url, es_admin)
+    return job_id
+
+def _encolar_en_pool_largo(id_vendedor, base_url, es_admin):
+    # Si el pool de tareas largas no responde, el Excel se genera en este proceso
+    cuerpo = json.dumps({"id_vendedor": id_vendedor, "base_url": base_url, "es_admin": es_admin}).encode("utf-8")
+    peticion = Request(f"{SERVIDOR_URL_LARGO}/export_jobs", data=cuerpo,
+                       headers={"Content-Type": "application/json"})
+    try:
+        with urlopen(peticion, timeout=5) as respuesta:
+            return json.load(respuesta)["job_id"]
+    except Exception as e:
+        print(f"⚠️  No se pudo encolar la exportación en {SERVIDOR_URL_LARGO}: {e}")
+        return None
+
+def estado_trabajo(job_id):
+    """
+    Devuelve {job_id, estado, progreso, url} o None si el trabajo no existe.
+    estado: 'en_cola', 'procesando', 'listo', 'vacio' o 'error'.
+    """
+    with _lock:
+        trabajo = dict(_trabajos.get(job_id) or {})
+    if not trabajo and job_id.isalnum():
+        # Trabajo de otro proceso
+        try:
+            with open(_ruta(job_id), encoding="utf-8") as f:
+                trabajo = json.load(f)
+        except (OSError, ValueError):
+            pass
+    if not trabajo:
+        return None
+    return {"job_id": job_id, "estado": trabajo["estado"],
+            "progreso": trabajo["progreso"], "url": trabajo["url"]}
+
+# ======================================================================
+# LIMPIEZA DE static/exports
+# ======================================================================
+
+def limpiar_exportes(max_horas=EXPORT_MAX_HORAS, max_mb=EXPORT_MAX_MB):
+    """
+    Borra los .xlsx de EXPORT_DIR más antiguos que max_horas y, si aun así
+    superan max_mb en total, los más antiguos hasta quedar bajo el límite.
+    Los archivos de los últimos 5 minutos no se tocan (pueden estar en uso).
+    """
+    ahora = time.time()
+    archivos = []
+    for nombre in os.listdir(EXPORT_DIR):
+        if not nombre.endswith('.xlsx'):
+            continue
+        ruta = os.path.join(EXPORT_DIR, nombre)
+        try:
+            info = os.stat(ruta)
+        except FileNotFoundError:
+            continue
+        archivos.append((info.st_mtime, info.st_size, ruta))
+    archivos.sort()
+
+    total = sum(tamano for _, tamano, _ in archivos)
+    borrados = 0
+    for mtime, tamano, ruta in archivos:
+        if ahora - mtime < 300:
+            break
+        if ahora - mtime > max_horas * 3600 or total > max_mb * 1024 * 1024:
+            try:
+                os.remove(ruta)
+                total -= tamano
+                borrados += 1
+            except FileNotFoundError:
+                pass
+    if borrados:
+        print(f"🧹 Exportaciones antiguas eliminadas: {borrados}")
+    return borrados
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Resumen diario de ventas (tablas ventas_diarias*, ver
+BD/migraciones/002_ventas_diarias.sql).
+
+Las ventas pagadas, enviadas o entregadas se agregan por día en tres tablas:
+- ventas_diarias:          (día, producto, región) -> unidades, ingresos, líneas
+- ventas_diarias_vendedor: (día, vendedor)         -> pedidos, unidades, ingresos
+- ventas_diarias_tienda:   (día)                   -> pedidos, total (pedidos.total)
+El pronóstico, las estadísticas del vendedor, las ventas de hoy y el análisis
+por categoría leen de ellas: su costo depende del nº de días, no de líneas.
+
+Refresco incremental (cada VENTAS_DIARIAS_REFRESCO_SEG, en un hilo aparte
+que lanza disponible(); las peticiones nunca lo esperan): se recalculan los
+días de los pedidos nuevos (id_pedido mayor que la marca de agua guardada) y
+los últimos VENTAS_DIARIAS_DIAS_RECALCULO días, que es donde ocurren los
+cambios de estado hechos desde la web. Los cambios de estado del chat
+recalculan su día enseguida, también en segundo plano (recalcular_pedido).
+
+Uso (cron, ej. todas las noches, para capturar cambios en pedidos antiguos):
+    0 4 * * * cd /ruta/Chatbot && python ventas_diarias.py --reconstruir
+    python ventas_diarias.py --dias 30
+"""
+import argparse
+import threading
+import time
+
+import mysql.connector
+
+from config import VENTAS_DIARIAS, VENTAS_DIARIAS_REFRESCO_SEG, VENTAS_DIARIAS_DIAS_RECALCULO
+from conexiones import si_no_hay_conexion
+
+_ESTADOS_SQL = "('Pagado', 'Enviado', 'Entregado')"
+_ERROR_TABLA_INEXISTENTE = 1146  # ER_NO_SUCH_TABLE
+_NOMBRE_LOCK_MYSQL = "bitware_ventas_diarias"
+_DIAS_POR_LOTE = 31
+
+_lock = threading.Lock()
+_ultimo_refresco = 0.0
+_disponible = None  # None: aún no se sabe si existen las tablas
+
+# ======================================================================
+# RECÁLCULO POR DÍAS
+# ======================================================================
+
+def _recalcular_dias(conn, dias):
+    """
+    Reemplaza las filas de los días indicados con el agregado actual de
+    pedidos. Cada lote de días va en su propia transacción: los lectores ven
+    el resumen anterior hasta el commit.
+    """
+    cursor = conn.cursor()
+    dias = sorted(dias)
+    for i in range(0, len(dias), _DIAS_POR_LOTE):
+        lote = tuple(dias[i:i + _DIAS_POR_LOTE])
+        marcadores = ", ".join(["%s"] * len(lote))
+        for tabla in ("ventas_diarias", "ventas_diarias_vendedor", "ventas_diarias_tienda"):
+            cursor.execute(f"DELETE FROM {tabla} WHERE dia IN ({marcadores})", lote)
+        cursor.execute(f"""
+            INSERT INTO ventas_diarias (dia, id_producto, region, id_vendedor, categoria, unidades, ingresos, lineas)
+            SELECT p.fecha_pedido, pp.id_producto, COALESCE(u.region, ''), MAX(pr.id_vendedor), MAX(pr.categoria),
+                   SUM(pp.cantidad), SUM(pp.cantidad * pp.precio_unitario), COUNT(*)
+            FROM pedidos p
+            JOIN pedidos_productos pp ON pp.id_pedido = p.id_pedido
+            LEFT JOIN producto pr ON pr.id_producto = pp.id_producto
+            LEFT JOIN usuario u ON u.id_usuario = p.id_usuario
+            WHERE p.fecha_pedido IN ({marcadores}) AND p.estado IN {_ESTADOS_SQL}
+            GROUP BY p.fecha_pedido, pp.id_producto, COALESCE(u.region, '')
+        """, lote)
+        cursor.execute(f"""
+            INSERT INTO ventas_diarias_vendedor (dia, id_vendedor, pedidos, unidades, ingresos)
+            SELECT p.fecha_pedido, pr.id_vendedor, COUNT(DISTINCT p.id_pedido),
+                   SUM(pp.cantidad), SUM(pp.cantidad * pp.precio_unitario)
+            FROM pedidos p
+            JOIN pedidos_productos pp ON pp.id_pedido = p.id_pedido
+            JOIN producto pr ON pr.id_producto = pp.id_producto
+            WHERE p.fecha_pedido IN ({marcadores}) AND p.estado IN {_ESTADOS_SQL}
+              AND pr.id_vendedor IS NOT NULL
+            GROUP BY p.fecha_pedido, pr.id_vendedor
+        """, lote)
+        cursor.execute(f"""
+            INSERT INTO ventas_diarias_tienda (dia, pedidos, total)
+            SELECT fecha_pedido, COUNT(*), SUM(total)
+            FROM pedidos
+            WHERE fecha_pedido IN ({marcadores}) AND estado IN {_ESTADOS_SQL}
+            GROUP BY fecha_pedido
+        """, lote)
+        conn.commit()
+
+def _actualizar(conn, dias_extra=None, todos=False, dias_recalculo=None, espera=0):
+    """
+    Recalcula los días afectados y avanza la marca de agua. Devuelve el
+    nº de días recalculados. Un lock de MySQL evita que dos procesos
+    refresquen a la vez; si otro lo tiene por más de 'espera' segundos,
+    no se hace nada (se sigue usando lo ya calculado).
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT GET_LOCK(%s, %s)", (_NOMBRE_LOCK_MYSQL, espera))
+    if not cursor.fetchone()[0]:
+        return 0
+    try:
+        cursor.execute("SELECT ultimo_id_pedido FROM ventas_diarias_estado WHERE id = 1")
+        fila = cursor.fetchone()
+        marca = fila[0] if fila else 0
+        cursor.execute("SELECT COALESCE(MAX(id_pedido), 0) FROM pedidos")
+        nueva_marca = cursor.fetchone()[0]
+
+        if todos:
+            cursor.execute("SELECT DISTINCT fecha_pedido FROM pedidos WHERE fecha_pedido IS NOT NULL")
+        else:
+            # Días con pedidos nuevos + ventana reciente (cambios de estado)
+            cursor.execute("""
+                SELECT DISTINCT fecha_pedido FROM pedidos
+                WHERE id_pedido > %s AND fecha_pedido IS NOT NULL
+                UNION
+                SELECT DISTINCT fecha_pedido FROM pedidos
+                WHERE fecha_pedido >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
+            """, (marca, dias_recalculo or VENTAS_DIARIAS_DIAS_RECALCULO))
+        dias = {f[0] for f in cursor.fetchall()} | set(dias_extra or ())
+        _recalcular_dias(conn, dias)
+
+        cursor.execute("""
+            INSERT INTO ventas_diarias_estado (id, ultimo_id_pedido, actualizado_en) VALUES (1, %s, NOW())
+            ON DUPLICATE KEY UPDATE ultimo_id_pedido = VALUES(ultimo_id_pedido), actualizado_en = NOW()
+        """, (nueva_marca,))
+        conn.commit()
+        return len(dias)
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (_NOMBRE_LOCK_MYSQL,))
+        cursor.fetchone()
+
+@si_no_hay_conexion(False)
+def _refrescar(todos=False, dias_recalculo=None):
+    """
+    Pone al día el resumen. Se llama con _lock tomado y lo deja tomado.
+    Devuelve True si las tablas existen y se pudieron actualizar.
+    """
+    global _ultimo_refresco, _disponible
+    import database as db
+    try:
+        with db.conexion() as conn:
+            _actualizar(conn, todos=todos, dias_recalculo=dias_recalculo)
+        _disponible = True
+        return True
+    except mysql.connector.Error as e:
+        if e.errno == _ERROR_TABLA_INEXISTENTE:
+            print("⚠️  Faltan las tablas ventas_diarias (BD/migraciones/002_ventas_diarias.sql): "
+                  "se consultarán los pedidos directamente.")
+            _disponible = False
+        else:
+            print(f"!!! ERROR refrescando ventas_diarias: {e}")
+        return False
+    finally:
+        _ultimo_refresco = time.monotonic()
+
+def _refrescar_en_fondo():
+    try:
+        _refrescar()
+    finally:
+        _lock.release()
+
+def refrescar(todos=False, dias_recalculo=None):
+    """
+    Pone al día el resumen ahora, esperando a un refresco en curso (CLI y
+    cron). Devuelve True si las tablas existen y se pudieron actualizar.
+    """
+    if not VENTAS_DIARIAS:
+        return False
+    with _lock:
+        return _refrescar(todos=todos, dias_recalculo=dias_recalculo)
+
+def disponible():
+    """
+    True si se puede leer el resumen. No consulta la BD: si el resumen tiene
+    más de VENTAS_DIARIAS_REFRESCO_SEG, lanza el refresco en un hilo aparte
+    y se sigue leyendo lo ya calculado. Mientras no se sepa si existen las
+    tablas (primer refresco en curso o fallido) se consultan los pedidos.
+    """
+    if not VENTAS_DIARIAS or _disponible is False:
+        return False
+    # Sin resumen aún, se reintenta antes (como la primera carga de recomendaciones)
+    espera = VENTAS_DIARIAS_REFRESCO_SEG if _disponible else VENTAS_DIARIAS_REFRESCO_SEG / 10
+    if time.monotonic() - _ultimo_refresco > espera and _lock.acquire(blocking=False):
+        threading.Thread(target=_refrescar_en_fondo, name="ventas_diarias", daemon=True).start()
+    return _disponible is True
+
+@si_no_hay_conexion(None)
+def _recalcular_pedido(id_pedido):
+    import database as db
+    with db.conexion() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT fecha_pedido FROM pedidos WHERE id_pedido = %s", (id_pedido,))
+            fila = cursor.fetchone()
+            if fila and fila[0]:
+                with _lock:
+                    # Aquí sí se espera al lock: el cambio no debe perderse
+                    _actualizar(conn, dias_extra=[fila[0]], espera=30)
+                db.invalidar_metricas_admin()  # las ventas de hoy salen de ventas_diarias_tienda
+        except mysql.connector.Error as e:
+            print(f"!!! ERROR recalculando ventas_diarias del pedido {id_pedido}: {e}")
+
+def recalcular_pedido(id_pedido):
+    """
+    Recalcula el día de un pedido (tras cambiar su estado desde el chat), en
+    un hilo aparte: la respuesta no espera al recálculo ni a los locks.
+    """
+    if not VENTAS_DIARIAS or _disponible is False:
+        return
+    threading.Thread(target=_recalcular_pedido, args=(id_pedido,), name="ventas_diarias_pedido",
+                     daemon=True).start()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Actualiza el resumen diario de ventas.")
+    parser.add_argument("--reconstruir", action="store_true", help="Recalcula todos los días")
+    parser.add_argument("--dias", type=int, default=None,
+                        help="Recalcula además los últimos N días (por defecto, VENTAS_DIARIAS_DIAS_RECALCULO)")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    if refrescar(todos=args.reconstruir, dias_recalculo=args.dias):
+        print(f"✅  Resumen diario de ventas actualizado en {time.perf_counter() - inicio:.1f} s")
+    else:
+        print("❌  No se pudo actualizar el resumen diario de ventas.")
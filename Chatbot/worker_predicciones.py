@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Precálculo de pronósticos de demanda en segundo plano.
+
+Recorre los productos activos con suficientes días de ventas y ejecuta
+get_prediction_data en paralelo (un proceso por núcleo). Los resultados
+quedan en el almacén de pronósticos (cache_predicciones), que es el mismo
+que leen /predict_demand y la intención 'prediccion_stock' del chat.
+
+Uso (cron, ej. todas las noches a las 03:00):
+    0 3 * * * cd /ruta/Chatbot && python worker_predicciones.py
+    python worker_predicciones.py --productos 12 14 --forzar
+"""
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config import (PREDICCION_MIN_DIAS, PREDICCION_WORKERS_REVALIDACION, PREDICCION_WORKERS_LOTE,
+                    PREDICCION_STALE_WHILE_REVALIDATE)
+from conexiones import si_no_hay_conexion
+
+# Los procesos hijos se crean con 'spawn': cada uno abre sus propias
+# conexiones en vez de heredar sockets del proceso padre.
+_CONTEXTO_MP = multiprocessing.get_context('spawn')
+_lock = threading.Lock()
+
+# ======================================================================
+# TAREA POR PRODUCTO (se ejecuta en el proceso hijo)
+# ======================================================================
+
+def precalcular_producto(id_producto, forzar=False, motor=None):
+    """
+    Calcula y guarda el pronóstico de un producto. Devuelve un resumen con
+    el tiempo empleado.
+    """
+    import database as db
+    inicio = time.perf_counter()
+    resultado = db.calcular_prediccion(id_producto, forzar=forzar, motor=motor)
+    return {
+        "id_producto": id_producto,
+        "success": resultado.get("success", False),
+        "error": resultado.get("error"),
+        "segundos": round(time.perf_counter() - inicio, 3)
+    }
+
+# ======================================================================
+# LOTE NOCTURNO
+# ======================================================================
+
+@si_no_hay_conexion(list)
+def productos_elegibles():
+    """
+    IDs de productos activos con al menos PREDICCION_MIN_DIAS días de ventas
+    pagadas en los últimos 6 meses (la misma ventana que usa el modelo).
+    """
+    import database as db
+    import ventas_diarias
+    resumen = ventas_diarias.refrescar()  # el lote sí espera al resumen al día
+    with db.conexion() as conn:
+        cursor = conn.cursor()
+        if resumen:
+            query = """
+                SELECT vd.id_producto
+                FROM ventas_diarias vd
+                JOIN producto pr ON pr.id_producto = vd.id_producto
+                WHERE pr.activo = 1 AND vd.dia >= DATE_SUB(NOW(), INTERVAL 6 MONTH)
+                GROUP BY vd.id_producto
+                HAVING COUNT(DISTINCT vd.dia) >= %s
+            """
+            cursor.execute(query, (PREDICCION_MIN_DIAS,))
+            return [fila[0] for fila in cursor.fetchall()]
+        query = """
+            SELECT pr.id_producto
+            FROM producto pr
+            JOIN pedidos_productos pp ON pp.id_producto = pr.id_producto
+            JOIN pedidos p ON p.id_pedido = pp.id_pedido
+            WHERE pr.activo = 1
+              AND p.estado IN ('Pagado', 'Enviado', 'Entregado')
+              AND p.fecha_pedido >= DATE_SUB(NOW(), INTERVAL 6 MONTH)
+            GROUP BY pr.id_producto
+            HAVING COUNT(DISTINCT DATE(p.fecha_pedido)) >= %s
+        """
+        cursor.execute(query, (PREDICCION_MIN_DIAS,))
+        return [fila[0] for fila in cursor.fetchall()]
+
+def ejecutar_lote(ids_productos, workers=None, forzar=False, motor=None):
+    """
+    Precalcula los pronósticos de todos los productos indicados en paralelo.
+    Imprime el tiempo de ajuste de cada producto y devuelve los resúmenes.
+    """
+    workers = workers or os.cpu_count() or 1
+    resumenes = []
+    inicio = time.perf_counter()
+    print(f"--- Precalculando {len(ids_productos)} productos con {workers} procesos ---")
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_CONTEXTO_MP) as pool:
+        futuros = {pool.submit(precalcular_producto, pid, forzar, motor): pid for pid in ids_productos}
+        for futuro in as_completed(futuros):
+            try:
+                r = futuro.result()
+            except Exception as e:
+                r = {"id_producto": futuros[futuro], "success": False, "error": str(e), "segundos": None}
+            resumenes.append(r)
+            estado = "✅" if r["success"] else f"❌ {r['error']}"
+            print(f"  Producto {r['id_producto']}: {r['segundos']} s {estado}")
+
+    ok = sum(1 for r in resumenes if r["success"])
+    print(f"--- Listo: {ok}/{len(resumenes)} pronósticos en {time.perf_counter() - inicio:.1f} s ---")
+    return resumenes
+
+# ======================================================================
+# AJUSTES EN PARALELO PARA /predict_demand/batch Y EL MODO ASGI
+# ======================================================================
+
+_pool_lote = None
+
+def _pool_procesos():
+    global _pool_lote
+    with _lock:
+        if _pool_lote is None:
+            _pool_lote = ProcessPoolExecutor(max_workers=PREDICCION_WORKERS_LOTE or os.cpu_count() or 1,
+                                             mp_context=_CONTEXTO_MP)
+        return _pool_lote
+
+def _ajustar_ventas(ventas, entrada, motor):
+    import pronostico
+    return pronostico.pronosticar_ventas(ventas, entrada, motor)
+
+def ajustar_en_paralelo(trabajos, motor=None):
+    """
+    Ajusta varios productos en el pool de procesos a partir de sus ventas ya
+    consultadas. trabajos: {id_producto: (DataFrame de ventas, entrada guardada)}.
+    Genera (id_producto, ajuste) a medida que terminan; si un ajuste falla,
+    el dict trae 'error_ajuste'.
+    """
+    pool = _pool_procesos()
+    futuros = {pool.submit(_ajustar_ventas, ventas, entrada, motor): pid
+               for pid, (ventas, entrada) in trabajos.items()}
+    for futuro in as_completed(futuros):
+        try:
+            yield futuros[futuro], futuro.result()
+        except Exception as e:
+            yield futuros[futuro], {"error_ajuste": str(e)}
+
+def _pronosticar(id_producto, motor):
+    import database as db
+    return db.get_prediction_data(id_producto, motor)
+
+def predecir_en_proceso(id_producto, motor=None):
+    """
+    Como database.get_prediction_data, pero un ajuste en línea corre en el
+    pool de procesos: el hilo que llama solo espera el resultado, sin
+    retener el GIL (lo usa /predict_demand en asgi.py).
+    """
+    if PREDICCION_STALE_WHILE_REVALIDATE:
+        # Nunca ajusta en línea: lee la caché y encola la revalidación
+        import database as db
+        return db.get_prediction_data(id_producto, motor)
+    return _pool_procesos().submit(_pronosticar, id_producto, motor).result()
+
+# ======================================================================
+# REVALIDACIÓN EN SEGUNDO PLANO (stale-while-revalidate)
+# ======================================================================
+
+_revalidador = None
+_en_curso = set()
+
+def revalidar_en_segundo_plano(id_producto, motor=None):
+    """
+    Encola el recálculo de un producto sin bloquear al llamador. Si el
+    producto ya se está recalculando, no se encola de nuevo.
+    """
+    global _revalidador
+    with _lock:
+        clave = (id_producto, motor)
+        if clave in _en_curso:
+            return
+        if _revalidador is None:
+            _revalidador = ProcessPoolExecutor(max_workers=PREDICCION_WORKERS_REVALIDACION,
+                                               mp_context=_CONTEXTO_MP)
+        _en_curso.add(clave)
+        futuro = _revalidador.submit(precalcular_producto, id_producto, False, motor)
+
+    def _terminado(f):
+        with _lock:
+            _en_curso.discard(clave)
+        if f.exception():
+            print(f"!!! ERROR revalidando pronóstico del producto {id_producto}: {f.exception()}")
+
+    futuro.add_done_callback(_terminado)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precalcula los pronósticos de demanda de los productos activos.")
+    parser.add_argument("--productos", type=int, nargs="*", help="IDs concretos (por defecto, todos los elegibles)")
+    parser.add_argument("--workers", type=int, default=None, help="Número de procesos (por defecto, uno por núcleo)")
+    parser.add_argument("--forzar", action="store_true", help="Reajusta aunque las ventas no hayan cambiado")
+    parser.add_argument("--motor", default=None, help="Motor de pronóstico (por defecto, PREDICCION_MOTOR)")
+    args = parser.parse_args()
+
+    ids = args.productos or productos_elegibles()
+    if not ids:
+        print("No hay productos con ventas suficientes para pronosticar.")
+    else:
+        ejecutar_lote(ids, workers=args.workers, forzar=args.forzar, motor=args.motor)
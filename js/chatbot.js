@@ -149,6 +149,11 @@ document.addEventListener('DOMContentLoaded', () => {
             if (data.productos && data.productos.length > 0) {
                 displayProducts(data.productos);
             }
+
+            // 3. Exportación en segundo plano: consultamos su estado hasta que termine
+            if (data.exportacion) {
+                pollExportStatus(data.exportacion.status_url);
+            }
         })
         .catch(error => {
             removeTypingIndicator();
@@ -157,6 +162,27 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     };
 
+    // --- 8b. Seguimiento de exportaciones a Excel (cola en segundo plano) ---
+    const pollExportStatus = (statusUrl, intentos = 0) => {
+        fetch(statusUrl)
+        .then(response => response.json())
+        .then(estado => {
+            if (estado.estado === 'listo') {
+                displayMessage(`✅ ¡Listo! Tu reporte está disponible.<br><br>👉 <a href='${estado.url}' target='_blank' style='color: #0d6efd; font-weight: bold;'>Descargar Excel</a>`, 'bot');
+            } else if (estado.estado === 'vacio') {
+                displayMessage('Revisé los registros y no encontré ventas pagadas o finalizadas para exportar.', 'bot');
+            } else if (estado.estado === 'error' || intentos >= 150) {
+                displayMessage('Hubo un error al generar el reporte. Por favor intenta más tarde.', 'bot');
+            } else {
+                setTimeout(() => pollExportStatus(statusUrl, intentos + 1), 2000);
+            }
+        })
+        .catch(error => {
+            displayMessage('No pude consultar el estado de tu reporte. Por favor intenta más tarde.', 'bot');
+            console.error('Error consultando export_status:', error);
+        });
+    };
+
     // --- 9. Lógica de Respuestas Rápidas (Corregida) ---
     const showQuickReplies = (permisos) => {
         quickRepliesContainer.innerHTML = '';